@@ -3,10 +3,15 @@ from flask_admin import Admin
 from flask_admin.contrib.sqla import ModelView
 from flask_admin.theme import Bootstrap4Theme
 
-from .cli import seed
+from .cli import seed, attachments, variants, users, replica, attempts, slow_queries, purge, static
 from .config import Config
-from .extensions import db, migrate, login_manager
+from .extensions import db, migrate, login_manager, cache, init_engine_options, init_sqlite_profile
 from .models import User, Task, Variant, Attempt, AttemptAnswer
+from .utils.db_routing import init_db_routing
+from .utils.fragment_cache import init_fragment_cache
+from .utils.slow_query_log import init_slow_query_log
+from .utils.sql_instrumentation import init_sql_instrumentation
+from .utils.static_assets import init_static_assets
 
 
 def _register_entities_views(admin):
@@ -15,6 +20,9 @@ def _register_entities_views(admin):
         view = get_model_view(model)
         admin.add_view(view(model, db.session, name=model.view_name()))
 
+    from app.admin import UserImportView
+    admin.add_view(UserImportView(name='Импорт пользователей', endpoint='users_import'))
+
 
 def _register_blueprints(flask_app):
     from app.routes.error_handlers import error_bp
@@ -44,6 +52,9 @@ def _register_blueprints(flask_app):
     from app.routes.attempts import attempts_bp
     flask_app.register_blueprint(attempts_bp, url_prefix='/attempts')
 
+    from app.routes.assets import assets_bp
+    flask_app.register_blueprint(assets_bp, url_prefix='/assets')
+
 
 def _register_api_blueprints(flask_app):
     from app.routes.api.tasks_api import tasks_api_bp
@@ -61,12 +72,65 @@ def _register_error_handlers(flask_app):
     register_error_handlers(flask_app)
 
 
+def _register_background_workers(flask_app):
+    """
+    Фоновые потоки стартуют на первом запросе, а не в create_app:
+    так они не запускаются в CLI-командах, тестах и в мастер-процессе gunicorn до fork.
+    """
+    if flask_app.config.get('TESTING'):
+        return
+
+    from app.utils.background import PeriodicWorker
+
+    workers = []
+    if flask_app.config.get('VARIANT_POOL_SIZE'):
+        from app.services.variant_pool_service import VariantPoolService
+
+        worker = PeriodicWorker(
+            flask_app,
+            lambda: VariantPoolService.refill(limit=flask_app.config['VARIANT_POOL_REFILL_BATCH']),
+            interval=flask_app.config['VARIANT_POOL_REFILL_INTERVAL'],
+            name='variant-pool-refill',
+        )
+        flask_app.extensions['variant_pool_worker'] = worker
+        workers.append(worker)
+
+    if flask_app.config.get('PURGE_INTERVAL'):
+        from app.services.purge_service import PurgeService
+
+        worker = PeriodicWorker(
+            flask_app,
+            lambda: PurgeService.run(max_batches=flask_app.config['PURGE_MAX_BATCHES']),
+            interval=flask_app.config['PURGE_INTERVAL'],
+            name='purge',
+        )
+        flask_app.extensions['purge_worker'] = worker
+        workers.append(worker)
+
+    if not workers:
+        return
+
+    @flask_app.before_request
+    def _start_background_workers():
+        for worker in workers:
+            if not worker.is_running:
+                worker.start()
+
+
 def create_app(config_class=Config):
     flask_app = Flask(__name__)
     flask_app.config.from_object(config_class)
 
+    init_engine_options(flask_app)
     db.init_app(flask_app)
+    init_sqlite_profile(flask_app)
+    init_db_routing(flask_app)
     migrate.init_app(flask_app, db)
+    cache.init_app(flask_app)
+    # {% cache %} в шаблонах
+    init_fragment_cache(flask_app)
+    # static_url() в шаблонах и манифест статики с хешами
+    init_static_assets(flask_app)
 
     login_manager.init_app(flask_app)
     login_manager.login_view = 'pages.login'
@@ -75,11 +139,15 @@ def create_app(config_class=Config):
     admin = Admin(flask_app, name='Тайная комната', theme=Bootstrap4Theme())
     _register_entities_views(admin)
 
+    from app.utils.user_cache import user_cache
+
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
 
     from app import models
+    # события, поднимающие revision вариантов и задач при изменениях
+    from app.utils import revisions  # noqa: F401  pylint: disable=W0611
 
     # регистрация blueprint'ов
     _register_blueprints(flask_app)
@@ -90,7 +158,24 @@ def create_app(config_class=Config):
     # регистрация обработчиков ошибок
     _register_error_handlers(flask_app)
 
+    # фоновые задачи
+    _register_background_workers(flask_app)
+
+    # счётчики SQL на каждый запрос
+    init_sql_instrumentation(flask_app)
+
+    # журнал медленных запросов с планами выполнения
+    init_slow_query_log(flask_app)
+
     # регистрация cli
     flask_app.cli.add_command(seed)
+    flask_app.cli.add_command(attachments)
+    flask_app.cli.add_command(variants)
+    flask_app.cli.add_command(users)
+    flask_app.cli.add_command(replica)
+    flask_app.cli.add_command(attempts)
+    flask_app.cli.add_command(slow_queries)
+    flask_app.cli.add_command(purge)
+    flask_app.cli.add_command(static)
 
     return flask_app
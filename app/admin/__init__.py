@@ -1,7 +1,7 @@
 from app import models
 from app.extensions import db
 from .base_view import SecureModelView
-from .users_view import UserAdmin
+from .users_view import UserAdmin, UserImportView
 from .tasks_view import TaskAdmin
 from .variant_view import VariantAdmin
 
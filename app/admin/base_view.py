@@ -1,11 +1,40 @@
-from flask import abort
+from flask import abort, flash
+from flask_admin import BaseView
 from flask_admin.contrib.sqla import ModelView
 from flask_login import current_user
 
 
-class SecureModelView(ModelView):
+class AdminOnlyMixin:
     def is_accessible(self):
         return current_user.is_authenticated and current_user.is_admin
 
     def inaccessible_callback(self, name, **kwargs):
         abort(403)
+
+
+class SecureModelView(AdminOnlyMixin, ModelView):
+    pass
+
+
+class SecureView(AdminOnlyMixin, BaseView):
+    pass
+
+
+class SoftDeleteModelView(SecureModelView):
+    """
+    Удаление из админки - мягкое (PurgeService.soft_delete): зависимые строки удалит фоновая очистка.
+    """
+
+    def delete_model(self, model):
+        from app.services.purge_service import PurgeService
+
+        try:
+            self.on_model_delete(model)
+            PurgeService.soft_delete(model)
+        except Exception as ex:  # pylint: disable=W0718
+            if not self.handle_view_exception(ex):
+                flash(f'Не удалось удалить запись: {ex}', 'error')
+            self.session.rollback()
+            return False
+        self.after_model_delete(model)
+        return True
@@ -1,7 +1,7 @@
 from wtforms import TextAreaField
 
-from app.admin.base_view import SecureModelView
+from app.admin.base_view import SoftDeleteModelView
 
 
-class TaskAdmin(SecureModelView):
+class TaskAdmin(SoftDeleteModelView):
     form_overrides = {'statement_html': TextAreaField}
@@ -1,5 +1,27 @@
-from app.admin.base_view import SecureModelView
+from flask import flash
+from flask_admin import expose
 
+from app.admin.base_view import SecureView, SoftDeleteModelView
+from app.forms.users import UserImportForm
+from app.services.user_import_service import UserImportService
 
-class UserAdmin(SecureModelView):
+
+class UserAdmin(SoftDeleteModelView):
     pass
+
+
+class UserImportView(SecureView):
+    @expose('/', methods=['GET', 'POST'])
+    def index(self):
+        form = UserImportForm()
+        report = None
+        if form.validate_on_submit():
+            try:
+                rows = UserImportService.parse_roster(form.roster_file.data.read().decode('utf-8-sig'))
+                report = UserImportService.import_users(rows)
+            except ValueError as e:
+                # UnicodeDecodeError - тоже ValueError
+                flash(f'Не удалось импортировать пользователей: {e}', 'error')
+            else:
+                flash(f'Создано пользователей: {report["created"]}', 'success')
+        return self.render('admin/users_import.html', form=form, report=report)
@@ -1,7 +1,28 @@
-from app.admin.base_view import SecureModelView
+from flask import flash
+from flask_admin.actions import action
+from flask_login import current_user
+
+from app.admin.base_view import SoftDeleteModelView
+from app.extensions import db
 from app.models import VariantTask
+from app.services.variant_services import VariantService
 
 
-class VariantAdmin(SecureModelView):
-    column_list = ['id', 'source', 'author', 'created_at', 'duration']
+class VariantAdmin(SoftDeleteModelView):
+    column_list = ['id', 'source', 'author', 'created_at', 'duration', 'is_pooled']
+    column_filters = ['is_pooled']
     inline_models = [(VariantTask, {"form_columns": ['id', 'task', 'order']})]
+
+    @action('clone', 'Клонировать', 'Создать копии выбранных вариантов?')
+    def action_clone(self, ids):
+        created = []
+        try:
+            for variant_id in ids:
+                created.append(VariantService.clone_variant(int(variant_id), author_id=current_user.id, commit=False))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Не удалось клонировать варианты: {e}', 'error')
+            return
+
+        flash(f'Создано копий: {len(created)} ({", ".join(f"#{v.id}" for v in created)})', 'success')
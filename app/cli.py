@@ -10,3 +10,242 @@ from app.models.users import ensure_default_admin_account
 def seed():
     ensure_default_roles()
     ensure_default_admin_account()
+
+
+@click.group("attachments")
+def attachments():
+    """Вложения к задачам"""
+
+
+@attachments.command("report")
+@with_appcontext
+def attachments_report():
+    """Сколько места сэкономило сжатие вложений (по номерам КИМ)"""
+    from app.services.attachment_service import AttachmentService
+
+    report = AttachmentService.get_compression_report()
+    if not report:
+        click.echo("Вложений нет")
+        return
+
+    click.echo(f"{'КИМ':>4} {'файлов':>7} {'исходно':>12} {'хранится':>12} {'сэкономлено':>12} {'сжатие':>7}")
+    total_original = total_stored = 0
+    for row in report:
+        total_original += row['original']
+        total_stored += row['stored']
+        click.echo(
+            f"{row['number']:>4} {row['files']:>7} {row['original']:>12} {row['stored']:>12} "
+            f"{row['saved']:>12} {row['ratio']:>6}x"
+        )
+    click.echo(f"Итого: {total_original} -> {total_stored} байт, сэкономлено {total_original - total_stored}")
+
+
+@attachments.command("compress")
+@click.option("--batch-size", default=100, show_default=True, help="Сколько вложений сжимать за одну транзакцию")
+@with_appcontext
+def attachments_compress(batch_size):
+    """Сжать ранее загруженные несжатые текстовые вложения"""
+    from app.services.attachment_service import AttachmentService
+
+    compressed = AttachmentService.compress_existing(batch_size=batch_size)
+    click.echo(f"Сжато вложений: {compressed}")
+
+
+@click.group("variants")
+def variants():
+    """Варианты"""
+
+
+@variants.command("pool-fill")
+@click.option("--limit", type=int, default=None, help="Сколько вариантов создать максимум")
+@with_appcontext
+def variants_pool_fill(limit):
+    """Догенерировать пул готовых полных вариантов до VARIANT_POOL_SIZE"""
+    from app.services.variant_pool_service import VariantPoolService
+
+    created = VariantPoolService.refill(limit=limit)
+    click.echo(f"Создано вариантов: {created}, в пуле: {VariantPoolService.depth()}")
+
+
+@click.group("users")
+def users():
+    """Пользователи"""
+
+
+@users.command("import")
+@click.argument("roster", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--role", "roles", multiple=True, default=["user"], show_default=True,
+              help="Роль для всех созданных пользователей (можно указать несколько раз)")
+@click.option("--workers", type=int, default=None, help="Сколько процессов хешируют пароли (по умолчанию - по числу ядер)")
+@click.option("--credentials", type=click.File("w", encoding="utf-8"), default="-", show_default=True,
+              help="Куда записать логины и сгенерированные пароли (CSV)")
+@with_appcontext
+def users_import(roster, roles, workers, credentials):
+    """Создать пользователей по CSV со столбцами last_name, first_name, middle_name, password"""
+    import csv
+
+    from app.services.user_import_service import UserImportService
+
+    try:
+        rows = UserImportService.parse_roster(roster.read())
+        report = UserImportService.import_users(rows, role_names=roles, workers=workers)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    writer = csv.writer(credentials)
+    writer.writerow(['last_name', 'first_name', 'middle_name', 'username', 'password'])
+    for user in report['users']:
+        writer.writerow([user['last_name'], user['first_name'], user['middle_name'] or '',
+                         user['username'], user['password'] or ''])
+    click.echo(
+        f"Создано пользователей: {report['created']} за {report['total_seconds']} с "
+        f"({report['users_per_sec']} польз./с; хеширование {report['hash_seconds']} с, процессов: {report['workers']})",
+        err=True,
+    )
+
+
+@click.group("replica")
+def replica():
+    """Реплика для чтения (REPLICA_DATABASE_URI)"""
+
+
+@replica.command("sync")
+@with_appcontext
+def replica_sync():
+    """Скопировать основную SQLite-базу в файл реплики"""
+    from flask import current_app
+
+    from app.utils.db_routing import sync_sqlite_replica
+
+    try:
+        sync_sqlite_replica(current_app)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Реплика обновлена: {current_app.config['REPLICA_DATABASE_URI']}")
+
+
+@click.group("attempts")
+def attempts():
+    """Попытки прохождения вариантов"""
+
+
+@attempts.command("expire")
+@with_appcontext
+def attempts_expire():
+    """Завершить попытки, у которых вышло время"""
+    from app.services.attempt_service import AttemptService
+
+    click.echo(f"Завершено попыток: {AttemptService.expire_overdue()}")
+
+
+@attempts.command("archive")
+@click.option("--days", type=int, default=None, help="Архивировать попытки старше стольких дней (по умолчанию ATTEMPT_ARCHIVE_DAYS)")
+@click.option("--batch-size", type=int, default=None, help="Попыток за одну транзакцию (по умолчанию ATTEMPT_ARCHIVE_BATCH)")
+@click.option("--max-batches", type=int, default=None, help="Остановиться после стольких пачек")
+@with_appcontext
+def attempts_archive(days, batch_size, max_batches):
+    """Перенести старые завершённые попытки и их ответы в архив"""
+    from app.services.attempt_archive_service import AttemptArchiveService
+
+    try:
+        report = AttemptArchiveService.archive(days, batch_size, max_batches)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"В архив перенесено попыток: {report['archived']}, ответов: {report['answers']} "
+        f"(пачек: {report['batches']}, завершены до {report['cutoff']:%d.%m.%Y}) за {report['seconds']} с"
+    )
+
+
+@click.group("slow-queries")
+def slow_queries():
+    """Журнал медленных запросов (SLOW_QUERY_LOG)"""
+
+
+@slow_queries.command("summary")
+@click.option("--file", "path", type=click.Path(dir_okay=False), default=None,
+              help="Файл журнала (по умолчанию SLOW_QUERY_LOG); ротированные копии читаются тоже")
+@click.option("--top", type=int, default=10, show_default=True, help="Сколько отпечатков показать")
+@click.option("--plans/--no-plans", default=True, show_default=True, help="Печатать планы выполнения")
+@with_appcontext
+def slow_queries_summary(path, top, plans):
+    """Отпечатки медленных запросов по суммарному времени"""
+    from flask import current_app
+
+    from app.utils.slow_query_log import read_slow_log, summarize_slow_log
+
+    path = path or current_app.config['SLOW_QUERY_LOG']
+    summary = summarize_slow_log(read_slow_log(path), top=top)
+    if not summary:
+        click.echo(f"Медленных запросов нет ({path})")
+        return
+
+    for i, group in enumerate(summary, start=1):
+        click.echo(
+            f"{i}. всего {group['total_ms']:.0f} мс, {group['count']} раз, "
+            f"среднее {group['mean_ms']:.1f} мс, максимум {group['max_ms']:.1f} мс"
+        )
+        click.echo(f"   {group['fingerprint']}")
+        endpoints = ", ".join(f"{name} ({count})" for name, count in group['endpoints'].most_common(3))
+        click.echo(f"   эндпоинты: {endpoints}")
+        if group['frames']:
+            click.echo(f"   вызов: {group['frames'].most_common(1)[0][0]}")
+        if plans and group['plan']:
+            for step in group['plan']:
+                click.echo(f"   план: {step}")
+
+
+@click.group("purge")
+def purge():
+    """Очистка мягко удалённых задач, вариантов и пользователей"""
+
+
+@purge.command("status")
+@with_appcontext
+def purge_status():
+    """Что ждёт очистки и сколько зависимых строк осталось"""
+    from app.services.purge_service import PurgeService
+
+    pending = PurgeService.status()
+    if not pending:
+        click.echo("Очищать нечего")
+        return
+    for item in pending:
+        remaining = ", ".join(f"{name}: {count}" for name, count in item['remaining'].items()) or "только сама строка"
+        click.echo(f"{item['entity']} #{item['id']} (удалён {item['deleted_at']:%d.%m.%Y %H:%M}): {remaining}")
+
+
+@purge.command("run")
+@click.option("--batch-size", type=int, default=None, help="Строк за одну транзакцию (по умолчанию PURGE_BATCH_SIZE)")
+@click.option("--max-batches", type=int, default=None, help="Остановиться после стольких транзакций")
+@with_appcontext
+def purge_run(batch_size, max_batches):
+    """Удалить зависимые строки и сами удалённые сущности"""
+    from app.services.purge_service import PurgeService
+
+    report = PurgeService.run(batch_size=batch_size, max_batches=max_batches)
+    purged = ", ".join(report['purged']) or "нет"
+    click.echo(
+        f"Транзакций: {report['batches']}, строк: {report['rows']} за {report['seconds']} с; "
+        f"удалены полностью: {purged}"
+    )
+
+
+@click.group("static")
+def static():
+    """Статика с хешем содержимого в имени"""
+
+
+@static.command("build")
+@with_appcontext
+def static_build():
+    """Собрать файлы с хешами, их .gz/.br копии и manifest.json в STATIC_BUILD_DIR"""
+    from flask import current_app
+    from app.utils.static_assets import build_manifest, brotli
+
+    build_dir = current_app.config['STATIC_BUILD_DIR']
+    report = build_manifest(current_app.static_folder, build_dir)
+    click.echo(
+        f"Файлов в манифесте: {report['files']}, записано новых: {report['written']}, "
+        f"сжато: {report['compressed']} ({'gzip и brotli' if brotli is not None else 'только gzip'}) -> {build_dir}"
+    )
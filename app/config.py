@@ -18,6 +18,49 @@ class EnvEnum(str, Enum):
     MAX_CONTENT_LENGTH = 'MAX_CONTENT_LENGTH'
     FLASK_APP = 'FLASK_APP'
     PYTHONUNBUFFERED = 'PYTHONUNBUFFERED'
+    ATTACHMENT_COMPRESSION = 'ATTACHMENT_COMPRESSION'
+    CACHE_DIR = 'CACHE_DIR'
+    VARIANT_POOL_SIZE = 'VARIANT_POOL_SIZE'
+    VARIANT_POOL_REFILL_INTERVAL = 'VARIANT_POOL_REFILL_INTERVAL'
+    VARIANT_POOL_REFILL_BATCH = 'VARIANT_POOL_REFILL_BATCH'
+    CACHE_MAX_ENTRIES = 'CACHE_MAX_ENTRIES'
+    CACHE_DEFAULT_TTL = 'CACHE_DEFAULT_TTL'
+    USER_CACHE_TTL = 'USER_CACHE_TTL'
+    PASSWORD_HASH_METHOD = 'PASSWORD_HASH_METHOD'
+    PASSWORD_SALT_LENGTH = 'PASSWORD_SALT_LENGTH'
+    USER_IMPORT_WORKERS = 'USER_IMPORT_WORKERS'
+    SQLITE_JOURNAL_MODE = 'SQLITE_JOURNAL_MODE'
+    SQLITE_SYNCHRONOUS = 'SQLITE_SYNCHRONOUS'
+    SQLITE_BUSY_TIMEOUT = 'SQLITE_BUSY_TIMEOUT'
+    SQLITE_CACHE_SIZE = 'SQLITE_CACHE_SIZE'
+    SQLITE_MMAP_SIZE = 'SQLITE_MMAP_SIZE'
+    SQLITE_TEMP_STORE = 'SQLITE_TEMP_STORE'
+    DB_POOL_SIZE = 'DB_POOL_SIZE'
+    DB_MAX_OVERFLOW = 'DB_MAX_OVERFLOW'
+    DB_POOL_TIMEOUT = 'DB_POOL_TIMEOUT'
+    DB_POOL_RECYCLE = 'DB_POOL_RECYCLE'
+    DB_POOL_PRE_PING = 'DB_POOL_PRE_PING'
+    DB_POOL_STATS_INTERVAL = 'DB_POOL_STATS_INTERVAL'
+    REPLICA_DATABASE_URI = 'REPLICA_DATABASE_URI'
+    REPLICA_STICKY_SECONDS = 'REPLICA_STICKY_SECONDS'
+    SQL_INSTRUMENTATION = 'SQL_INSTRUMENTATION'
+    SQL_N_PLUS_ONE_THRESHOLD = 'SQL_N_PLUS_ONE_THRESHOLD'
+    SLOW_QUERY_MS = 'SLOW_QUERY_MS'
+    SLOW_QUERY_LOG = 'SLOW_QUERY_LOG'
+    SLOW_QUERY_LOG_MAX_BYTES = 'SLOW_QUERY_LOG_MAX_BYTES'
+    SLOW_QUERY_LOG_BACKUPS = 'SLOW_QUERY_LOG_BACKUPS'
+    SLOW_QUERY_EXPLAIN = 'SLOW_QUERY_EXPLAIN'
+    ATTEMPT_ARCHIVE_DAYS = 'ATTEMPT_ARCHIVE_DAYS'
+    ATTEMPT_ARCHIVE_BATCH = 'ATTEMPT_ARCHIVE_BATCH'
+    PURGE_INTERVAL = 'PURGE_INTERVAL'
+    PURGE_BATCH_SIZE = 'PURGE_BATCH_SIZE'
+    PURGE_MAX_BATCHES = 'PURGE_MAX_BATCHES'
+    FRAGMENT_CACHE = 'FRAGMENT_CACHE'
+    FRAGMENT_CACHE_TTL = 'FRAGMENT_CACHE_TTL'
+    STATIC_ASSETS = 'STATIC_ASSETS'
+    STATIC_BUILD_DIR = 'STATIC_BUILD_DIR'
+    STATIC_BUILD_ON_STARTUP = 'STATIC_BUILD_ON_STARTUP'
+    RECENT_ATTEMPTS = 'RECENT_ATTEMPTS'
 
     @property
     def type(self):
@@ -31,6 +74,49 @@ class EnvEnum(str, Enum):
             EnvEnum.MAX_CONTENT_LENGTH: int,
             EnvEnum.FLASK_APP: str,
             EnvEnum.PYTHONUNBUFFERED: bool,
+            EnvEnum.ATTACHMENT_COMPRESSION: bool,
+            EnvEnum.CACHE_DIR: str,
+            EnvEnum.VARIANT_POOL_SIZE: int,
+            EnvEnum.VARIANT_POOL_REFILL_INTERVAL: int,
+            EnvEnum.VARIANT_POOL_REFILL_BATCH: int,
+            EnvEnum.CACHE_MAX_ENTRIES: int,
+            EnvEnum.CACHE_DEFAULT_TTL: int,
+            EnvEnum.USER_CACHE_TTL: int,
+            EnvEnum.PASSWORD_HASH_METHOD: str,
+            EnvEnum.PASSWORD_SALT_LENGTH: int,
+            EnvEnum.USER_IMPORT_WORKERS: int,
+            EnvEnum.SQLITE_JOURNAL_MODE: str,
+            EnvEnum.SQLITE_SYNCHRONOUS: str,
+            EnvEnum.SQLITE_BUSY_TIMEOUT: int,
+            EnvEnum.SQLITE_CACHE_SIZE: int,
+            EnvEnum.SQLITE_MMAP_SIZE: int,
+            EnvEnum.SQLITE_TEMP_STORE: str,
+            EnvEnum.DB_POOL_SIZE: int,
+            EnvEnum.DB_MAX_OVERFLOW: int,
+            EnvEnum.DB_POOL_TIMEOUT: int,
+            EnvEnum.DB_POOL_RECYCLE: int,
+            EnvEnum.DB_POOL_PRE_PING: bool,
+            EnvEnum.DB_POOL_STATS_INTERVAL: int,
+            EnvEnum.REPLICA_DATABASE_URI: str,
+            EnvEnum.REPLICA_STICKY_SECONDS: int,
+            EnvEnum.SQL_INSTRUMENTATION: bool,
+            EnvEnum.SQL_N_PLUS_ONE_THRESHOLD: int,
+            EnvEnum.SLOW_QUERY_MS: int,
+            EnvEnum.SLOW_QUERY_LOG: str,
+            EnvEnum.SLOW_QUERY_LOG_MAX_BYTES: int,
+            EnvEnum.SLOW_QUERY_LOG_BACKUPS: int,
+            EnvEnum.SLOW_QUERY_EXPLAIN: bool,
+            EnvEnum.ATTEMPT_ARCHIVE_DAYS: int,
+            EnvEnum.ATTEMPT_ARCHIVE_BATCH: int,
+            EnvEnum.PURGE_INTERVAL: int,
+            EnvEnum.PURGE_BATCH_SIZE: int,
+            EnvEnum.PURGE_MAX_BATCHES: int,
+            EnvEnum.FRAGMENT_CACHE: bool,
+            EnvEnum.FRAGMENT_CACHE_TTL: int,
+            EnvEnum.STATIC_ASSETS: bool,
+            EnvEnum.STATIC_BUILD_DIR: str,
+            EnvEnum.STATIC_BUILD_ON_STARTUP: bool,
+            EnvEnum.RECENT_ATTEMPTS: int,
         }[self]
 
     @property
@@ -46,6 +132,49 @@ class EnvEnum(str, Enum):
             EnvEnum.MAX_CONTENT_LENGTH: str(6 * 1024 * 1024),
             EnvEnum.FLASK_APP: 'app',
             EnvEnum.PYTHONUNBUFFERED: '1',
+            EnvEnum.ATTACHMENT_COMPRESSION: 'True',
+            EnvEnum.CACHE_DIR: os.path.join(BASE_DIR, 'cache'),
+            EnvEnum.VARIANT_POOL_SIZE: '0',
+            EnvEnum.VARIANT_POOL_REFILL_INTERVAL: '5',
+            EnvEnum.VARIANT_POOL_REFILL_BATCH: '5',
+            EnvEnum.CACHE_MAX_ENTRIES: '2048',
+            EnvEnum.CACHE_DEFAULT_TTL: '300',
+            EnvEnum.USER_CACHE_TTL: '30',
+            EnvEnum.PASSWORD_HASH_METHOD: 'scrypt:32768:8:1',
+            EnvEnum.PASSWORD_SALT_LENGTH: '16',
+            EnvEnum.USER_IMPORT_WORKERS: '0',
+            EnvEnum.SQLITE_JOURNAL_MODE: 'WAL',
+            EnvEnum.SQLITE_SYNCHRONOUS: 'NORMAL',
+            EnvEnum.SQLITE_BUSY_TIMEOUT: '5000',
+            EnvEnum.SQLITE_CACHE_SIZE: '-20000',
+            EnvEnum.SQLITE_MMAP_SIZE: str(128 * 1024 * 1024),
+            EnvEnum.SQLITE_TEMP_STORE: 'MEMORY',
+            EnvEnum.DB_POOL_SIZE: '10',
+            EnvEnum.DB_MAX_OVERFLOW: '20',
+            EnvEnum.DB_POOL_TIMEOUT: '30',
+            EnvEnum.DB_POOL_RECYCLE: '1800',
+            EnvEnum.DB_POOL_PRE_PING: 'True',
+            EnvEnum.DB_POOL_STATS_INTERVAL: '60',
+            EnvEnum.REPLICA_DATABASE_URI: '',
+            EnvEnum.REPLICA_STICKY_SECONDS: '5',
+            EnvEnum.SQL_INSTRUMENTATION: 'True',
+            EnvEnum.SQL_N_PLUS_ONE_THRESHOLD: '10',
+            EnvEnum.SLOW_QUERY_MS: '200',
+            EnvEnum.SLOW_QUERY_LOG: os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl'),
+            EnvEnum.SLOW_QUERY_LOG_MAX_BYTES: '10485760',
+            EnvEnum.SLOW_QUERY_LOG_BACKUPS: '5',
+            EnvEnum.SLOW_QUERY_EXPLAIN: 'True',
+            EnvEnum.ATTEMPT_ARCHIVE_DAYS: '180',
+            EnvEnum.ATTEMPT_ARCHIVE_BATCH: '500',
+            EnvEnum.PURGE_INTERVAL: '5',
+            EnvEnum.PURGE_BATCH_SIZE: '500',
+            EnvEnum.PURGE_MAX_BATCHES: '20',
+            EnvEnum.FRAGMENT_CACHE: 'True',
+            EnvEnum.FRAGMENT_CACHE_TTL: '600',
+            EnvEnum.STATIC_ASSETS: 'True',
+            EnvEnum.STATIC_BUILD_DIR: os.path.join(BASE_DIR, 'cache', 'static'),
+            EnvEnum.STATIC_BUILD_ON_STARTUP: 'False',
+            EnvEnum.RECENT_ATTEMPTS: '5',
         }[self]
 
 
@@ -71,3 +200,76 @@ class Config:
     MAX_CONTENT_LENGTH = parse_env_var(EnvEnum.MAX_CONTENT_LENGTH)
     FLASK_APP = parse_env_var(EnvEnum.FLASK_APP)
     PYTHONUNBUFFERED = parse_env_var(EnvEnum.PYTHONUNBUFFERED)
+    ATTACHMENT_COMPRESSION = parse_env_var(EnvEnum.ATTACHMENT_COMPRESSION)
+    CACHE_DIR = parse_env_var(EnvEnum.CACHE_DIR)
+    # 0 - пул готовых полных вариантов выключен
+    VARIANT_POOL_SIZE = parse_env_var(EnvEnum.VARIANT_POOL_SIZE)
+    VARIANT_POOL_REFILL_INTERVAL = parse_env_var(EnvEnum.VARIANT_POOL_REFILL_INTERVAL)
+    VARIANT_POOL_REFILL_BATCH = parse_env_var(EnvEnum.VARIANT_POOL_REFILL_BATCH)
+    # кеш приложения в памяти процесса (app.extensions.cache)
+    CACHE_MAX_ENTRIES = parse_env_var(EnvEnum.CACHE_MAX_ENTRIES)
+    CACHE_DEFAULT_TTL = parse_env_var(EnvEnum.CACHE_DEFAULT_TTL)
+    # сколько секунд пользователь живёт в кеше процесса; правки из других процессов видны не позже
+    USER_CACHE_TTL = parse_env_var(EnvEnum.USER_CACHE_TTL)
+    # метод и стоимость хеширования паролей в формате werkzeug: scrypt:N:r:p или pbkdf2:sha256:итерации;
+    # хеши со старыми параметрами пересчитываются при входе
+    PASSWORD_HASH_METHOD = parse_env_var(EnvEnum.PASSWORD_HASH_METHOD)
+    PASSWORD_SALT_LENGTH = parse_env_var(EnvEnum.PASSWORD_SALT_LENGTH)
+    # сколько процессов хешируют пароли при массовом импорте пользователей; 0 - по числу ядер
+    USER_IMPORT_WORKERS = parse_env_var(EnvEnum.USER_IMPORT_WORKERS)
+    # профиль SQLite (PRAGMA на каждое соединение); пустые JOURNAL_MODE, SYNCHRONOUS и TEMP_STORE - оставить
+    # настройку SQLite по умолчанию, числовые BUSY_TIMEOUT, CACHE_SIZE и MMAP_SIZE обязательно задаются числом
+    SQLITE_JOURNAL_MODE = parse_env_var(EnvEnum.SQLITE_JOURNAL_MODE)
+    SQLITE_SYNCHRONOUS = parse_env_var(EnvEnum.SQLITE_SYNCHRONOUS)
+    # мс ожидания блокировки записи вместо немедленного 'database is locked'
+    SQLITE_BUSY_TIMEOUT = parse_env_var(EnvEnum.SQLITE_BUSY_TIMEOUT)
+    # отрицательное значение - в КиБ (20 МБ), положительное - в страницах
+    SQLITE_CACHE_SIZE = parse_env_var(EnvEnum.SQLITE_CACHE_SIZE)
+    SQLITE_MMAP_SIZE = parse_env_var(EnvEnum.SQLITE_MMAP_SIZE)
+    SQLITE_TEMP_STORE = parse_env_var(EnvEnum.SQLITE_TEMP_STORE)
+    # пул соединений для серверных СУБД (MySQL и т.п.); для SQLite не применяется
+    DB_POOL_SIZE = parse_env_var(EnvEnum.DB_POOL_SIZE)
+    DB_MAX_OVERFLOW = parse_env_var(EnvEnum.DB_MAX_OVERFLOW)
+    # сколько секунд ждать свободное соединение
+    DB_POOL_TIMEOUT = parse_env_var(EnvEnum.DB_POOL_TIMEOUT)
+    # пересоздавать соединения старше стольких секунд - раньше, чем их закроет wait_timeout MySQL
+    DB_POOL_RECYCLE = parse_env_var(EnvEnum.DB_POOL_RECYCLE)
+    DB_POOL_PRE_PING = parse_env_var(EnvEnum.DB_POOL_PRE_PING)
+    # раз во сколько секунд писать в лог ожидание и загрузку пула; 0 - не писать
+    DB_POOL_STATS_INTERVAL = parse_env_var(EnvEnum.DB_POOL_STATS_INTERVAL)
+    # реплика только для чтения: на неё идут SELECT из представлений с @read_only; пусто - всё читается с основной БД
+    REPLICA_DATABASE_URI = parse_env_var(EnvEnum.REPLICA_DATABASE_URI)
+    # сколько секунд после записи пользователь читает с основной БД (read-your-writes при отставании реплики)
+    REPLICA_STICKY_SECONDS = parse_env_var(EnvEnum.REPLICA_STICKY_SECONDS)
+    # счётчики SQL на запрос: заголовок Server-Timing, строка в логе и предупреждение о N+1
+    SQL_INSTRUMENTATION = parse_env_var(EnvEnum.SQL_INSTRUMENTATION)
+    # столько повторов одного и того же запроса за HTTP-запрос считаются N+1
+    SQL_N_PLUS_ONE_THRESHOLD = parse_env_var(EnvEnum.SQL_N_PLUS_ONE_THRESHOLD)
+    # запросы дольше SLOW_QUERY_MS мс пишутся в SLOW_QUERY_LOG (JSONL, с ротацией) с планом выполнения; 0 - выключено
+    SLOW_QUERY_MS = parse_env_var(EnvEnum.SLOW_QUERY_MS)
+    SLOW_QUERY_LOG = parse_env_var(EnvEnum.SLOW_QUERY_LOG)
+    # размер файла до ротации и сколько старых файлов хранить
+    SLOW_QUERY_LOG_MAX_BYTES = parse_env_var(EnvEnum.SLOW_QUERY_LOG_MAX_BYTES)
+    SLOW_QUERY_LOG_BACKUPS = parse_env_var(EnvEnum.SLOW_QUERY_LOG_BACKUPS)
+    # снимать EXPLAIN для каждого нового отпечатка медленного запроса (один раз)
+    SLOW_QUERY_EXPLAIN = parse_env_var(EnvEnum.SLOW_QUERY_EXPLAIN)
+    # завершённые попытки старше ATTEMPT_ARCHIVE_DAYS дней переносятся в архив (flask attempts archive);
+    # не меньше 90 - столько охватывает статистика по номерам, меньшее значение archive отклоняет
+    ATTEMPT_ARCHIVE_DAYS = parse_env_var(EnvEnum.ATTEMPT_ARCHIVE_DAYS)
+    # попыток за одну транзакцию архивации
+    ATTEMPT_ARCHIVE_BATCH = parse_env_var(EnvEnum.ATTEMPT_ARCHIVE_BATCH)
+    # фоновая очистка мягко удалённых задач, вариантов и пользователей: раз в PURGE_INTERVAL с
+    # не больше PURGE_MAX_BATCHES транзакций по PURGE_BATCH_SIZE строк; 0 - только вручную (flask purge run)
+    PURGE_INTERVAL = parse_env_var(EnvEnum.PURGE_INTERVAL)
+    PURGE_BATCH_SIZE = parse_env_var(EnvEnum.PURGE_BATCH_SIZE)
+    PURGE_MAX_BATCHES = parse_env_var(EnvEnum.PURGE_MAX_BATCHES)
+    # кеш фрагментов шаблонов ({% cache %}); FRAGMENT_CACHE_TTL - время жизни фрагмента по умолчанию, с
+    FRAGMENT_CACHE = parse_env_var(EnvEnum.FRAGMENT_CACHE)
+    FRAGMENT_CACHE_TTL = parse_env_var(EnvEnum.FRAGMENT_CACHE_TTL)
+    # статика с хешем содержимого в имени и сжатыми копиями (static_url в шаблонах): собирается в STATIC_BUILD_DIR
+    # командой flask static build при деплое; STATIC_BUILD_ON_STARTUP - собирать при старте каждого воркера (разработка)
+    STATIC_ASSETS = parse_env_var(EnvEnum.STATIC_ASSETS)
+    STATIC_BUILD_DIR = parse_env_var(EnvEnum.STATIC_BUILD_DIR)
+    STATIC_BUILD_ON_STARTUP = parse_env_var(EnvEnum.STATIC_BUILD_ON_STARTUP)
+    # персональные варианты: сколько последних завершённых попыток пользователя учитывать
+    RECENT_ATTEMPTS = parse_env_var(EnvEnum.RECENT_ATTEMPTS)
@@ -1,4 +1,6 @@
 import sqlite3
+from functools import partial
+from typing import Any, Dict, List, Tuple
 
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
@@ -6,6 +8,9 @@ from flask_migrate import Migrate
 from sqlalchemy import MetaData, event
 from sqlalchemy.engine import Engine
 
+from app.utils.cache_utils import AppCache
+from app.utils.db_routing import RoutingSession
+
 naming_convention = {
     "ix": "ix_%(column_0_label)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -15,10 +20,12 @@ naming_convention = {
 }
 
 metadata = MetaData(naming_convention=naming_convention)
-db = SQLAlchemy(metadata=metadata)
+# RoutingSession отправляет чтения из представлений с @read_only на реплику, если она настроена
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
 
 migrate = Migrate()
 login_manager = LoginManager()
+cache = AppCache()
 
 
 @event.listens_for(Engine, "connect")
@@ -27,3 +34,88 @@ def _set_sqlite_pragma(dbapi_conn, conn_record):
         cursor = dbapi_conn.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
+
+
+# допустимые значения строковых PRAGMA - значение подставляется в SQL, поэтому проверяем его заранее
+SQLITE_PRAGMA_CHOICES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+
+def sqlite_pragmas(config) -> List[Tuple[str, str]]:
+    """
+    PRAGMA профиля SQLite из конфигурации (SQLITE_*) в порядке применения.
+    journal_mode идёт первым: от него зависит, как SQLite трактует synchronous.
+    """
+    pragmas = []
+    for name in ('journal_mode', 'synchronous', 'temp_store'):
+        value = (config.get(f'SQLITE_{name.upper()}') or '').strip().upper()
+        if not value:
+            continue
+        if value not in SQLITE_PRAGMA_CHOICES[name]:
+            choices = ', '.join(SQLITE_PRAGMA_CHOICES[name])
+            raise ValueError(f'SQLITE_{name.upper()}={value}: ожидается одно из {choices}')
+        pragmas.append((name, value))
+    for name in ('busy_timeout', 'cache_size', 'mmap_size'):
+        value = config.get(f'SQLITE_{name.upper()}')
+        if value is not None:
+            pragmas.append((name, str(int(value))))
+    return pragmas
+
+
+def _apply_sqlite_pragmas(pragmas, dbapi_conn, conn_record):
+    cursor = dbapi_conn.cursor()
+    for name, value in pragmas:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def init_sqlite_profile(app, engines=None) -> None:
+    """
+    Применять профиль SQLite к каждому новому соединению движков приложения.
+    WAL позволяет читать во время записи, а busy_timeout заставляет писателя подождать блокировку,
+    так что одновременные автосохранения ответов не падают с 'database is locked'.
+    """
+    pragmas = sqlite_pragmas(app.config)
+    if not pragmas:
+        return
+    if engines is None:
+        with app.app_context():
+            engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', partial(_apply_sqlite_pragmas, pragmas))
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """
+    Параметры пула соединений (DB_POOL_*) для серверных СУБД. У SQLite своя схема пула,
+    и эти настройки ей не нужны - для неё возвращается пустой словарь.
+    """
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return {}
+
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if config.get('DB_POOL_STATS_INTERVAL'):
+        from app.utils.db_pool import make_instrumented_pool
+        options['poolclass'] = make_instrumented_pool(config['DB_POOL_STATS_INTERVAL'])
+    return options
+
+
+def init_engine_options(app) -> None:
+    """
+    Дополнить SQLALCHEMY_ENGINE_OPTIONS параметрами пула; явно заданные в конфигурации опции важнее.
+    Вызывать до db.init_app.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config),
+        **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}),
+    }
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileRequired
 from wtforms import StringField, FileField, SubmitField
 from wtforms.validators import Optional, Length
 
@@ -10,3 +11,8 @@ class UserEditForm(FlaskForm):
     middle_name = StringField('Отчество', validators=[Optional(), Length(max=20)])
     avatar_file = FileField('Аватар')
     submit = SubmitField('Сохранить')
+
+
+class UserImportForm(FlaskForm):
+    roster_file = FileField('Список пользователей (CSV)', validators=[FileRequired(), FileAllowed(['csv'], 'Нужен CSV-файл')])
+    submit = SubmitField('Импортировать')
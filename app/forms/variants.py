@@ -1,7 +1,16 @@
+from typing import List, Tuple
+
+from flask import request
 from flask_wtf import FlaskForm
 from wtforms import BooleanField, SubmitField, HiddenField, StringField, IntegerField
 from markupsafe import Markup
 
+from app.utils.task_catalog import task_catalog
+from app.utils.variant_utils import numbers_for_kim
+
+# столько же разрешает поле "Количество" в шаблоне
+MAX_TASKS_PER_NUMBER = 20
+
 
 class KimBooleanInputField(BooleanField):
     def __init__(self, label=None, min_val=1, max_val=20, **kwargs):
@@ -48,8 +57,52 @@ class VariantGenerationForm(FlaskForm):
     kim_26 = KimBooleanInputField("Обработка данных с помощью сортировки")
     kim_27 = KimBooleanInputField("Анализ данных")
 
+    # персональная генерация (только для вошедших пользователей)
+    exclude_solved = BooleanField("Не повторять задачи из последних попыток")
+    prefer_weak = BooleanField("Больше задач на номера, где мало верных ответов")
+
     submit = SubmitField('Сгенерировать случайный вариант')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # [(номер КИМ, количество)] - заполняется в validate()
+        self.selection: List[Tuple[str, int]] = []
+
+    def validate(self, extra_validators=None) -> bool:
+        """
+        Проверка выбранных номеров и количеств по сводке банка задач,
+        чтобы до случайного выбора не доходили заведомо невыполнимые запросы.
+        """
+        if not super().validate(extra_validators):
+            return False
+
+        catalog = task_catalog.get()
+        selection = []
+        for field in self:
+            if not field.name.startswith('kim_') or not field.data:
+                continue
+            num = field.name.replace('kim_', '').replace('_', '-')
+            try:
+                cnt = int(request.form.get(f'kim_count_{num}', 1))
+            except (TypeError, ValueError):
+                self.form_errors.append(f'№{num}: количество должно быть числом')
+                continue
+            if not 1 <= cnt <= MAX_TASKS_PER_NUMBER:
+                self.form_errors.append(f'№{num}: количество должно быть от 1 до {MAX_TASKS_PER_NUMBER}')
+                continue
+
+            available = sum(catalog[n]['count'] for n in numbers_for_kim(num) if n in catalog)
+            if available < cnt:
+                self.form_errors.append(f'№{num}: в банке задач {available}, запрошено {cnt}')
+                continue
+            selection.append((num, cnt))
+
+        if not selection and not self.form_errors:
+            self.form_errors.append('Выберите хотя бы один номер КИМ')
+
+        self.selection = selection
+        return not self.form_errors
+
 
 class VariantEditForm(FlaskForm):
     variant_id = HiddenField()
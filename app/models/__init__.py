@@ -8,6 +8,7 @@ from .variant_tasks import VariantTask
 from .attempts import Attempt
 from .attempt_answers import AttemptAnswer
 from .user_avatars import UserAvatar
+from .attempt_archive import ArchivedAttempt, ArchivedAttemptAnswer, AttemptSummary
 
 models = [
     UserRole,
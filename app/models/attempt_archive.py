@@ -0,0 +1,156 @@
+from app.extensions import db
+from app.models.model_abc import IModel
+from app.utils.date_utils import utcnow
+
+
+class ArchivedAttempt(IModel):
+    """
+    Старая завершённая попытка, перенесённая из attempts (см. AttemptArchiveService).
+    Id сохраняется; внешнего ключа на вариант нет, чтобы удаление варианта не трогало архив.
+    """
+    __tablename__ = 'attempts_archive'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False,
+    )
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True,
+    )
+    variant_id = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    started_at = db.Column(
+        db.DateTime,
+    )
+    finished_at = db.Column(
+        db.DateTime,
+    )
+    archived_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=utcnow,
+    )
+
+    @classmethod
+    def view_name(cls) -> str:
+        return "Архив попыток"
+
+    def __repr__(self) -> str:
+        return f'ArchivedAttempt(id={self.id}, user={self.user_id}, variant={self.variant_id})'
+
+
+class ArchivedAttemptAnswer(IModel):
+    __tablename__ = 'attempt_answers_archive'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False,
+    )
+    attempt_id = db.Column(
+        db.Integer,
+        db.ForeignKey('attempts_archive.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True,
+    )
+    variant_task_id = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    answer_text = db.Column(
+        db.Text,
+        nullable=True,
+    )
+    is_correct = db.Column(
+        db.Boolean,
+        nullable=True,
+    )
+    updated_at = db.Column(
+        db.DateTime,
+    )
+
+    @classmethod
+    def view_name(cls) -> str:
+        return "Архив ответов"
+
+    def __repr__(self) -> str:
+        return f'ArchivedAttemptAnswer(attempt={self.attempt_id}, variant_task={self.variant_task_id})'
+
+
+class AttemptSummary(IModel):
+    """
+    Итог архивной попытки в том виде, в каком его показывает статистика профиля:
+    хватает для истории попыток, сводки и динамики без чтения архива ответов.
+    """
+    __tablename__ = 'attempt_summaries'
+
+    # id исходной попытки
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False,
+    )
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False,
+    )
+    variant_id = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    variant_source = db.Column(
+        db.String(255),
+        nullable=True,
+    )
+    started_at = db.Column(
+        db.DateTime,
+    )
+    finished_at = db.Column(
+        db.DateTime,
+        nullable=False,
+    )
+    duration = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    is_full_variant = db.Column(
+        db.Boolean,
+        nullable=False,
+        default=False,
+    )
+    # по ячейкам для отображения (задача 19 - три ячейки), как в UserStatsService.get_user_attempts
+    correct_display = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    total_display = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    # по сохранённым ответам (is_correct), как в сводке и динамике решения
+    correct_answers = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+    answers_count = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    __table_args__ = (
+        db.Index('ix_attempt_summaries_user_finished', 'user_id', 'finished_at'),
+    )
+
+    @classmethod
+    def view_name(cls) -> str:
+        return "Итоги архивных попыток"
+
+    def __repr__(self) -> str:
+        return f'AttemptSummary(id={self.id}, user={self.user_id}, score={self.correct_display}/{self.total_display})'
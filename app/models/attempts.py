@@ -46,6 +46,23 @@ class Attempt(IModel):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        # статистика пользователя: его завершённые попытки по времени завершения
+        db.Index('ix_attempts_user_finished', 'user_id', 'finished_at'),
+        # окна дашборда по времени завершения; незавершённые в индекс не попадают
+        db.Index(
+            'ix_attempts_finished_at', 'finished_at',
+            sqlite_where=db.text('finished_at IS NOT NULL'),
+            postgresql_where=db.text('finished_at IS NOT NULL'),
+        ),
+        # незавершённые попытки для проверки истечения времени - их немного, индекс маленький
+        db.Index(
+            'ix_attempts_unfinished', 'started_at',
+            sqlite_where=db.text('finished_at IS NULL'),
+            postgresql_where=db.text('finished_at IS NULL'),
+        ),
+    )
+
     @property
     def as_dict(self) -> Dict:
         return {
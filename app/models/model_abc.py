@@ -12,3 +12,29 @@ class IModel(db.Model):
     @classmethod
     def view_name(cls) -> str:
         raise NotImplementedError
+
+
+class SoftDeleteMixin:
+    """
+    Мягкое удаление: строка с deleted_at сразу пропадает из выборок (app/utils/soft_delete.py),
+    а зависимые строки и её саму потом удаляет пачками PurgeService.
+    """
+    deleted_at = db.Column(
+        db.DateTime,
+        nullable=True,
+    )
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.deleted_at is not None
+
+
+def soft_delete_index(table_name: str) -> db.Index:
+    """
+    Частичный индекс по deleted_at: в нём только строки, ждущие очистки.
+    """
+    return db.Index(
+        f'ix_{table_name}_deleted_at', 'deleted_at',
+        sqlite_where=db.text('deleted_at IS NOT NULL'),
+        postgresql_where=db.text('deleted_at IS NOT NULL'),
+    )
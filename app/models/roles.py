@@ -10,6 +10,17 @@ class DefaultRoles(str, Enum):
     user = 'user'
 
 
+# бит в User.role_mask для каждой стандартной роли; остальные роли проверяются по имени
+ROLE_BITS = {role.value: 1 << i for i, role in enumerate(DefaultRoles)}
+
+
+def roles_to_mask(role_names) -> int:
+    mask = 0
+    for name in role_names:
+        mask |= ROLE_BITS.get(name, 0)
+    return mask
+
+
 class Role(IModel):
     __tablename__ = 'roles'
 
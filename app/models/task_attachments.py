@@ -16,12 +16,15 @@ class TaskAttachment(IModel):
         db.Integer,
         db.ForeignKey('tasks.id', ondelete='CASCADE'),
         nullable=False,
+        index=True,
     )
 
     filename = db.Column(db.String(32), nullable=False)
     content_type = db.Column(db.String(120), nullable=True)
     size = db.Column(db.Integer, nullable=True)
     data = db.Column(Binary, nullable=False)
+    # как хранится data: 'identity' - как есть, 'gzip' - сжато (см. app.utils.compression_utils)
+    encoding = db.Column(db.String(16), nullable=False, default='identity', server_default='identity')
     uploaded_at = db.Column(db.DateTime, default=utcnow, nullable=False)
 
     # passive_deletes=True для доверия физическому каскаду СУБД
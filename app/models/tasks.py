@@ -3,12 +3,12 @@ from typing import Dict
 from flask_login import current_user
 
 from app.extensions import db
-from app.models.model_abc import IModel
+from app.models.model_abc import IModel, SoftDeleteMixin, soft_delete_index
 from app.utils.date_utils import utcnow
 from app.utils.text_utils import make_snippet
 
 
-class Task(IModel):
+class Task(SoftDeleteMixin, IModel):
     __tablename__ = 'tasks'
 
     id = db.Column(
@@ -18,6 +18,7 @@ class Task(IModel):
     number = db.Column(
         db.Integer,
         nullable=False,
+        index=True,
     )
     statement_html = db.Column(
         db.Text,
@@ -30,11 +31,19 @@ class Task(IModel):
     published_at = db.Column(
         db.DateTime,
         default=utcnow,
+        index=True,
     )
     source = db.Column(
         db.String(255),
         nullable=True,
     )
+    # растёт при изменении условия, ответа, номера или вложений (см. app/utils/revisions.py)
+    revision = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default='1',
+    )
 
     author_id = db.Column(
         db.Integer,
@@ -60,6 +69,10 @@ class Task(IModel):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        soft_delete_index('tasks'),
+    )
+
     @property
     def as_dict(self) -> Dict:
         from flask import url_for
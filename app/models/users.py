@@ -1,16 +1,25 @@
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
-from app.models.model_abc import IModel
-from app.models.roles import DefaultRoles
+from app.models.model_abc import IModel, SoftDeleteMixin, soft_delete_index
+from app.models.roles import DefaultRoles, ROLE_BITS, roles_to_mask
 from app.utils.date_utils import utcnow
 from app.utils.name_utils import get_username
+from app.utils.password_utils import hash_password, needs_rehash, verify_password
+from app.utils.soft_delete import INCLUDE_DELETED
+from app.utils.text_utils import escape_like
 
+# сколько раз подбирать имя заново, если его заняли между подбором и вставкой
+USERNAME_RETRIES = 3
+# столько префиксов LIKE в одном запросе, чтобы не упереться в лимит параметров SQLite
+USERNAME_QUERY_CHUNK = 500
 
-class User(UserMixin, IModel):
+
+class User(SoftDeleteMixin, UserMixin, IModel):
     __tablename__ = 'users'
 
     id = db.Column(
@@ -42,6 +51,7 @@ class User(UserMixin, IModel):
         db.DateTime,
         nullable=False,
         default=utcnow,
+        index=True,
     )
 
     # при удалении пользователя строки в user_roles удалятся (работает через FK ondelete)
@@ -75,15 +85,35 @@ class User(UserMixin, IModel):
         passive_deletes=True
     )
 
+    __table_args__ = (
+        soft_delete_index('users'),
+    )
+
     @classmethod
     def view_name(cls) -> str:
         return "Пользователи"
 
+    @property
+    def is_active(self) -> bool:
+        # удалённый пользователь не может войти, даже если объект уже загружен
+        return not self.is_deleted
+
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password: str) -> bool:
+        """
+        Пересчитать хеш, если он посчитан не по текущей политике (PASSWORD_HASH_METHOD).
+        Вызывается после успешной проверки пароля, пока открытый пароль ещё под рукой.
+        :return: True, если хеш изменён и его нужно сохранить
+        """
+        if not needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
 
     @classmethod
     def generate_username(cls, first_name: str, last_name: str, middle_name: str | None = None) -> str:
@@ -95,15 +125,82 @@ class User(UserMixin, IModel):
         :param middle_name: отчество
         :return: имя пользователя
         """
+        return cls.generate_usernames([(first_name, last_name, middle_name)])[0]
+
+    @classmethod
+    def generate_usernames(cls, people: Sequence[Tuple[str, str, Optional[str]]]) -> List[str]:
+        """
+        Пакетный вариант generate_username: свободные имена для всего списка (имя, фамилия, отчество).
+        Занятые имена с нужными префиксами читаются одним запросом LIKE 'base%' на пачку префиксов,
+        числовые суффиксы разбираются в памяти, и каждому берётся наименьший свободный.
+        Одинаковые ФИО внутри списка получают разные имена.
+        """
+        bases = [get_username(*person) for person in people]
+        taken = cls._taken_suffixes(set(bases))
 
-        base_username = get_username(first_name, last_name, middle_name)
-        username = base_username
-        count = 1
-        while cls.query.filter_by(username=username).first() is not None:
-            count += 1
-            username = f'{base_username}{count}'
+        usernames = []
+        for base in bases:
+            used = taken.setdefault(base, set())
+            suffix = 1
+            while suffix in used:
+                suffix += 1
+            used.add(suffix)
+            usernames.append(base if suffix == 1 else f'{base}{suffix}')
+        return usernames
 
-        return username
+    @classmethod
+    def _taken_suffixes(cls, bases: Iterable[str]) -> Dict[str, Set[int]]:
+        """
+        Занятые суффиксы для каждого префикса: base -> 1, base2 -> 2 и т.д.
+        """
+        bases = sorted(bases)
+        taken: Dict[str, Set[int]] = {}
+        for start in range(0, len(bases), USERNAME_QUERY_CHUNK):
+            chunk = set(bases[start:start + USERNAME_QUERY_CHUNK])
+            # имена удалённых, но ещё не очищенных пользователей тоже заняты
+            found = db.session.query(cls.username).filter(
+                or_(*(cls.username.like(f'{escape_like(base)}%', escape='\\') for base in chunk))
+            ).execution_options(**{INCLUDE_DELETED: True})
+            for (username,) in found:
+                # LIKE в SQLite не различает регистр, а уникальность имени - различает
+                if username in chunk:
+                    taken.setdefault(username, set()).add(1)
+                    continue
+                head = username.rstrip('0123456789')
+                digits = username[len(head):]
+                # base02 не считается за base2
+                if digits and not digits.startswith('0') and head in chunk:
+                    taken.setdefault(head, set()).add(int(digits))
+        return taken
+
+    @classmethod
+    def add_with_unique_username(cls, user: 'User', retries: int = USERNAME_RETRIES) -> None:
+        """
+        Подобрать пользователю имя по ФИО и записать его в БД (flush, без коммита).
+        Если параллельная регистрация успела занять то же имя, вставка падает на уникальном индексе -
+        тогда откатываем только SAVEPOINT и подбираем имя заново.
+        """
+        for attempt in range(retries):
+            user.username = cls.generate_username(user.first_name, user.last_name, user.middle_name)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(user)
+                return
+            except IntegrityError:
+                if attempt == retries - 1:
+                    raise
+
+    @property
+    def role_mask(self) -> int:
+        """
+        Битовая маска стандартных ролей (ROLE_BITS). Считается один раз на объект;
+        пользователю из user_cache она проставляется сразу, без запроса ролей.
+        """
+        mask = self.__dict__.get('_role_mask')
+        if mask is None:
+            mask = roles_to_mask(role.name for role in self.roles)
+            self._role_mask = mask
+        return mask
 
     def has_role(self, role_name: str) -> bool:
         """
@@ -112,15 +209,17 @@ class User(UserMixin, IModel):
         :param role_name: Имя роли (например, 'admin', 'user', 'guest')
         :return: True, если роль найдена
         """
+        role_name = getattr(role_name, 'value', role_name)
+        bit = ROLE_BITS.get(role_name)
+        if bit is not None:
+            return bool(self.role_mask & bit)
         return any(role.name == role_name for role in self.roles)
 
     @property
     def is_admin(self) -> bool:
         """
         Проверка, является ли пользователь администратором.
-        Предполагаем, что роль администратора имеет id = 0.
         """
-        # FIXME: с id == 0 такой костыль, надо однажды это как-нибудь исправить
         return self.has_role(DefaultRoles.admin)
 
     @property
@@ -1,11 +1,12 @@
+import uuid
 from typing import Dict
 
 from app.extensions import db
-from app.models.model_abc import IModel
+from app.models.model_abc import IModel, SoftDeleteMixin, soft_delete_index
 from app.utils.date_utils import utcnow
 
 
-class Variant(IModel):
+class Variant(SoftDeleteMixin, IModel):
     __tablename__ = 'variants'
 
     id = db.Column(
@@ -25,6 +26,28 @@ class Variant(IModel):
         nullable=False,
         default=14100,
     )
+    # заранее сгенерированный полный вариант, ещё не выданный пользователю (см. VariantPoolService)
+    is_pooled = db.Column(
+        db.Boolean,
+        nullable=False,
+        default=False,
+        server_default=db.false(),
+        index=True,
+    )
+    # растёт при любом изменении состава варианта или его задач (см. app/utils/revisions.py)
+    revision = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default='1',
+    )
+    # случайный токен строки: SQLite может выдать id удалённого варианта новому, а кеш
+    # скомпилированных вариантов (VariantBundleService) не должен их спутать
+    bundle_token = db.Column(
+        db.String(32),
+        nullable=False,
+        default=lambda: uuid.uuid4().hex,
+    )
 
     author_id = db.Column(
         db.Integer,
@@ -38,6 +61,7 @@ class Variant(IModel):
     tasks = db.relationship(
         'VariantTask',
         back_populates='variant',
+        order_by='[VariantTask.order, VariantTask.id]',
         cascade='all, delete-orphan',
         # passive_deletes=True нужен для доверия алхимии к физическому каскаду СУБД
         passive_deletes=True,
@@ -49,6 +73,12 @@ class Variant(IModel):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        # последние и новые варианты на дашборде - только выданные, не из пула
+        db.Index('ix_variants_pooled_created', 'is_pooled', 'created_at'),
+        soft_delete_index('variants'),
+    )
+
     @classmethod
     def view_name(cls) -> str:
         return "Варианты"
@@ -1,11 +1,14 @@
 from flask import Blueprint, request, jsonify
 
 from app.services.task_services import TaskService
+from app.utils.db_routing import read_only
+from app.utils.task_catalog import task_catalog
 
 tasks_api_bp = Blueprint("api_tasks", __name__)
 
 
 @tasks_api_bp.route("/by_numbers", methods=["POST"])
+@read_only
 def by_numbers():
     """
     На вход отправляют номера КИМ, на выходе выдаем все задачи этих номеров КИМ
@@ -23,6 +26,7 @@ def by_numbers():
 
 
 @tasks_api_bp.route("/by_ids", methods=["POST"])
+@read_only
 def by_ids():
     """
     На вход отправляют ID задач, на выходе отправляем инфо об этих задачах
@@ -36,3 +40,12 @@ def by_ids():
 
     tasks = TaskService.get_by_ids(ids)
     return jsonify(ok=True, tasks=[t.as_dict for t in tasks]), 200
+
+
+@tasks_api_bp.route("/catalog", methods=["GET"])
+@read_only
+def catalog():
+    """
+    Сколько задач каждого номера КИМ есть в банке, дата последней и доля задач с вложениями
+    """
+    return jsonify(ok=True, numbers=list(task_catalog.get().values())), 200
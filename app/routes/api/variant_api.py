@@ -1,8 +1,9 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required, current_user
 
-from app import db
 from app.models import Variant
+from app.services.purge_service import PurgeService
+from app.services.variant_pool_service import VariantPoolService
 
 variants_api_bp = Blueprint('variants_api', __name__)
 
@@ -17,7 +18,16 @@ def delete_variant(variant_id):
     if not can_delete:
         return jsonify(ok=False, error='Нет прав'), 403
 
-    db.session.delete(variant)
-    db.session.commit()
+    # попытки и состав варианта удалит фоновая очистка (PurgeService)
+    PurgeService.soft_delete(variant)
 
     return jsonify(ok=True), 200
+
+
+@variants_api_bp.get('/pool')
+@login_required
+def pool_metrics():
+    if not current_user.is_admin:
+        return jsonify(ok=False, error='Нет прав'), 403
+
+    return jsonify(ok=True, pool=VariantPoolService.get_metrics()), 200
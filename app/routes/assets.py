@@ -0,0 +1,30 @@
+import mimetypes
+
+from flask import Blueprint, abort, current_app, request, send_from_directory
+
+from app.utils.static_assets import IMMUTABLE_MAX_AGE, choose_variant
+
+assets_bp = Blueprint('assets', __name__)
+
+
+@assets_bp.route('/<path:filename>')
+def asset(filename):
+    """
+    Статика с хешем в имени (см. static_url): кешируется браузером на год без перепроверки,
+    а клиенту, который умеет br или gzip, отдаётся заранее сжатая копия.
+    """
+    build_dir = current_app.config['STATIC_BUILD_DIR']
+    path, encoding = choose_variant(
+        build_dir, filename, request.accept_encodings, current_app.extensions['static_served'],
+    )
+    if path is None:
+        abort(404)
+
+    # тип - по исходному имени, а не по .gz/.br
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(build_dir, path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
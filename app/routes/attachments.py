@@ -1,11 +1,12 @@
 from io import BytesIO
 
-from flask import Blueprint, send_file, abort, flash, redirect, url_for
+from flask import Blueprint, Response, send_file, abort, flash, redirect, url_for, request
 from flask_login import login_required, current_user
 
 from app.extensions import db
 from app.forms.generic import ConfirmForm
 from app.models import TaskAttachment
+from app.utils.compression_utils import GZIP, iter_decompressed
 
 attachments_bp = Blueprint('attachments', __name__)
 
@@ -16,19 +17,43 @@ def download_attachment(attachment_id):
     if not attachment.data:
         abort(404)
 
-    # создаем in-memory файл
-    file_data = BytesIO(attachment.data)
     # используем оригинальное имя или id
     filename = attachment.filename or f'attachment_{attachment.id}'
+    mimetype = attachment.content_type or 'application/octet-stream'
+
+    if attachment.encoding == GZIP:
+        return _send_gzip_attachment(attachment, filename, mimetype)
+
+    # создаем in-memory файл
+    file_data = BytesIO(attachment.data)
 
     return send_file(
         file_data,
         as_attachment=True,
         download_name=filename,
-        mimetype=attachment.content_type or 'application/octet-stream'
+        mimetype=mimetype
     )
 
 
+def _send_gzip_attachment(attachment: TaskAttachment, filename: str, mimetype: str) -> Response:
+    """
+    Вложение хранится в gzip: клиенту, который умеет gzip, отдаём сохранённые байты как есть,
+    остальным - распаковываем потоком.
+    """
+    if request.accept_encodings['gzip']:
+        response = Response(attachment.data, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.content_length = len(attachment.data)
+    else:
+        response = Response(iter_decompressed(attachment.data, attachment.encoding), mimetype=mimetype)
+        if attachment.size is not None:
+            response.content_length = attachment.size
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+
 @attachments_bp.route('/<int:attachment_id>/delete', methods=['POST'])
 @login_required
 def delete_attachment(attachment_id):
@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, jsonify, request, abort, redirect, url_for
 from flask_login import login_required, current_user
 
-from app.models import Attempt, VariantTask
+from app.models import Attempt
 from app.services.attempt_service import AttemptService
+from app.services.variant_bundle_service import VariantBundleService
 
 attempts_bp = Blueprint('attempts', __name__)
 
@@ -20,21 +21,14 @@ def attempt(attempt_id: int):
         return redirect(url_for('attempts.results_page', attempt_id=attempt_id))
 
     variant = attempt_obj.variant
-    variant_tasks = VariantTask.query.filter_by(variant_id=variant.id).order_by(VariantTask.order).all()
-
-    # Подсчёт реального количества задач для отображения
-    total_display_tasks = 0
-    for vt in variant_tasks:
-        if vt.task.number == 19:
-            total_display_tasks += 3  # Задача 19 = 3 задачи (19, 20, 21)
-        else:
-            total_display_tasks += 1
+    bundle = VariantBundleService.get(variant)
 
     kwargs = {
         'attempt': attempt_obj,
         'variant': variant,
-        'variant_tasks': variant_tasks,
-        'total_tasks': total_display_tasks,
+        'tasks': bundle['tasks'],
+        'total_tasks': bundle['total_display_tasks'],
+        'has_attachments': bundle['has_attachments'],
     }
     return render_template('attempts/attempt.html', **kwargs)
 
@@ -67,8 +61,8 @@ def save_answer(attempt_id: int):
     if not variant_task_id:
         return jsonify(ok=False, error='Не удалось найти задачу'), 400
 
-    vt = VariantTask.query.get(variant_task_id)
-    if not vt or vt.variant_id != attempt.variant_id:
+    bundle = VariantBundleService.get(attempt.variant)
+    if VariantBundleService.get_answer_key(bundle, variant_task_id) is None:
         return jsonify({'error': 'Invalid task'}), 400
 
     answer = AttemptService.save_answer(
@@ -5,11 +5,13 @@ from app.forms.auth import RegisterForm, LoginForm
 from app.models import User
 from app.extensions import db
 from app.services.dashboard_service import DashboardService
+from app.utils.db_routing import read_only
 
 pages_bp = Blueprint("pages", __name__)
 
 
 @pages_bp.route('', methods=['GET'])
+@read_only
 def index():
     dashboard_data = DashboardService.get_dashboard_data()
     return render_template("index.html", dashboard_data=dashboard_data)
@@ -28,6 +30,8 @@ def login():
         return render_template('login.html', form=form)
     user = User.query.filter_by(username=form.username.data).first()
     if user and user.check_password(form.password.data):
+        if user.rehash_password_if_needed(form.password.data):
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
         return redirect(url_for('pages.index'))
     else:
@@ -46,16 +50,14 @@ def register():
         first_name = form.first_name.data
         last_name = form.last_name.data
         middle_name = form.middle_name.data or None
-        username = User.generate_username(first_name, last_name, middle_name)
 
         user = User(
-            username=username,
             first_name=first_name,
             last_name=last_name,
             middle_name=middle_name
         )
         user.set_password(form.password.data)
-        db.session.add(user)
+        User.add_with_unique_username(user)
         db.session.commit()
 
         login_user(user, remember=form.remember_me.data)
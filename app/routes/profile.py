@@ -11,6 +11,7 @@ from app import db
 from app.services.task_services import TaskService
 from app.services.variant_services import VariantService
 from app.utils.date_utils import utcnow
+from app.utils.db_routing import read_only
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -64,6 +65,7 @@ def update_avatar():
 
 
 @profile_bp.route('/stats')
+@read_only
 @login_required
 def stats():
     from app.services.user_stats_service import UserStatsService
@@ -4,8 +4,10 @@ from werkzeug.utils import secure_filename
 
 from app.forms.generic import ConfirmForm
 from app.forms.tasks import NewTaskForm
-from app.models import Task, TaskAttachment
+from app.models import Task
 from app.extensions import db
+from app.services.attachment_service import AttachmentService
+from app.services.purge_service import PurgeService
 
 tasks_bp = Blueprint("tasks", __name__)
 
@@ -44,14 +46,7 @@ def new_task():
         if not (fs and fs.filename):
             continue
         filename = secure_filename(fs.filename)
-        data = fs.read()
-        attachment = TaskAttachment(
-            task_id=task.id,
-            filename=filename,
-            content_type=fs.mimetype,
-            size=len(data),
-            data=data,
-        )
+        attachment = AttachmentService.build_attachment(task.id, filename, fs.mimetype, fs.read())
         db.session.add(attachment)
         saved.append(attachment)
 
@@ -100,8 +95,8 @@ def delete_task(task_id):
         flash("Неверный запрос при удалении.", "warning")
         return redirect(url_for("tasks.view_task", task_id=task.id))
 
-    db.session.delete(task)
-    db.session.commit()
+    # задача сразу пропадает из банка, а связи с вариантами и ответы удалит фоновая очистка
+    PurgeService.soft_delete(task)
 
     flash("Задача удалена.", "success")
     return redirect(url_for("tasks.tasks"))
@@ -144,14 +139,7 @@ def edit_task(task_id):
             if not (fs and fs.filename):
                 continue
             filename = secure_filename(fs.filename)
-            data = fs.read()
-            attachment = TaskAttachment(
-                task_id=task.id,
-                filename=filename,
-                content_type=fs.mimetype,
-                size=len(data),
-                data=data,
-            )
+            attachment = AttachmentService.build_attachment(task.id, filename, fs.mimetype, fs.read())
             db.session.add(attachment)
             saved.append(filename)
 
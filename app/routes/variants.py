@@ -1,15 +1,22 @@
+import os
 import re
 from typing import List
 
-from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
+from flask import (Blueprint, Response, render_template, redirect, url_for, request, flash, jsonify, abort, send_file,
+                   stream_with_context)
 from flask_login import current_user, login_required
 from sqlalchemy.exc import IntegrityError
 
 from app import db
 from app.forms.variants import VariantGenerationForm, VariantEditForm
 from app.models import Task, Variant, VariantTask
+from app.services.attachment_service import AttachmentService
 from app.services.attempt_service import AttemptService
-from app.utils.variant_utils import build_tasks_set
+from app.services.variant_bundle_service import VariantBundleService
+from app.services.variant_pool_service import VariantPoolService
+from app.services.variant_services import SEARCH_PAGE_SIZE, VariantService
+from app.utils.db_routing import read_only
+from app.utils.variant_utils import FULL_VARIANT_SPECS, build_tasks_set, build_personal_tasks_set
 
 variants_bp = Blueprint('variants', __name__, url_prefix='/variants')
 
@@ -23,29 +30,29 @@ def variants():
     if not current_user.is_authenticated:
         return redirect(url_for('pages.login'))
 
-    selected = []
-    for field in form:
-        if not field.name.startswith('kim_'):
-            continue
-        if getattr(form, field.name).data:
-            num = field.name.replace('kim_', '').replace('_', '-')
-            cnt_raw = request.form.get(f'kim_count_{num}', 1)
-            cnt = int(cnt_raw)
-            selected.append((num, cnt))
-
-    tasks: List[Task] = build_tasks_set(selected)
+    selected = form.selection
+
+    personal = form.exclude_solved.data or form.prefer_weak.data
+    if not personal and sorted(selected) == sorted(FULL_VARIANT_SPECS):
+        # полный вариант без персональных настроек - берём готовый из пула
+        variant_id = VariantPoolService.claim(current_user.id)
+        if variant_id is not None:
+            return redirect(url_for('variants.view_variant', variant_id=variant_id))
+
+    if personal:
+        tasks: List[Task] = build_personal_tasks_set(
+            selected,
+            current_user.id,
+            exclude_recent=form.exclude_solved.data,
+            prefer_weak=form.prefer_weak.data,
+        )
+    else:
+        tasks = build_tasks_set(selected)
     if not tasks:
         print('Пустой вариант')
         return render_template('variants/variants.html', form=form)
 
-    variant = Variant(author_id=current_user.id)
-    db.session.add(variant)
-    db.session.commit()
-
-    for i, task in enumerate(tasks):
-        vt = VariantTask(variant_id=variant.id, task_id=task.id, order=i)
-        db.session.add(vt)
-    db.session.commit()
+    variant, _ = VariantService.create_variant([task.id for task in tasks], author_id=current_user.id)
 
     return redirect(url_for('variants.view_variant', variant_id=variant.id))
 
@@ -58,7 +65,36 @@ def new_variant():
 @variants_bp.route('/view_variant/<int:variant_id>')
 def view_variant(variant_id: int):
     variant = Variant.query.get_or_404(variant_id)
-    return render_template('variants/view_variant.html', variant=variant)
+    bundle = VariantBundleService.get(variant)
+    return render_template('variants/view_variant.html', variant=variant, bundle=bundle,
+                           has_attachments=bundle['has_attachments'])
+
+
+@variants_bp.route('/<int:variant_id>/attachments.zip')
+def variant_attachments_zip(variant_id: int):
+    """
+    Все вложения варианта одним архивом. Архив собирается потоком и кешируется на диске
+    по revision варианта и хешу набора вложений, поэтому повторные скачивания - это чтение одного файла.
+    """
+    variant = Variant.query.get_or_404(variant_id)
+    manifest = AttachmentService.get_variant_manifest(variant.id)
+    if not manifest:
+        abort(404)
+
+    download_name = f'variant_{variant.id}_attachments.zip'
+    cache_path = AttachmentService.get_zip_cache_path(variant, AttachmentService.get_manifest_hash(manifest))
+    if os.path.exists(cache_path):
+        return send_file(cache_path, mimetype='application/zip', as_attachment=True, download_name=download_name)
+
+    # архивы прошлых ревизий больше никому не отдаются
+    AttachmentService.prune_zip_cache(variant.id, cache_path)
+
+    response = Response(
+        stream_with_context(AttachmentService.iter_variant_zip(manifest, cache_path=cache_path)),
+        mimetype='application/zip',
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
 
 
 @variants_bp.route('/start_exam/<int:variant_id>', methods=['GET', 'POST'])
@@ -99,6 +135,44 @@ def edit_variant(variant_id):
     return render_template('variants/edit_variant.html', variant=variant, form=form, my_tasks=current_user.tasks)
 
 
+@variants_bp.route('/<int:variant_id>/clone', methods=['POST'])
+@login_required
+def clone_variant(variant_id: int):
+    """
+    Копия варианта текущему пользователю. JSON (необязательно):
+    {"source": "...", "substitutions": [{"from": id задачи в варианте, "to": id новой задачи}, ...]}
+    Обычная отправка формы перенаправляет на редактирование копии.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        substitutions = {int(item['from']): int(item['to']) for item in data.get('substitutions') or []}
+    except (KeyError, TypeError, ValueError):
+        return jsonify(ok=False, message='Некорректный список замен'), 400
+
+    Variant.query.get_or_404(variant_id)
+    try:
+        copy = VariantService.clone_variant(
+            variant_id,
+            author_id=current_user.id,
+            substitutions=substitutions,
+            source=data.get('source'),
+        )
+    except ValueError as e:
+        return jsonify(ok=False, message=str(e)), 400
+    except IntegrityError:
+        return jsonify(ok=False, message='Ошибка копирования'), 500
+
+    if not request.is_json:
+        return redirect(url_for('variants.edit_variant', variant_id=copy.id))
+
+    return jsonify(
+        ok=True,
+        variant_id=copy.id,
+        view_url=url_for('variants.view_variant', variant_id=copy.id),
+        edit_url=url_for('variants.edit_variant', variant_id=copy.id),
+    ), 201
+
+
 @variants_bp.route('/<int:variant_id>/add_task', methods=['POST'])
 @login_required
 def add_task(variant_id):
@@ -184,39 +258,60 @@ def move_task(variant_id):
     data = request.get_json(force=True, silent=True) or {}
     task_id = data.get('task_id')
     direction = data.get('direction')  # 'up' или 'down'
+    try:
+        task_id = int(task_id)
+    except (TypeError, ValueError):
+        task_id = None
     if not task_id or direction not in ('up', 'down'):
         return jsonify(ok=False, message="Неверные параметры"), 400
 
-    if not hasattr(VariantTask, 'position'):
-        return jsonify(ok=True, moved=True, task_id=task_id), 200
-
-    vt = VariantTask.query.filter_by(variant_id=variant.id, task_id=task_id).first()
-    if not vt:
+    task_ids = VariantService.get_task_ids(variant.id)
+    if task_id not in task_ids:
         return jsonify(ok=False, message="Задача не в варианте"), 404
 
-    if direction == 'up':
-        neighbor = VariantTask.query.filter(
-            VariantTask.variant_id == variant.id,
-            VariantTask.position < vt.position
-        ).order_by(VariantTask.position.desc()).first()
-    else:
-        neighbor = VariantTask.query.filter(
-            VariantTask.variant_id == variant.id,
-            VariantTask.position > vt.position
-        ).order_by(VariantTask.position.asc()).first()
-
-    if not neighbor:
+    index = task_ids.index(task_id)
+    neighbor = index - 1 if direction == 'up' else index + 1
+    if not 0 <= neighbor < len(task_ids):
         return jsonify(ok=False, message="Невозможно переместить"), 400
 
+    task_ids[index], task_ids[neighbor] = task_ids[neighbor], task_ids[index]
     try:
-        vt.position, neighbor.position = neighbor.position, vt.position
-        db.session.commit()
+        VariantService.set_composition(variant.id, task_ids)
     except Exception:
-        db.session.rollback()
         return jsonify(ok=False, message="Ошибка перемещения"), 500
 
-    order = [vt.task_id for vt in VariantTask.query.filter_by(variant_id=variant.id).order_by(VariantTask.position.asc()).all()]
-    return jsonify(ok=True, order=order), 200
+    return jsonify(ok=True, order=task_ids), 200
+
+
+@variants_bp.route('/<int:variant_id>/composition', methods=['PATCH'])
+@login_required
+def update_composition(variant_id):
+    """
+    Состав варианта целиком: {"task_ids": [id задач в нужном порядке]}.
+    Вставки, удаления и перенумерация выполняются одной транзакцией.
+    """
+    variant = Variant.query.get_or_404(variant_id)
+
+    can_edit = current_user.is_admin or variant.author is not None and current_user.id == variant.author.id
+    if not can_edit:
+        return jsonify(ok=False, message="Нет прав"), 403
+
+    data = request.get_json(force=True, silent=True) or {}
+    task_ids = data.get('task_ids')
+    if not isinstance(task_ids, list):
+        return jsonify(ok=False, message="task_ids обязателен"), 400
+    if not all(isinstance(task_id, int) and not isinstance(task_id, bool) and task_id > 0 for task_id in task_ids):
+        return jsonify(ok=False, message="Некорректный список задач"), 400
+
+    try:
+        composition = VariantService.set_composition(variant.id, task_ids)
+    except ValueError as e:
+        # сообщения сервиса: повторы и неизвестные id
+        return jsonify(ok=False, message=str(e)), 400
+    except IntegrityError:
+        return jsonify(ok=False, message="Ошибка сохранения состава"), 500
+
+    return jsonify(ok=True, composition=composition, task_ids=[row['task_id'] for row in composition]), 200
 
 
 @variants_bp.route('/tasks/<int:task_id>/json')
@@ -233,18 +328,35 @@ def _strip_tags(text: str) -> str:
 
 
 @variants_bp.route('/search')
+@read_only
 def search_variants():
     if request.args.get('all'):
-        variants = Variant.query.order_by(Variant.id.desc()).all()
-        out = []
-        for v in variants:
-            task_count = VariantTask.query.filter_by(variant_id=v.id).count()
-            out.append({
-                'id': v.id,
-                'source': v.source,
-                'task_count': task_count,
-            })
-        return jsonify(ok=True, variants=out), 200
+        author_id = request.args.get('author_id', type=int)
+        before_id = request.args.get('before', type=int)
+        limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+        source = (request.args.get('source') or '').strip() or None
+        full_raw = request.args.get('full')
+        full = None if full_raw in (None, '') else full_raw in ('1', 'true')
+
+        # страницы, которые клиент уже видел, не пересчитываем: ETag меняется только при изменении вариантов
+        etag = VariantService.get_search_etag(source=source, author_id=author_id)
+        etag = f'{etag}-{full}-{before_id}-{limit}'
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        items, next_cursor = VariantService.search(
+            source=source,
+            author_id=author_id,
+            full=full,
+            before_id=before_id,
+            limit=limit,
+        )
+        response = jsonify(ok=True, variants=items, next_cursor=next_cursor)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response, 200
 
     vid = request.args.get('id')
     if vid:
@@ -254,7 +366,7 @@ def search_variants():
             return jsonify(ok=False, message='Некорректный id'), 400
 
         v = Variant.query.get(vid_i)
-        if not v:
+        if not v or v.is_pooled:
             return jsonify(ok=False, message='Вариант не найден'), 404
 
         tasks_out = []
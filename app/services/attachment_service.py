@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Task, TaskAttachment, Variant, VariantTask
+from app.utils.compression_utils import IDENTITY, choose_encoding, compress, decompress, iter_decompressed
+from app.utils.zip_utils import iter_zip
+
+
+class AttachmentService:
+    @staticmethod
+    def build_attachment(task_id: int, filename: str, content_type: Optional[str], data: bytes) -> TaskAttachment:
+        """
+        Создать вложение, при необходимости сжав его для хранения.
+        В size всегда пишется исходный размер файла.
+        """
+        encoding = IDENTITY
+        if current_app.config.get('ATTACHMENT_COMPRESSION'):
+            encoding = choose_encoding(content_type, filename)
+
+        stored = compress(data, encoding)
+        if len(stored) >= len(data):
+            # сжатие не помогло - нет смысла платить за распаковку
+            encoding, stored = IDENTITY, data
+
+        return TaskAttachment(
+            task_id=task_id,
+            filename=filename,
+            content_type=content_type,
+            size=len(data),
+            data=stored,
+            encoding=encoding,
+        )
+
+    @staticmethod
+    def compress_existing(batch_size: int = 100) -> int:
+        """
+        Сжать уже сохранённые несжатые вложения. Возвращает количество сжатых.
+        """
+        ids = [
+            row.id for row in
+            db.session.query(TaskAttachment.id, TaskAttachment.content_type, TaskAttachment.filename)
+            .filter(TaskAttachment.encoding == IDENTITY)
+            .all()
+            if choose_encoding(row.content_type, row.filename) != IDENTITY
+        ]
+
+        compressed = 0
+        for i in range(0, len(ids), batch_size):
+            for attachment in TaskAttachment.query.filter(TaskAttachment.id.in_(ids[i:i + batch_size])).all():
+                raw = decompress(attachment.data, attachment.encoding)
+                encoding = choose_encoding(attachment.content_type, attachment.filename)
+                stored = compress(raw, encoding)
+                if len(stored) >= len(raw):
+                    continue
+                attachment.data = stored
+                attachment.encoding = encoding
+                attachment.size = len(raw)
+                compressed += 1
+            db.session.commit()
+        return compressed
+
+    @staticmethod
+    def get_compression_report() -> List[Dict[str, Any]]:
+        """
+        Экономия места по номерам КИМ. Блобы в память не загружаются - длина считается в СУБД.
+        """
+        rows = (
+            db.session.query(
+                Task.number,
+                func.count(TaskAttachment.id).label('files'),
+                func.sum(func.coalesce(TaskAttachment.size, func.length(TaskAttachment.data))).label('original'),
+                func.sum(func.length(TaskAttachment.data)).label('stored'),
+            )
+            .join(Task, TaskAttachment.task_id == Task.id)
+            .group_by(Task.number)
+            .order_by(Task.number)
+            .all()
+        )
+
+        report = []
+        for row in rows:
+            original = int(row.original or 0)
+            stored = int(row.stored or 0)
+            report.append({
+                'number': row.number,
+                'files': row.files,
+                'original': original,
+                'stored': stored,
+                'saved': original - stored,
+                'ratio': round(original / stored, 2) if stored else 0.0,
+            })
+        return report
+
+    @staticmethod
+    def get_variant_manifest(variant_id: int) -> List[Dict[str, Any]]:
+        """
+        Список вложений варианта в порядке задач, без загрузки самих файлов.
+        Имя в архиве: <порядковый номер задачи>_<номер КИМ>_<имя файла>.
+        """
+        positions = {
+            vt_id: pos for pos, (vt_id,) in enumerate(
+                db.session.query(VariantTask.id)
+                .filter(VariantTask.variant_id == variant_id)
+                .order_by(VariantTask.order, VariantTask.id)
+                .all(),
+                start=1,
+            )
+        }
+
+        rows = (
+            db.session.query(
+                TaskAttachment.id,
+                TaskAttachment.filename,
+                TaskAttachment.content_type,
+                TaskAttachment.size,
+                TaskAttachment.encoding,
+                TaskAttachment.uploaded_at,
+                VariantTask.id.label('variant_task_id'),
+                Task.number,
+            )
+            .join(Task, TaskAttachment.task_id == Task.id)
+            .join(VariantTask, VariantTask.task_id == Task.id)
+            .filter(VariantTask.variant_id == variant_id)
+            .all()
+        )
+        rows.sort(key=lambda r: (positions[r.variant_task_id], r.id))
+
+        manifest = []
+        for row in rows:
+            filename = row.filename or f'attachment_{row.id}'
+            manifest.append({
+                'id': row.id,
+                'name': f'{positions[row.variant_task_id]:02d}_{row.number}_{filename}',
+                'content_type': row.content_type,
+                'size': row.size,
+                'encoding': row.encoding,
+                'uploaded_at': row.uploaded_at.isoformat() if row.uploaded_at else None,
+                'date_time': row.uploaded_at.timetuple()[:6] if row.uploaded_at else (1980, 1, 1, 0, 0, 0),
+                'compressible': choose_encoding(row.content_type, filename) != IDENTITY,
+            })
+        return manifest
+
+    @staticmethod
+    def get_manifest_hash(manifest: List[Dict[str, Any]]) -> str:
+        key = [(m['id'], m['name'], m['size'], m['encoding'], m['uploaded_at']) for m in manifest]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+    @staticmethod
+    def _zip_cache_dir() -> str:
+        return os.path.join(current_app.config['CACHE_DIR'], 'variant_zips')
+
+    @staticmethod
+    def get_zip_cache_path(variant: Variant, manifest_hash: str) -> str:
+        """
+        Архив варианта для его текущей revision. Хеш набора вложений в имени на случай,
+        если SQLite отдаст id удалённого варианта новому.
+        """
+        return os.path.join(
+            AttachmentService._zip_cache_dir(), f'{variant.id}-{variant.revision}-{manifest_hash[:16]}.zip'
+        )
+
+    @staticmethod
+    def prune_zip_cache(variant_id: int, keep_path: Optional[str] = None) -> int:
+        """
+        Удалить архивы варианта, кроме keep_path (недописанные .tmp не трогаем - они заканчиваются на .tmp).
+        :return: сколько файлов удалено
+        """
+        cache_dir = AttachmentService._zip_cache_dir()
+        if not os.path.isdir(cache_dir):
+            return 0
+        removed = 0
+        prefix = f'{variant_id}-'
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.startswith(prefix) and name.endswith('.zip') and path != keep_path:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    @staticmethod
+    def iter_variant_zip(manifest: List[Dict[str, Any]], cache_path: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Потоковая сборка ZIP: файлы читаются из БД по одному, архив целиком в памяти не собирается.
+        """
+        def entries():
+            for item in manifest:
+                data = (
+                    db.session.query(TaskAttachment.data)
+                    .filter(TaskAttachment.id == item['id'])
+                    .scalar()
+                )
+                if data is None:
+                    continue
+                yield (
+                    item['name'],
+                    item['date_time'],
+                    item['compressible'],
+                    item['size'],
+                    iter_decompressed(data, item['encoding']),
+                )
+
+        return iter_zip(entries(), cache_path=cache_path)
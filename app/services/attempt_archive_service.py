@@ -0,0 +1,158 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.extensions import db
+from app.models import (
+    ArchivedAttempt, ArchivedAttemptAnswer, Attempt, AttemptAnswer, AttemptSummary, VariantTask,
+)
+from app.services.user_stats_service import PERFORMANCE_DAYS, UserStatsService
+from app.utils.date_utils import utcnow
+
+ARCHIVED_ATTEMPT_COLUMNS = ('id', 'user_id', 'variant_id', 'started_at', 'finished_at')
+ARCHIVED_ANSWER_COLUMNS = ('id', 'attempt_id', 'variant_task_id', 'answer_text', 'is_correct', 'updated_at')
+# статистика по номерам читает ответы из attempt_answers - архивировать раньше нельзя
+MIN_ARCHIVE_DAYS = PERFORMANCE_DAYS
+
+
+class AttemptArchiveService:
+    """
+    Перенос старых завершённых попыток с ответами из attempts/attempt_answers в архивные таблицы
+    пачками по ATTEMPT_ARCHIVE_BATCH, каждая пачка - своя транзакция. Для профиля остаётся
+    компактный итог попытки (AttemptSummary), так что история и сводка статистики не меняются,
+    а живые таблицы и их индексы перестают расти.
+    """
+
+    @staticmethod
+    def _summaries(attempt_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        attempts = (
+            Attempt.query
+            .options(selectinload(Attempt.answers), joinedload(Attempt.variant))
+            .filter(Attempt.id.in_(attempt_ids))
+            .all()
+        )
+
+        # состав и "полнота" варианта - один раз на вариант в пачке
+        variants: Dict[int, Tuple[List[VariantTask], bool]] = {}
+        summaries = []
+        for attempt in attempts:
+            if attempt.variant_id not in variants:
+                variant_tasks = (
+                    VariantTask.query
+                    .options(joinedload(VariantTask.task))
+                    .filter_by(variant_id=attempt.variant_id)
+                    .all()
+                )
+                variants[attempt.variant_id] = (variant_tasks, UserStatsService.is_full_variant(attempt.variant))
+            variant_tasks, is_full = variants[attempt.variant_id]
+
+            summaries.append({
+                'id': attempt.id,
+                'user_id': attempt.user_id,
+                'variant_id': attempt.variant_id,
+                'variant_source': attempt.variant.source,
+                'started_at': attempt.started_at,
+                'finished_at': attempt.finished_at,
+                'duration': attempt.variant.duration,
+                'is_full_variant': is_full,
+                'correct_display': UserStatsService.count_correct_display(attempt, variant_tasks),
+                'total_display': UserStatsService.count_display_tasks(variant_tasks),
+                'correct_answers': sum(1 for answer in attempt.answers if answer.is_correct is True),
+                'answers_count': len(attempt.answers),
+            })
+        return summaries
+
+    @staticmethod
+    def archive_batch(cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+        """
+        Перенести в архив одну пачку попыток, завершённых раньше cutoff (самые старые первыми).
+        :return: сколько попыток и ответов перенесено
+        """
+        attempt_ids = [
+            row.id for row in
+            db.session.query(Attempt.id)
+            .filter(Attempt.finished_at.isnot(None), Attempt.finished_at < cutoff)
+            .order_by(Attempt.finished_at)
+            .limit(batch_size)
+            .all()
+        ]
+        if not attempt_ids:
+            return 0, 0
+
+        summaries = AttemptArchiveService._summaries(attempt_ids)
+
+        db.session.execute(
+            insert(ArchivedAttempt).from_select(
+                [*ARCHIVED_ATTEMPT_COLUMNS, 'archived_at'],
+                select(
+                    *(getattr(Attempt, name) for name in ARCHIVED_ATTEMPT_COLUMNS),
+                    literal(utcnow(), db.DateTime),
+                ).where(Attempt.id.in_(attempt_ids)),
+            )
+        )
+        answers = db.session.execute(
+            insert(ArchivedAttemptAnswer).from_select(
+                ARCHIVED_ANSWER_COLUMNS,
+                select(*(getattr(AttemptAnswer, name) for name in ARCHIVED_ANSWER_COLUMNS))
+                .where(AttemptAnswer.attempt_id.in_(attempt_ids)),
+            )
+        ).rowcount
+        db.session.execute(insert(AttemptSummary), summaries)
+
+        # ответы удаляем явно: каскад в SQLite работает только с PRAGMA foreign_keys=ON
+        db.session.execute(
+            delete(AttemptAnswer).where(AttemptAnswer.attempt_id.in_(attempt_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            delete(Attempt).where(Attempt.id.in_(attempt_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return len(attempt_ids), answers
+
+    @staticmethod
+    def archive(
+            older_than_days: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            max_batches: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Архивировать все попытки, завершённые раньше чем older_than_days дней назад.
+        :param older_than_days: по умолчанию ATTEMPT_ARCHIVE_DAYS
+        :param batch_size: по умолчанию ATTEMPT_ARCHIVE_BATCH
+        :param max_batches: остановиться после стольких пачек (остальное - в следующий запуск)
+        :raises ValueError: older_than_days меньше MIN_ARCHIVE_DAYS
+        """
+        started = time.perf_counter()
+        older_than_days = older_than_days or current_app.config['ATTEMPT_ARCHIVE_DAYS']
+        if older_than_days < MIN_ARCHIVE_DAYS:
+            raise ValueError(
+                f'Архивировать можно попытки старше {MIN_ARCHIVE_DAYS} дней: '
+                f'статистика по номерам задач читает ответы за этот период'
+            )
+        batch_size = batch_size or current_app.config['ATTEMPT_ARCHIVE_BATCH']
+        cutoff = utcnow() - timedelta(days=older_than_days)
+
+        archived = answers = batches = 0
+        while max_batches is None or batches < max_batches:
+            attempts_count, answers_count = AttemptArchiveService.archive_batch(cutoff, batch_size)
+            if not attempts_count:
+                break
+            archived += attempts_count
+            answers += answers_count
+            batches += 1
+            if attempts_count < batch_size:
+                break
+
+        return {
+            'archived': archived,
+            'answers': answers,
+            'batches': batches,
+            'cutoff': cutoff,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
@@ -1,8 +1,13 @@
+from datetime import datetime, timedelta
 from typing import Dict, Optional
 
+from sqlalchemy import update
+
 from app.extensions import db
-from app.models import Attempt, AttemptAnswer, VariantTask
+from app.models import Attempt, AttemptAnswer, Variant, VariantTask
+from app.services.variant_bundle_service import VariantBundleService
 from app.utils.date_utils import utcnow
+from app.utils.seen_tasks import seen_tasks
 
 
 class AttemptService:
@@ -25,8 +30,53 @@ class AttemptService:
 
         attempt.finished_at = utcnow()
         db.session.commit()
+        seen_tasks.record_attempt(attempt)
         return attempt
 
+    @staticmethod
+    def expire_overdue(now: Optional[datetime] = None) -> int:
+        """
+        Завершить попытки, время которых вышло, а пользователь так и не нажал "Завершить"
+        (закрыл вкладку). Время завершения - момент окончания отведённого времени.
+        Незавершённые попытки читаются по частичному индексу ix_attempts_unfinished.
+        :return: сколько попыток завершено
+        """
+        # SQLite возвращает время без часового пояса
+        now = (now or utcnow()).replace(tzinfo=None)
+        rows = (
+            db.session.query(Attempt.id, Attempt.started_at, Variant.duration)
+            .join(Variant, Attempt.variant_id == Variant.id)
+            .filter(Attempt.finished_at.is_(None))
+            .all()
+        )
+        deadlines = {
+            row.id: row.started_at + timedelta(seconds=row.duration)
+            for row in rows
+            if row.started_at and row.started_at + timedelta(seconds=row.duration) <= now
+        }
+        if not deadlines:
+            return 0
+
+        # условный UPDATE на каждую попытку: пользователь мог завершить её сам после выборки выше,
+        # тогда строка не совпадёт и его время завершения останется
+        expired = [
+            attempt_id for attempt_id, deadline in deadlines.items()
+            if db.session.execute(
+                update(Attempt)
+                .where(Attempt.id == attempt_id, Attempt.finished_at.is_(None))
+                .values(finished_at=deadline)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        ]
+        db.session.commit()
+        if not expired:
+            return 0
+
+        attempts = Attempt.query.filter(Attempt.id.in_(expired)).all()
+        for attempt in attempts:
+            seen_tasks.record_attempt(attempt)
+        return len(expired)
+
     @staticmethod
     def save_answer(attempt_id: int, variant_task_id: int, answer_text: str, user_id: int) -> Optional[AttemptAnswer]:
         attempt = AttemptService.get_attempt(attempt_id, user_id)
@@ -36,17 +86,15 @@ class AttemptService:
         if attempt.finished_at:
             return None
 
-        # Получить VariantTask для доступа к Task
-        variant_task = VariantTask.query.get(variant_task_id)
-        if not variant_task:
+        # ключ проверки берём из скомпилированного варианта, а не из задачи
+        key = VariantBundleService.get_answer_key(VariantBundleService.get(attempt.variant), variant_task_id)
+        if key is None:
             return None
 
-        # Вычислить is_correct
-        correct_answer = variant_task.task.answer
         is_correct = AttemptService._check_answer_correctness(
             user_answer=answer_text,
-            correct_answer=correct_answer,
-            task_number=variant_task.task.number
+            correct_answer=key['answer'],
+            task_number=key['number']
         )
 
         answer = AttemptAnswer.query.filter_by(attempt_id=attempt_id, variant_task_id=variant_task_id).first()
@@ -125,12 +173,7 @@ class AttemptService:
         if not attempt:
             return None
 
-        variant_tasks = (
-            VariantTask.query
-            .filter_by(variant_id=attempt.variant_id)
-            .order_by(VariantTask.order)
-            .all()
-        )
+        bundle = VariantBundleService.get(attempt.variant)
 
         answers = {
             aa.variant_task_id: aa.answer_text
@@ -141,16 +184,14 @@ class AttemptService:
             'attempt': attempt.as_dict,
             'tasks': [
                 {
-                    **vt.task.as_dict,
-                    'variant_task_id': vt.id,
-                    'order': vt.order,
-                    'current_answer': answers.get(vt.id)  # ← ВАЖНО
+                    **task,
+                    'current_answer': answers.get(task['variant_task_id'])
                 }
-                for vt in variant_tasks
+                for task in VariantBundleService.public_tasks(bundle)
             ],
             'stats': {
                 'answered': len([a for a in answers.values() if a]),
-                'total': len(variant_tasks),
+                'total': len(bundle['tasks']),
             }
         }
 
@@ -3,7 +3,7 @@ from typing import Dict, List, Any, Optional
 
 from sqlalchemy import and_
 
-from app.models import User, Task, Variant, Attempt
+from app.models import User, Task, Variant, Attempt, AttemptSummary
 from app.utils.date_utils import utcnow
 
 
@@ -13,8 +13,9 @@ class DashboardService:
         return {
             'total_users': User.query.count(),
             'total_tasks': Task.query.count(),
-            'total_variants': Variant.query.count(),
-            'total_attempts': Attempt.query.count(),
+            'total_variants': Variant.query.filter(Variant.is_pooled.is_(False)).count(),
+            # вместе с перенесёнными в архив
+            'total_attempts': Attempt.query.count() + AttemptSummary.query.count(),
         }
 
     @staticmethod
@@ -41,6 +42,7 @@ class DashboardService:
     def get_recent_variants(limit: int = 5) -> List[Dict[str, Any]]:
         variants = (
             Variant.query
+            .filter(Variant.is_pooled.is_(False))
             .order_by(Variant.created_at.desc())
             .limit(limit)
             .all()
@@ -228,7 +230,7 @@ class DashboardService:
 
         new_users = User.query.filter(User.registered_at >= cutoff_date).count()
         new_tasks = Task.query.filter(Task.published_at >= cutoff_date).count()
-        new_variants = Variant.query.filter(Variant.created_at >= cutoff_date).count()
+        new_variants = Variant.query.filter(Variant.created_at >= cutoff_date, Variant.is_pooled.is_(False)).count()
         new_attempts = Attempt.query.filter(Attempt.started_at >= cutoff_date).count()
 
         return {
@@ -0,0 +1,221 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type
+
+from flask import current_app
+from sqlalchemy import Table, delete, func, select, update
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.extensions import db
+from app.models import (
+    ArchivedAttempt, ArchivedAttemptAnswer, Attempt, AttemptAnswer, AttemptSummary, Task, TaskAttachment, User,
+    UserAvatar, UserRole, Variant, VariantTask,
+)
+from app.models.model_abc import SoftDeleteMixin
+from app.services.attachment_service import AttachmentService
+from app.services.variant_bundle_service import VariantBundleService
+from app.utils.date_utils import utcnow
+from app.utils.revisions import bump_variants_of_tasks
+from app.utils.soft_delete import INCLUDE_DELETED
+
+logger = logging.getLogger(__name__)
+
+_answers = AttemptAnswer.__table__
+_attempts = Attempt.__table__
+_variant_tasks = VariantTask.__table__
+_archived_answers = ArchivedAttemptAnswer.__table__
+_archived_attempts = ArchivedAttempt.__table__
+
+
+class PurgeStep(NamedTuple):
+    """
+    Одна очередь зависимых строк: таблица, условие по id удаляемой сущности и действие.
+    Без key строк заведомо мало (роли, аватар) - они удаляются одним запросом.
+    """
+    name: str
+    table: Table
+    where: Callable[[int], ColumnElement]
+    key: Optional[str] = 'id'
+    # вместо удаления обнулить эту колонку (авторство задач и вариантов)
+    nullify: Optional[str] = None
+
+
+def _answers_of_attempts(condition: ColumnElement) -> ColumnElement:
+    return _answers.c.attempt_id.in_(select(_attempts.c.id).where(condition))
+
+
+# порядок шагов - от листьев к корню, чтобы удаление самой сущности ничего не каскадировало
+PURGE_PLANS: Dict[Type[SoftDeleteMixin], List[PurgeStep]] = {
+    Task: [
+        PurgeStep('attempt_answers', _answers, lambda task_id: _answers.c.variant_task_id.in_(
+            select(_variant_tasks.c.id).where(_variant_tasks.c.task_id == task_id))),
+        PurgeStep('variant_tasks', _variant_tasks, lambda task_id: _variant_tasks.c.task_id == task_id),
+        PurgeStep('task_attachments', TaskAttachment.__table__,
+                  lambda task_id: TaskAttachment.__table__.c.task_id == task_id),
+    ],
+    Variant: [
+        PurgeStep('attempt_answers', _answers,
+                  lambda variant_id: _answers_of_attempts(_attempts.c.variant_id == variant_id)),
+        PurgeStep('attempts', _attempts, lambda variant_id: _attempts.c.variant_id == variant_id),
+        PurgeStep('variant_tasks', _variant_tasks, lambda variant_id: _variant_tasks.c.variant_id == variant_id),
+    ],
+    User: [
+        PurgeStep('attempt_answers', _answers, lambda user_id: _answers_of_attempts(_attempts.c.user_id == user_id)),
+        PurgeStep('attempts', _attempts, lambda user_id: _attempts.c.user_id == user_id),
+        PurgeStep('attempt_answers_archive', _archived_answers, lambda user_id: _archived_answers.c.attempt_id.in_(
+            select(_archived_attempts.c.id).where(_archived_attempts.c.user_id == user_id))),
+        PurgeStep('attempts_archive', _archived_attempts, lambda user_id: _archived_attempts.c.user_id == user_id),
+        PurgeStep('attempt_summaries', AttemptSummary.__table__,
+                  lambda user_id: AttemptSummary.__table__.c.user_id == user_id),
+        PurgeStep('tasks.author_id', Task.__table__, lambda user_id: Task.__table__.c.author_id == user_id,
+                  nullify='author_id'),
+        PurgeStep('variants.author_id', Variant.__table__, lambda user_id: Variant.__table__.c.author_id == user_id,
+                  nullify='author_id'),
+        PurgeStep('user_roles', UserRole.__table__, lambda user_id: UserRole.__table__.c.user_id == user_id, key=None),
+        PurgeStep('user_avatars', UserAvatar.__table__, lambda user_id: UserAvatar.__table__.c.user_id == user_id),
+    ],
+}
+
+ENTITY_NAMES = {Task: 'task', Variant: 'variant', User: 'user'}
+
+
+class PurgeService:
+    """
+    Удаление задач, вариантов и пользователей в два этапа. soft_delete только ставит deleted_at -
+    сущность сразу пропадает из выборок, а запрос пользователя не ждёт каскада по variant_tasks,
+    attempts и attempt_answers. Затем фоновая очистка (PURGE_INTERVAL) удаляет зависимые строки
+    пачками по PURGE_BATCH_SIZE, каждая пачка - отдельная короткая транзакция, и в конце саму строку.
+    """
+
+    @staticmethod
+    def soft_delete(entity: SoftDeleteMixin, commit: bool = True) -> None:
+        entity.deleted_at = utcnow()
+        if isinstance(entity, Task):
+            # варианты с этой задачей пересобираются уже без неё (бандл выбирает задачи с фильтром)
+            bump_variants_of_tasks(db.session.connection(), [entity.id])
+        if commit:
+            db.session.commit()
+
+    @staticmethod
+    def _next_pending() -> Optional[tuple]:
+        """
+        Самая давно удалённая сущность среди всех моделей: (модель, id).
+        """
+        candidates = []
+        for model in PURGE_PLANS:
+            row = (
+                db.session.query(model.id, model.deleted_at)
+                .filter(model.deleted_at.isnot(None))
+                .order_by(model.deleted_at, model.id)
+                .execution_options(**{INCLUDE_DELETED: True})
+                .first()
+            )
+            if row is not None:
+                candidates.append((row.deleted_at, ENTITY_NAMES[model], model, row.id))
+        if not candidates:
+            return None
+        _, _, model, entity_id = min(candidates)
+        return model, entity_id
+
+    @staticmethod
+    def _run_step(step: PurgeStep, entity_id: int, batch_size: int) -> int:
+        condition = step.where(entity_id)
+        if step.key is None:
+            return db.session.execute(delete(step.table).where(condition)).rowcount
+
+        key = step.table.c[step.key]
+        ids = db.session.execute(select(key).where(condition).limit(batch_size)).scalars().all()
+        if not ids:
+            return 0
+        if step.nullify:
+            statement = update(step.table).values({step.nullify: None})
+        else:
+            statement = delete(step.table)
+        db.session.execute(statement.where(key.in_(ids)))
+        return len(ids)
+
+    @staticmethod
+    def purge_batch(batch_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Одна короткая транзакция очистки: следующая пачка зависимых строк самой давно удалённой
+        сущности, а когда их не осталось - сама сущность.
+        :return: что сделано, или None, если очищать нечего
+        """
+        batch_size = batch_size or current_app.config['PURGE_BATCH_SIZE']
+        pending = PurgeService._next_pending()
+        if pending is None:
+            return None
+        model, entity_id = pending
+
+        progress = {'entity': ENTITY_NAMES[model], 'id': entity_id, 'done': False}
+        try:
+            for step in PURGE_PLANS[model]:
+                rows = PurgeService._run_step(step, entity_id, batch_size)
+                if rows:
+                    progress.update(step=step.name, rows=rows)
+                    break
+            else:
+                db.session.execute(delete(model.__table__).where(model.__table__.c.id == entity_id))
+                progress.update(step=model.__tablename__, rows=1, done=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if progress['done'] and model is Variant:
+            # файлы на диске по id варианта больше никому не понадобятся
+            VariantBundleService.prune_disk(entity_id)
+            AttachmentService.prune_zip_cache(entity_id)
+        return progress
+
+    @staticmethod
+    def run(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Очищать пачками, пока есть что очищать (или до max_batches транзакций). Ход очистки - в лог.
+        """
+        started = time.perf_counter()
+        report = {'batches': 0, 'rows': 0, 'purged': []}
+        while max_batches is None or report['batches'] < max_batches:
+            progress = PurgeService.purge_batch(batch_size)
+            if progress is None:
+                break
+            report['batches'] += 1
+            report['rows'] += progress['rows']
+            if progress['done']:
+                report['purged'].append(f"{progress['entity']}#{progress['id']}")
+                logger.info('Очистка: %s #%s удалён полностью', progress['entity'], progress['id'])
+            else:
+                logger.info('Очистка: %s #%s - удалено строк %s: %d',
+                            progress['entity'], progress['id'], progress['step'], progress['rows'])
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+    @staticmethod
+    def status() -> List[Dict[str, Any]]:
+        """
+        Сущности, ждущие очистки, и сколько зависимых строк у каждой осталось.
+        """
+        result = []
+        for model, plan in PURGE_PLANS.items():
+            pending = (
+                db.session.query(model.id, model.deleted_at)
+                .filter(model.deleted_at.isnot(None))
+                .order_by(model.deleted_at, model.id)
+                .execution_options(**{INCLUDE_DELETED: True})
+                .all()
+            )
+            for entity_id, deleted_at in pending:
+                remaining = {
+                    step.name: db.session.execute(
+                        select(func.count()).select_from(step.table).where(step.where(entity_id))
+                    ).scalar()
+                    for step in plan
+                }
+                result.append({
+                    'entity': ENTITY_NAMES[model],
+                    'id': entity_id,
+                    'deleted_at': deleted_at,
+                    'remaining': {name: count for name, count in remaining.items() if count},
+                })
+        result.sort(key=lambda item: item['deleted_at'])
+        return result
@@ -0,0 +1,173 @@
+import csv
+import io
+import os
+import secrets
+import string
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Role, User, UserRole
+from app.models.roles import DefaultRoles
+from app.models.users import USERNAME_RETRIES
+from app.utils.date_utils import utcnow
+from app.utils.password_utils import hash_passwords
+
+ROSTER_COLUMNS = ('last_name', 'first_name', 'middle_name', 'password')
+REQUIRED_COLUMNS = ('last_name', 'first_name')
+# ограничения длины - как у колонок users
+FIELD_LIMITS = {'last_name': 40, 'first_name': 20, 'middle_name': 20}
+GENERATED_PASSWORD_LENGTH = 12
+
+
+class UserImportService:
+    """
+    Массовое создание пользователей по списку класса: имена пользователей подбираются
+    на весь список сразу (User.generate_usernames), пароли хешируются в пуле процессов, строки users и user_roles
+    вставляются пачкой (executemany), а не по одному объекту через сессию.
+    """
+
+    @staticmethod
+    def parse_roster(text: str) -> List[Dict[str, Optional[str]]]:
+        """
+        Разобрать CSV со столбцами last_name, first_name, middle_name, password
+        (разделитель - запятая или точка с запятой). Пустой пароль будет сгенерирован.
+        :raises ValueError: при отсутствии обязательных столбцов или некорректной строке
+        """
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        missing = [name for name in REQUIRED_COLUMNS if name not in header]
+        if missing:
+            raise ValueError(f'В файле нет столбцов: {", ".join(missing)}')
+        reader.fieldnames = header
+
+        rows = []
+        # строка 1 - заголовок
+        for line_no, raw in enumerate(reader, start=2):
+            row = {name: (raw.get(name) or '').strip() or None for name in ROSTER_COLUMNS}
+            if not any(row.values()):
+                continue
+            for name in REQUIRED_COLUMNS:
+                if not row[name]:
+                    raise ValueError(f'Строка {line_no}: не заполнено поле {name}')
+            for name, limit in FIELD_LIMITS.items():
+                if row[name] and len(row[name]) > limit:
+                    raise ValueError(f'Строка {line_no}: {name} длиннее {limit} символов')
+            rows.append(row)
+        if not rows:
+            raise ValueError('В файле нет ни одного пользователя')
+        return rows
+
+    @staticmethod
+    def generate_password() -> str:
+        """
+        Случайный пароль, проходящий password_validator: есть строчная, прописная, цифра и спецсимвол.
+        """
+        groups = [string.ascii_lowercase, string.ascii_uppercase, string.digits, '!@#$%^&*-_']
+        chars = [secrets.choice(group) for group in groups]
+        alphabet = ''.join(groups)
+        chars += [secrets.choice(alphabet) for _ in range(GENERATED_PASSWORD_LENGTH - len(chars))]
+        secrets.SystemRandom().shuffle(chars)
+        return ''.join(chars)
+
+    @staticmethod
+    def _insert(rows, usernames: Sequence[str], hashes: Sequence[str], role_ids: Sequence[int]) -> List[int]:
+        now = utcnow()
+        params = [
+            {
+                'username': username,
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'middle_name': row['middle_name'],
+                'password_hash': password_hash,
+                'registered_at': now,
+            }
+            for row, username, password_hash in zip(rows, usernames, hashes)
+        ]
+        if db.session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            user_ids = db.session.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True), params,
+            ).scalars().all()
+        else:
+            # MySQL и др.: RETURNING для executemany не поддерживается - id забираем по уникальным username
+            db.session.execute(insert(User), params)
+            ids = dict(db.session.query(User.username, User.id).filter(User.username.in_(usernames)).all())
+            user_ids = [ids[username] for username in usernames]
+        if role_ids:
+            db.session.execute(
+                insert(UserRole),
+                [{'user_id': user_id, 'role_id': role_id} for user_id in user_ids for role_id in role_ids],
+            )
+        return user_ids
+
+    @staticmethod
+    def import_users(
+            rows: Sequence[Dict[str, Optional[str]]],
+            role_names: Iterable[str] = (DefaultRoles.user.value,),
+            workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Создать пользователей одной транзакцией.
+        :param rows: строки из parse_roster
+        :param role_names: роли, которые получат все созданные пользователи
+        :param workers: процессов для хеширования; по умолчанию USER_IMPORT_WORKERS или число ядер
+        :return: созданные пользователи (со сгенерированными паролями) и скорость импорта
+        """
+        started = time.perf_counter()
+        workers = workers or current_app.config.get('USER_IMPORT_WORKERS') or os.cpu_count() or 1
+
+        role_names = set(role_names)
+        roles = dict(db.session.query(Role.name, Role.id).filter(Role.name.in_(role_names)).all())
+        unknown = role_names - roles.keys()
+        if unknown:
+            raise ValueError(f'Неизвестные роли: {", ".join(sorted(unknown))}')
+        role_ids = list(roles.values())
+
+        generated = [None if row['password'] else UserImportService.generate_password() for row in rows]
+        passwords = [row['password'] or password for row, password in zip(rows, generated)]
+
+        hash_started = time.perf_counter()
+        hashes = hash_passwords(passwords, workers=workers)
+        hash_seconds = time.perf_counter() - hash_started
+
+        people = [(row['first_name'], row['last_name'], row['middle_name']) for row in rows]
+        for attempt in range(USERNAME_RETRIES):
+            usernames = User.generate_usernames(people)
+            try:
+                with db.session.begin_nested():
+                    user_ids = UserImportService._insert(rows, usernames, hashes, role_ids)
+                break
+            except IntegrityError:
+                # имя успели занять параллельно - подбираем имена заново, хеши остаются
+                if attempt == USERNAME_RETRIES - 1:
+                    raise
+        db.session.commit()
+
+        total_seconds = time.perf_counter() - started
+        return {
+            'created': len(user_ids),
+            'users': [
+                {
+                    'id': user_id,
+                    'username': username,
+                    'last_name': row['last_name'],
+                    'first_name': row['first_name'],
+                    'middle_name': row['middle_name'],
+                    # сгенерированный пароль показывается один раз - в БД только хеш
+                    'password': password,
+                }
+                for user_id, username, row, password in zip(user_ids, usernames, rows, generated)
+            ],
+            'workers': workers,
+            'hash_seconds': round(hash_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'users_per_sec': round(len(user_ids) / total_seconds, 1) if total_seconds else None,
+        }
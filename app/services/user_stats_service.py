@@ -2,9 +2,12 @@ from typing import Dict, List, Any, Optional
 from datetime import timedelta
 from sqlalchemy import and_
 
-from app.models import Attempt, Variant, VariantTask
+from app.models import Attempt, AttemptSummary, Variant, VariantTask
 from app.utils.date_utils import utcnow
 
+# за сколько дней по умолчанию считается статистика по номерам задач (по живым ответам попыток)
+PERFORMANCE_DAYS = 90
+
 
 class UserStatsService:
     """
@@ -31,38 +34,7 @@ class UserStatsService:
 
             # Подсчёт реального количества задач для отображения
             total_display_tasks = attempt.variant.total_display_tasks
-            correct_count = 0
-
-            for vt in variant_tasks:
-                answer = next((a for a in attempt.answers if a.variant_task_id == vt.id), None)
-
-                # Если ответа нет вообще - пропускаем
-                if not answer:
-                    continue
-
-                # Обработка задачи 19 (отдельно для каждой ячейки)
-                if vt.task.number == 19:
-                    # Задача 19: проверяем каждую ячейку отдельно (формат CSV: "A,B,C")
-                    try:
-                        # Парсим CSV
-                        user_cells = [c.strip() for c in (answer.answer_text.split(',') if answer.answer_text else [])]
-                        correct_cells = [c.strip() for c in (vt.task.answer.split(',') if vt.task.answer else [])]
-
-                        # Проверяем каждую ячейку (максимум 3)
-                        for i in range(3):
-                            user_val = user_cells[i] if i < len(user_cells) else ''
-                            correct_val = correct_cells[i] if i < len(correct_cells) else ''
-
-                            # Если ячейка заполнена и правильная - считаем
-                            if user_val and correct_val and user_val.lower() == correct_val.lower():
-                                correct_count += 1
-                    except (IndexError, AttributeError, ValueError):
-                        # При ошибке парсинга не засчитываем ничего
-                        pass
-                else:
-                    # Обычная задача: используем поле is_correct
-                    if answer.is_correct:
-                        correct_count += 1
+            correct_count = UserStatsService.count_correct_display(attempt, variant_tasks)
 
             score = (correct_count / total_display_tasks * 100) if total_display_tasks > 0 else 0
 
@@ -78,8 +50,76 @@ class UserStatsService:
                 'is_full_variant': UserStatsService.is_full_variant(attempt.variant),
             })
 
+        # старые попытки перенесены в архив (AttemptArchiveService) - они всегда раньше живых
+        if len(result) < limit:
+            archived = (
+                AttemptSummary.query
+                .filter_by(user_id=user_id)
+                .order_by(AttemptSummary.finished_at.desc())
+                .limit(limit - len(result))
+                .all()
+            )
+            result.extend(UserStatsService._summary_as_dict(summary) for summary in archived)
+
         return result
 
+    @staticmethod
+    def _summary_as_dict(summary: AttemptSummary) -> Dict[str, Any]:
+        score = (summary.correct_display / summary.total_display * 100) if summary.total_display > 0 else 0
+        return {
+            'id': summary.id,
+            'variant_source': summary.variant_source or f'Вариант #{summary.variant_id}',
+            'started_at': summary.started_at.strftime('%d.%m.%Y %H:%M') if summary.started_at else None,
+            'finished_at': summary.finished_at.strftime('%d.%m.%Y %H:%M'),
+            'duration': summary.duration,
+            'correct_answers': summary.correct_display,
+            'total_answers': summary.total_display,
+            'score': round(score, 2),
+            'is_full_variant': summary.is_full_variant,
+            # ответов архивной попытки в живых таблицах нет - подробного разбора не будет
+            'is_archived': True,
+        }
+
+    @staticmethod
+    def count_correct_display(attempt: Attempt, variant_tasks: List[VariantTask]) -> int:
+        """
+        Количество верных ответов в ячейках для отображения: задача 19 проверяется по каждой из трёх ячеек
+        """
+        correct_count = 0
+
+        for vt in variant_tasks:
+            answer = next((a for a in attempt.answers if a.variant_task_id == vt.id), None)
+
+            # Если ответа нет вообще - пропускаем
+            if not answer:
+                continue
+
+            # Обработка задачи 19 (отдельно для каждой ячейки)
+            if vt.task.number == 19:
+                # Задача 19: проверяем каждую ячейку отдельно (формат CSV: "A,B,C")
+                try:
+                    # Парсим CSV
+                    user_cells = [c.strip() for c in (answer.answer_text.split(',') if answer.answer_text else [])]
+                    correct_cells = [c.strip() for c in (vt.task.answer.split(',') if vt.task.answer else [])]
+
+                    # Проверяем каждую ячейку (максимум 3)
+                    for i in range(3):
+                        user_val = user_cells[i] if i < len(user_cells) else ''
+                        correct_val = correct_cells[i] if i < len(correct_cells) else ''
+
+                        # Если ячейка заполнена и правильная - считаем
+                        if user_val and correct_val and user_val.lower() == correct_val.lower():
+                            correct_count += 1
+                except (IndexError, AttributeError, ValueError):
+                    # При ошибке парсинга не засчитываем ничего
+                    pass
+            else:
+                # Обычная задача: используем поле is_correct
+                if answer.is_correct:
+                    correct_count += 1
+
+        return correct_count
+
     @staticmethod
     def is_full_variant(variant: Variant) -> bool:
         tasks = VariantTask.query.filter_by(variant_id=variant.id).all()
@@ -214,7 +254,7 @@ class UserStatsService:
         return details
 
     @staticmethod
-    def get_performance_by_task_number(user_id: int, days: int = 90) -> Dict[int, Dict[str, Any]]:
+    def get_performance_by_task_number(user_id: int, days: int = PERFORMANCE_DAYS) -> Dict[int, Dict[str, Any]]:
         """
         Получить статистику по каждому номеру задачи (1-27) за период
         """
@@ -272,7 +312,22 @@ class UserStatsService:
             .all()
         )
 
-        trends = []
+        archived = (
+            AttemptSummary.query
+            .filter_by(user_id=user_id, is_full_variant=True)
+            .order_by(AttemptSummary.finished_at)
+            .all()
+        )
+        trends = [
+            {
+                'date': summary.finished_at.strftime('%d.%m.%Y'),
+                'time_minutes': round((summary.finished_at - summary.started_at).total_seconds() / 60, 1),
+                'correct_answers': summary.correct_answers,
+                'total_answers': summary.answers_count,
+            }
+            for summary in archived
+            if summary.started_at
+        ]
         for attempt in attempts:
             if not UserStatsService.is_full_variant(attempt.variant):
                 continue
@@ -301,9 +356,18 @@ class UserStatsService:
             .all()
         )
 
-        if not attempts:
+        archived = (
+            AttemptSummary.query
+            .with_entities(AttemptSummary.correct_answers, AttemptSummary.answers_count,
+                           AttemptSummary.is_full_variant)
+            .filter_by(user_id=user_id)
+            .all()
+        )
+
+        if not attempts and not archived:
             return {
                 'total_attempts': 0,
+                'archived_attempts': 0,
                 'average_score': 0,
                 'best_score': 0,
                 'full_variants_count': 0,
@@ -323,8 +387,15 @@ class UserStatsService:
             if UserStatsService.is_full_variant(attempt.variant):
                 full_count += 1
 
+        for correct, total, is_full in archived:
+            score = (correct / total * 100) if total > 0 else 0
+            scores.append(score)
+            best_score = max(best_score, score)
+            full_count += bool(is_full)
+
         return {
-            'total_attempts': len(attempts),
+            'total_attempts': len(attempts) + len(archived),
+            'archived_attempts': len(archived),
             'average_score': round(sum(scores) / len(scores), 2) if scores else 0,
             'best_score': round(best_score, 2),
             'full_variants_count': full_count,
@@ -0,0 +1,181 @@
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, url_for
+
+from app.extensions import cache, db
+from app.models import Task, TaskAttachment, Variant, VariantTask
+from app.utils.text_utils import sanitize_html
+
+# меняется при изменении структуры бандла, чтобы не читать с диска старый формат
+BUNDLE_FORMAT = 1
+
+
+class VariantBundleService:
+    """
+    Скомпилированный вариант: задачи по порядку, очищенные условия, вложения без содержимого,
+    количество задач для отображения и ключи проверки. Собирается один раз на ревизию варианта
+    (Variant.revision) и хранится в кеше процесса и на диске, так что все попытки по одному варианту
+    читают готовую структуру, а не собирают список задач заново.
+    Ключи проверки лежат отдельно от задач и наружу не отдаются (см. public_tasks).
+    """
+
+    @staticmethod
+    def _bundle_id(variant: Variant) -> str:
+        # SQLite может выдать id удалённого варианта новому, поэтому в ключе есть случайный токен строки
+        return f'{variant.id}-{variant.bundle_token}-{variant.revision}.v{BUNDLE_FORMAT}'
+
+    @staticmethod
+    def _disk_dir() -> str:
+        return os.path.join(current_app.config['CACHE_DIR'], 'variant_bundles')
+
+    @staticmethod
+    def _disk_path(bundle_id: str) -> str:
+        return os.path.join(VariantBundleService._disk_dir(), f'{bundle_id}.json')
+
+    @staticmethod
+    def prune_disk(variant_id: int, keep_path: Optional[str] = None) -> int:
+        """
+        Удалить с диска бандлы варианта, кроме keep_path: прошлые ревизии при записи новой
+        и все бандлы при окончательном удалении варианта.
+        :return: сколько файлов удалено
+        """
+        disk_dir = VariantBundleService._disk_dir()
+        if not os.path.isdir(disk_dir):
+            return 0
+        removed = 0
+        prefix = f'{variant_id}-'
+        for name in os.listdir(disk_dir):
+            path = os.path.join(disk_dir, name)
+            if name.startswith(prefix) and name.endswith('.json') and path != keep_path:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    @staticmethod
+    def compile(variant_id: int, revision: int) -> Dict[str, Any]:
+        """
+        Собрать бандл двумя запросами: состав с задачами и метаданные вложений.
+        """
+        rows = (
+            db.session.query(
+                VariantTask.id.label('variant_task_id'),
+                VariantTask.order,
+                Task.id.label('task_id'),
+                Task.number,
+                Task.statement_html,
+                Task.answer,
+            )
+            .join(Task, VariantTask.task_id == Task.id)
+            .filter(VariantTask.variant_id == variant_id)
+            .order_by(VariantTask.order, VariantTask.id)
+            .all()
+        )
+
+        attachments: Dict[int, List[Dict[str, Any]]] = {}
+        if rows:
+            for a in (
+                db.session.query(TaskAttachment.id, TaskAttachment.task_id, TaskAttachment.filename,
+                                 TaskAttachment.content_type, TaskAttachment.size)
+                .filter(TaskAttachment.task_id.in_({row.task_id for row in rows}))
+                .order_by(TaskAttachment.id)
+                .all()
+            ):
+                attachments.setdefault(a.task_id, []).append({
+                    'id': a.id,
+                    'filename': a.filename,
+                    'content_type': a.content_type,
+                    'size': a.size,
+                })
+
+        tasks = []
+        answers = {}
+        for row in rows:
+            tasks.append({
+                'variant_task_id': row.variant_task_id,
+                'task_id': row.task_id,
+                'number': row.number,
+                'order': row.order,
+                'statement_html': sanitize_html(row.statement_html),
+                'attachments': attachments.get(row.task_id, []),
+            })
+            # ключи в JSON - строки, поэтому и в памяти храним строковые
+            answers[str(row.variant_task_id)] = {'number': row.number, 'answer': row.answer}
+
+        return {
+            'format': BUNDLE_FORMAT,
+            'variant_id': variant_id,
+            'revision': revision,
+            'tasks': tasks,
+            # задача 19 в КИМ занимает три номера (19, 20, 21)
+            'total_display_tasks': sum(3 if task['number'] == 19 else 1 for task in tasks),
+            'has_attachments': any(task['attachments'] for task in tasks),
+            'answers': answers,
+        }
+
+    @staticmethod
+    def _read_disk(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_disk(path: str, bundle: Dict[str, Any]) -> None:
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(bundle, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError:
+            # диск - лишь второй уровень кеша, без него всё работает
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def get(variant: Variant) -> Dict[str, Any]:
+        bundle_id = VariantBundleService._bundle_id(variant)
+        key = ('variant_bundle', bundle_id)
+        bundle = cache.get(key)
+        if bundle is not None:
+            return bundle
+
+        path = VariantBundleService._disk_path(bundle_id)
+        bundle = VariantBundleService._read_disk(path)
+        if bundle is None:
+            bundle = VariantBundleService.compile(variant.id, variant.revision)
+            VariantBundleService._write_disk(path, bundle)
+            VariantBundleService.prune_disk(variant.id, keep_path=path)
+
+        # ключ включает ревизию, так что устаревшие бандлы просто вытесняются из LRU
+        cache.set(key, bundle, ttl=None)
+        return bundle
+
+    @staticmethod
+    def get_answer_key(bundle: Dict[str, Any], variant_task_id: int) -> Optional[Dict[str, Any]]:
+        return bundle['answers'].get(str(variant_task_id))
+
+    @staticmethod
+    def public_tasks(bundle: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Задачи для клиента: без ключей проверки, со ссылками на скачивание вложений.
+        """
+        return [
+            {
+                **task,
+                'attachments': [
+                    {**a, 'download_url': url_for('attachments.download_attachment', attachment_id=a['id'])}
+                    for a in task['attachments']
+                ],
+            }
+            for task in bundle['tasks']
+        ]
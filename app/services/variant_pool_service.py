@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import Variant
+from app.services.variant_services import VariantService
+from app.utils.date_utils import utcnow
+from app.utils.variant_utils import FULL_VARIANT_SPECS, build_tasks_set
+
+# по скольким последним выдачам считать перцентили задержки
+LATENCY_WINDOW = 1000
+
+
+class _PoolMetrics:
+    """
+    Счётчики пула в памяти процесса: выдачи, промахи и задержка выдачи.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self.claims = 0
+        self.misses = 0
+        self.generated = 0
+
+    def record_claim(self, seconds: float, hit: bool) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            if hit:
+                self.claims += 1
+            else:
+                self.misses += 1
+
+    def record_generated(self, count: int) -> None:
+        with self._lock:
+            self.generated += count
+
+    def latency_ms(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._latencies)
+        if not values:
+            return None
+        index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+        return round(values[index] * 1000, 3)
+
+
+metrics = _PoolMetrics()
+
+
+class VariantPoolService:
+    """
+    Пул заранее сгенерированных полных вариантов. Варианты лежат в таблице variants с is_pooled=True
+    и без автора; выдача - один атомарный UPDATE, так что массовая генерация на уроке
+    не упирается в выбор задач и пачку коммитов на каждый запрос.
+    """
+
+    @staticmethod
+    def target_size() -> int:
+        return current_app.config.get('VARIANT_POOL_SIZE') or 0
+
+    @staticmethod
+    def depth() -> int:
+        return db.session.query(Variant.id).filter(Variant.is_pooled.is_(True)).count()
+
+    @staticmethod
+    def refill(limit: Optional[int] = None) -> int:
+        """
+        Догенерировать пул до VARIANT_POOL_SIZE (не больше limit вариантов за вызов).
+        Возвращает количество созданных вариантов.
+        """
+        missing = VariantPoolService.target_size() - VariantPoolService.depth()
+        if limit is not None:
+            missing = min(missing, limit)
+
+        created = 0
+        for _ in range(max(missing, 0)):
+            tasks = build_tasks_set(FULL_VARIANT_SPECS)
+            if len(tasks) < len(FULL_VARIANT_SPECS):
+                # в банке не хватает задач на полный вариант - неполные в пул не кладём
+                break
+            VariantService.create_variant([task.id for task in tasks], is_pooled=True)
+            created += 1
+
+        metrics.record_generated(created)
+        return created
+
+    @staticmethod
+    def claim(author_id: Optional[int]) -> Optional[int]:
+        """
+        Забрать готовый вариант из пула. Возвращает id варианта или None, если пул пуст.
+        Параллельные запросы (весь класс разом) получают разные варианты без повторных попыток:
+        - где UPDATE умеет RETURNING (SQLite, PostgreSQL, MariaDB) - одним
+          UPDATE ... WHERE id = (SELECT id ... WHERE is_pooled LIMIT 1) RETURNING id,
+          запись в SQLite идёт по очереди, и подзапрос каждого видит уже забранные варианты;
+        - иначе (MySQL) - SELECT ... FOR UPDATE SKIP LOCKED: строку, заблокированную соседним
+          запросом, пропускаем и берём следующую.
+        """
+        started = time.perf_counter()
+        values = dict(is_pooled=False, author_id=author_id, created_at=utcnow(), revision=Variant.revision + 1)
+        pooled = select(Variant.id).where(Variant.is_pooled.is_(True)).order_by(Variant.id).limit(1)
+        try:
+            if db.session.get_bind().dialect.update_returning:
+                variant_id = db.session.execute(
+                    update(Variant)
+                    .where(Variant.id == pooled.scalar_subquery(), Variant.is_pooled.is_(True))
+                    .values(**values)
+                    .returning(Variant.id)
+                    .execution_options(synchronize_session=False)
+                ).scalar()
+            else:
+                variant_id = db.session.execute(pooled.with_for_update(skip_locked=True)).scalar()
+                if variant_id is not None:
+                    db.session.execute(
+                        update(Variant)
+                        .where(Variant.id == variant_id)
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        metrics.record_claim(time.perf_counter() - started, hit=variant_id is not None)
+        return variant_id
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        return {
+            'target_size': VariantPoolService.target_size(),
+            'depth': VariantPoolService.depth(),
+            'claims': metrics.claims,
+            'misses': metrics.misses,
+            'generated': metrics.generated,
+            'claim_latency_p50_ms': metrics.latency_ms(50),
+            'claim_latency_p99_ms': metrics.latency_ms(99),
+        }
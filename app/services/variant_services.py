@@ -1,6 +1,16 @@
-from typing import List
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from app.models import Variant
+from sqlalchemy import case, delete, func, insert, literal, select, update
+
+from app.extensions import db
+from app.models import Task, Variant, VariantTask
+from app.utils.revisions import bump_variants
+from app.utils.text_utils import escape_like
+from app.utils.variant_utils import FULL_VARIANT_NUMBERS
+
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
 
 
 class VariantService:
@@ -12,3 +22,255 @@ class VariantService:
             .order_by(Variant.created_at.desc())
             .all()
         )
+
+    @staticmethod
+    def get_task_ids(variant_id: int) -> List[int]:
+        """
+        id задач варианта в порядке следования, без загрузки самих задач
+        """
+        rows = (
+            db.session.query(VariantTask.task_id)
+            .filter(VariantTask.variant_id == variant_id)
+            .order_by(VariantTask.order, VariantTask.id)
+            .all()
+        )
+        return [row.task_id for row in rows]
+
+    @staticmethod
+    def insert_variant_tasks(rows: Sequence[Dict[str, int]]) -> None:
+        """
+        Вставка строк variant_tasks одним executemany (rows: variant_id, task_id, order).
+        Коммит остаётся за вызывающим кодом.
+        """
+        if rows:
+            db.session.execute(insert(VariantTask), list(rows))
+            # массовая вставка идёт мимо событий маппера - ревизии вариантов двигаем сами
+            bump_variants(db.session.connection(), (row['variant_id'] for row in rows))
+
+    @staticmethod
+    def add_tasks(variant_id: int, task_ids: Iterable[int], start_order: int = 0) -> List[Dict[str, int]]:
+        """
+        Добавить задачи в вариант пачкой. Возвращает состав в том виде, в каком он был вставлен.
+        """
+        composition = [
+            {'variant_id': variant_id, 'task_id': task_id, 'order': order}
+            for order, task_id in enumerate(task_ids, start=start_order)
+        ]
+        VariantService.insert_variant_tasks(composition)
+        return composition
+
+    @staticmethod
+    def create_variant(task_ids: Iterable[int],
+                       author_id: Optional[int] = None,
+                       source: Optional[str] = None,
+                       duration: Optional[int] = None,
+                       is_pooled: bool = False,
+                       commit: bool = True) -> Tuple[Variant, List[Dict[str, int]]]:
+        """
+        Создание варианта вместе с составом в одной транзакции:
+        flush варианта ради id, затем все variant_tasks одной пачкой.
+        """
+        variant = Variant(author_id=author_id, source=source, is_pooled=is_pooled)
+        if duration is not None:
+            variant.duration = duration
+        db.session.add(variant)
+        try:
+            db.session.flush()
+            composition = VariantService.add_tasks(variant.id, task_ids)
+            if commit:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return variant, composition
+
+    @staticmethod
+    def clone_variant(variant_id: int,
+                      author_id: Optional[int] = None,
+                      substitutions: Optional[Dict[int, int]] = None,
+                      source: Optional[str] = None,
+                      commit: bool = True) -> Variant:
+        """
+        Копия варианта: строка variants через ORM, состав - одним INSERT INTO variant_tasks ... SELECT
+        внутри СУБД, без выгрузки задач в приложение.
+        substitutions: {id заменяемой задачи: id новой задачи} - замены применяются в том же INSERT через CASE.
+        При некорректных заменах бросает ValueError, ничего не создавая.
+        """
+        original = db.session.get(Variant, variant_id)
+        if original is None:
+            raise ValueError('Вариант не найден')
+
+        substitutions = {int(old): int(new) for old, new in (substitutions or {}).items() if int(old) != int(new)}
+        if substitutions:
+            current = VariantService.get_task_ids(variant_id)
+            missing = set(substitutions) - set(current)
+            if missing:
+                raise ValueError(f'Задач нет в варианте: {", ".join(map(str, sorted(missing)))}')
+            existing = {
+                row.id for row in
+                db.session.query(Task.id).filter(Task.id.in_(set(substitutions.values()))).all()
+            }
+            unknown = set(substitutions.values()) - existing
+            if unknown:
+                raise ValueError(f'Задачи не найдены: {", ".join(map(str, sorted(unknown)))}')
+            result = [substitutions.get(task_id, task_id) for task_id in current]
+            if len(set(result)) != len(result):
+                raise ValueError('После замены задачи в варианте повторяются')
+
+        copy = Variant(
+            author_id=author_id,
+            source=source if source is not None else original.source,
+            duration=original.duration,
+        )
+        db.session.add(copy)
+        try:
+            db.session.flush()
+            task_id = VariantTask.task_id
+            if substitutions:
+                task_id = case(substitutions, value=VariantTask.task_id, else_=VariantTask.task_id)
+            db.session.execute(
+                insert(VariantTask).from_select(
+                    ['variant_id', 'task_id', 'order'],
+                    select(literal(copy.id), task_id, VariantTask.order)
+                    .where(VariantTask.variant_id == variant_id)
+                    .order_by(VariantTask.order, VariantTask.id),
+                )
+            )
+            if commit:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return copy
+
+    @staticmethod
+    def set_composition(variant_id: int, task_ids: Sequence[int]) -> List[Dict[str, int]]:
+        """
+        Привести состав варианта к заданному упорядоченному списку задач одной транзакцией:
+        удаление лишних строк, пачка вставок новых и один UPDATE ... CASE для порядка оставшихся.
+        Строки сохранившихся задач (и ответы попыток на них) не пересоздаются, мягко удалённые
+        задачи, уже входящие в вариант, можно оставить или переставить.
+        При некорректном списке бросает ValueError, ничего не меняя.
+        """
+        task_ids = [int(task_id) for task_id in task_ids]
+        if len(set(task_ids)) != len(task_ids):
+            raise ValueError('Задачи в списке повторяются')
+
+        current = {
+            row.task_id: (row.id, row.order) for row in
+            db.session.query(VariantTask.id, VariantTask.task_id, VariantTask.order)
+            .filter(VariantTask.variant_id == variant_id)
+            .all()
+        }
+        # задачи, уже стоящие в варианте, остаются допустимыми и после мягкого удаления
+        new_ids = [task_id for task_id in task_ids if task_id not in current]
+        if new_ids:
+            existing = {row.id for row in db.session.query(Task.id).filter(Task.id.in_(new_ids)).all()}
+            unknown = [task_id for task_id in new_ids if task_id not in existing]
+            if unknown:
+                raise ValueError(f'Задачи не найдены: {", ".join(map(str, unknown))}')
+
+        desired = {task_id: order for order, task_id in enumerate(task_ids)}
+
+        removed = [task_id for task_id in current if task_id not in desired]
+        added = [
+            {'variant_id': variant_id, 'task_id': task_id, 'order': order}
+            for task_id, order in desired.items() if task_id not in current
+        ]
+        reordered = {
+            vt_id: desired[task_id] for task_id, (vt_id, order) in current.items()
+            if task_id in desired and order != desired[task_id]
+        }
+
+        try:
+            if removed:
+                db.session.execute(
+                    delete(VariantTask)
+                    .where(VariantTask.variant_id == variant_id, VariantTask.task_id.in_(removed))
+                    .execution_options(synchronize_session=False)
+                )
+            if reordered:
+                db.session.execute(
+                    update(VariantTask)
+                    .where(VariantTask.id.in_(reordered))
+                    .values(order=case(reordered, value=VariantTask.id))
+                    .execution_options(synchronize_session=False)
+                )
+            if added:
+                db.session.execute(insert(VariantTask), added)
+            if removed or reordered or added:
+                # массовые операции идут мимо событий маппера
+                bump_variants(db.session.connection(), [variant_id])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return [{'task_id': task_id, 'order': order} for task_id, order in desired.items()]
+
+    @staticmethod
+    def _search_filters(source: Optional[str] = None, author_id: Optional[int] = None) -> list:
+        filters = [Variant.is_pooled.is_(False)]
+        if source:
+            filters.append(Variant.source.ilike(f'%{escape_like(source)}%', escape='\\'))
+        if author_id is not None:
+            filters.append(Variant.author_id == author_id)
+        return filters
+
+    @staticmethod
+    def search(source: Optional[str] = None,
+               author_id: Optional[int] = None,
+               full: Optional[bool] = None,
+               before_id: Optional[int] = None,
+               limit: int = SEARCH_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Страница списка вариантов от новых к старым (keyset-пагинация по id).
+        Количество задач считается одним GROUP BY по variant_tasks, а не запросом на каждый вариант.
+        Возвращает (варианты, курсор следующей страницы или None).
+        """
+        limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+        task_count = func.count(VariantTask.id)
+        query = (
+            db.session.query(Variant.id, Variant.source, Variant.author_id, Variant.created_at,
+                             task_count.label('task_count'))
+            .outerjoin(VariantTask, VariantTask.variant_id == Variant.id)
+            .filter(*VariantService._search_filters(source, author_id))
+        )
+        if before_id is not None:
+            query = query.filter(Variant.id < before_id)
+
+        if full is not None:
+            # полный вариант - ровно по одной задаче на каждый номер КИМ полного варианта
+            query = query.outerjoin(Task, VariantTask.task_id == Task.id)
+            full_numbers = func.count(func.distinct(
+                case((Task.number.in_(FULL_VARIANT_NUMBERS), Task.number))
+            ))
+            is_full = (task_count == len(FULL_VARIANT_NUMBERS)) & (full_numbers == len(FULL_VARIANT_NUMBERS))
+            query = query.having(is_full if full else ~is_full)
+
+        rows = query.group_by(Variant.id).order_by(Variant.id.desc()).limit(limit + 1).all()
+
+        items = [{
+            'id': row.id,
+            'source': row.source,
+            'author_id': row.author_id,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'task_count': row.task_count,
+        } for row in rows[:limit]]
+        next_cursor = items[-1]['id'] if len(rows) > limit else None
+        return items, next_cursor
+
+    @staticmethod
+    def get_search_etag(source: Optional[str] = None, author_id: Optional[int] = None) -> str:
+        """
+        Версия списка вариантов: количество, max(created_at) и сумма revision подходящих вариантов.
+        revision растёт при правке состава, источника и автора (см. app/utils/revisions.py),
+        так что любая видимая в поиске правка меняет ETag.
+        """
+        count, last_created, revisions = (
+            db.session.query(func.count(Variant.id), func.max(Variant.created_at), func.sum(Variant.revision))
+            .filter(*VariantService._search_filters(source, author_id))
+            .one()
+        )
+        key = f'{count}:{last_created}:{revisions}'
+        return hashlib.md5(key.encode()).hexdigest()
@@ -33,13 +33,9 @@ document.addEventListener('DOMContentLoaded', function () {
       if (!taskId) return;
       fetchTaskAndShowPreview(taskId);
     } else if (t.closest('.move-up-btn')) {
-      const btn = t.closest('.move-up-btn');
-      const taskId = btn.dataset.task;
-      moveTask(taskId, 'up', btn);
+      moveTask(t.closest('.move-up-btn').dataset.task, 'up');
     } else if (t.closest('.move-down-btn')) {
-      const btn = t.closest('.move-down-btn');
-      const taskId = btn.dataset.task;
-      moveTask(taskId, 'down', btn);
+      moveTask(t.closest('.move-down-btn').dataset.task, 'down');
     }
   });
 
@@ -53,20 +49,10 @@ document.addEventListener('DOMContentLoaded', function () {
     addTaskBtn.disabled = true;
     showAddFeedback('Добавляю…', 'muted');
     try {
-      const res = await fetch(`/variants/${variantId}/add_task`, {
-        method: 'POST',
-        headers: csrfHeaders(),
-        body: JSON.stringify({ task_id: id }),
-      });
-      const data = await safeJson(res);
-      if (!res.ok) {
-        const message = data?.message || `Ошибка ${res.status}`;
+      const message = await addTaskToVariant(id);
+      if (message) {
         showAddFeedback(message, 'danger');
-        console.error('add_task bad response text:', data?.rawText || data);
-      } else if (!data.ok) {
-        showAddFeedback(data.message || 'Не удалось добавить задачу', 'danger');
       } else {
-        prependTaskToList(data.task);
         showAddFeedback('Задача добавлена', 'success');
         addTaskInput.value = '';
       }
@@ -87,28 +73,18 @@ document.addEventListener('DOMContentLoaded', function () {
       btn.disabled = true;
       (async () => {
         try {
-          const res = await fetch(`/variants/${variantId}/add_task`, {
-            method: 'POST',
-            headers: csrfHeaders(),
-            body: JSON.stringify({ task_id: parseInt(taskId, 10) }),
-          });
-          const data = await safeJson(res);
-          if (!res.ok) {
-            alert(data?.message || `Ошибка ${res.status}`);
-            console.error('add_task bad response text:', data?.rawText || data);
-          } else if (!data.ok) {
-            alert(data.message || 'Не удалось добавить задачу');
+          const message = await addTaskToVariant(parseInt(taskId, 10));
+          if (message) {
+            alert(message);
+            btn.disabled = false;
           } else {
-            prependTaskToList(data.task);
             btn.textContent = 'Добавлено';
             btn.classList.remove('btn-success');
             btn.classList.add('btn-outline-secondary');
-            btn.disabled = true;
           }
         } catch (err) {
           alert('Ошибка: ' + err);
-        } finally {
-          try { btn.disabled = false; } catch (e) {}
+          btn.disabled = false;
         }
       })();
     } else if (t.closest('.preview-task-btn')) {
@@ -122,70 +98,72 @@ document.addEventListener('DOMContentLoaded', function () {
     addFeedback.innerHTML = `<div class="text-${type}">${msg}</div>`;
   }
 
-  async function removeTaskFromVariant(taskId, buttonEl) {
-    buttonEl.disabled = true;
+  // состав варианта правится в DOM, а на сервер уходит целиком одним PATCH;
+  // изменения, сделанные подряд, собираются в один запрос
+  let syncTimer = null;
+
+  function currentTaskIds() {
+    return Array.from(variantTasksList.querySelectorAll('.variant-task-item'))
+      .map(el => parseInt(el.dataset.taskId, 10));
+  }
+
+  function scheduleSync() {
+    clearTimeout(syncTimer);
+    syncTimer = setTimeout(syncComposition, 300);
+  }
+
+  async function syncComposition() {
     try {
-      const res = await fetch(`/variants/${variantId}/remove_task`, {
-        method: 'POST',
+      const res = await fetch(`/variants/${variantId}/composition`, {
+        method: 'PATCH',
         headers: csrfHeaders(),
-        body: JSON.stringify({ task_id: parseInt(taskId, 10) }),
+        body: JSON.stringify({ task_ids: currentTaskIds() }),
       });
       const data = await safeJson(res);
-      if (!res.ok) {
+      if (!res.ok || !data.ok) {
         alert(data?.message || `Ошибка ${res.status}`);
-        console.error('remove_task bad response text:', data?.rawText || data);
-        buttonEl.disabled = false;
+        console.error('composition bad response:', data?.rawText || data);
+        // показываем то, что реально сохранено
+        location.reload();
         return;
       }
-      if (!data.ok) {
-        alert(data.message || 'Не удалось удалить задачу');
-        buttonEl.disabled = false;
-        return;
-      }
-      const row = buttonEl.closest('.variant-task-item');
-      if (row) row.remove();
+      reorderVariantListByOrder(data.task_ids);
     } catch (err) {
       alert('Ошибка: ' + err);
-      buttonEl.disabled = false;
     }
   }
-  async function moveTask(taskId, direction, btn) {
-    btn = btn || null;
-    if (btn) btn.disabled = true;
-    try {
-      const res = await fetch(`/variants/${variantId}/move_task`, {
-        method: 'POST',
-        headers: csrfHeaders(),
-        body: JSON.stringify({ task_id: parseInt(taskId,10), direction: direction }),
-      });
-      const data = await safeJson(res);
-      if (!res.ok) {
-        alert(data?.message || `Ошибка ${res.status}`);
-        console.error('move_task bad response text:', data?.rawText || data);
-        return;
-      }
-      if (!data.ok) {
-        alert(data.message || 'Не удалось переместить задачу');
-        return;
-      }
-      if (data.order && Array.isArray(data.order)) {
-        reorderVariantListByOrder(data.order);
-      } else if (data.moved && data.task_id) {
-        const node = variantTasksList.querySelector(`.variant-task-item[data-task-id="${data.task_id}"]`);
-        if (node) {
-          if (direction === 'up' && node.previousElementSibling) {
-            variantTasksList.insertBefore(node, node.previousElementSibling);
-          } else if (direction === 'down' && node.nextElementSibling) {
-            variantTasksList.insertBefore(node.nextElementSibling, node);
-          }
-        }
-      }
-    } catch (err) {
-      alert('Ошибка: ' + err);
-      console.error(err);
-    } finally {
-      if (btn) btn.disabled = false;
+
+  async function addTaskToVariant(taskId) {
+    if (variantTasksList.querySelector(`.variant-task-item[data-task-id="${taskId}"]`)) {
+      return 'Задача уже в варианте';
+    }
+    const res = await fetch(`/variants/tasks/${taskId}/json`);
+    const data = await safeJson(res);
+    if (!res.ok || !data.ok) {
+      return data?.message || 'Задача не найдена';
+    }
+    appendTaskToList(data.task);
+    scheduleSync();
+    return null;
+  }
+
+  function removeTaskFromVariant(taskId, buttonEl) {
+    const row = buttonEl.closest('.variant-task-item');
+    if (row) row.remove();
+    scheduleSync();
+  }
+
+  function moveTask(taskId, direction) {
+    const node = variantTasksList.querySelector(`.variant-task-item[data-task-id="${taskId}"]`);
+    if (!node) return;
+    if (direction === 'up' && node.previousElementSibling) {
+      variantTasksList.insertBefore(node, node.previousElementSibling);
+    } else if (direction === 'down' && node.nextElementSibling) {
+      variantTasksList.insertBefore(node.nextElementSibling, node);
+    } else {
+      return;
     }
+    scheduleSync();
   }
 
   function reorderVariantListByOrder(order) {
@@ -200,7 +178,7 @@ document.addEventListener('DOMContentLoaded', function () {
     });
   }
 
-  function prependTaskToList(task) {
+  function appendTaskToList(task) {
     if (!variantTasksList) return;
     if (variantTasksList.querySelector(`.variant-task-item[data-task-id="${task.id}"]`)) return;
 
@@ -217,13 +195,14 @@ document.addEventListener('DOMContentLoaded', function () {
         <a href="/tasks/view_task/${task.id}" class="btn btn-sm btn-outline-primary">К задаче</a>
         <button class="btn btn-sm btn-outline-secondary preview-task-btn" data-task="${task.id}">Просмотр</button>
         <div class="d-flex gap-1">
-          //<button class="btn btn-sm btn-light move-up-btn" data-task="${task.id}" title="Вверх">▲</button>
-          //<button class="btn btn-sm btn-light move-down-btn" data-task="${task.id}" title="Вниз">▼</button>
+          <button class="btn btn-sm btn-light move-up-btn" data-task="${task.id}" title="Вверх">▲</button>
+          <button class="btn btn-sm btn-light move-down-btn" data-task="${task.id}" title="Вниз">▼</button>
           <button class="btn btn-sm btn-danger remove-task-btn" data-task="${task.id}">Удалить</button>
         </div>
       </div>
     `;
-    variantTasksList.prepend(node);
+    variantTasksList.querySelector('.empty-variant')?.remove();
+    variantTasksList.appendChild(node);
   }
 
   async function fetchTaskAndShowPreview(taskId) {
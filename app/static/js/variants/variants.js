@@ -12,6 +12,13 @@ document.addEventListener('DOMContentLoaded', function () {
   const openVariantBtn = document.getElementById('open-variant-btn');
   const startExamBtn = document.getElementById('start-exam-btn');
   const selectAllBtn = document.getElementById('select-all-btn');
+  const loadMoreBtn = document.getElementById('load-more-btn');
+  const filterSource = document.getElementById('filter-source');
+  const filterFull = document.getElementById('filter-full');
+  const filterMine = document.getElementById('filter-mine');
+
+  // курсор следующей страницы списка вариантов (id последнего показанного)
+  let nextCursor = null;
 
   function parseKimKey(key) {
     if (!key) return [];
@@ -47,7 +54,7 @@ document.addEventListener('DOMContentLoaded', function () {
   function getSelectAllState() {
     const checkedCount = kimCheckboxes.filter(cb => cb.checked).length;
     if (checkedCount === 0) return 'unchecked';
-    if (checkedCount === kimCheckboxes.length) return 'checked';
+    if (checkedCount === kimCheckboxes.filter(cb => !cb.disabled).length) return 'checked';
     return 'partial';
   }
 
@@ -74,7 +81,7 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   function setAllCheckboxes(checked) {
-    kimCheckboxes.forEach(cb => {
+    kimCheckboxes.filter(cb => !cb.disabled).forEach(cb => {
       cb.checked = checked;
       setCountEnabledForKey(cb.dataset.kim, checked);
     });
@@ -109,6 +116,42 @@ document.addEventListener('DOMContentLoaded', function () {
   updateGenerateState();
   updateSelectAllUI();
 
+  // сколько задач каждого номера есть в банке: ограничиваем поле "Количество" и подписываем доступное
+  async function loadCatalog() {
+    try {
+      const res = await fetch('/api/tasks/catalog');
+      const data = await res.json();
+      if (!data.ok) return;
+
+      const counts = {};
+      data.numbers.forEach(item => { counts[item.number] = item.count; });
+
+      kimCheckboxes.forEach(cb => {
+        const key = cb.dataset.kim;
+        const available = parseKimKey(key === '19-21' ? '19' : key)
+          .reduce((sum, n) => sum + (counts[n] || 0), 0);
+
+        const countInput = document.querySelector(`#kim-count-${key}`);
+        if (countInput) countInput.max = Math.max(1, Math.min(parseInt(countInput.max, 10) || 20, available));
+
+        const label = document.querySelector(`#kim-available-${key}`);
+        if (label) label.textContent = `из ${available}`;
+
+        if (available === 0) {
+          cb.checked = false;
+          cb.disabled = true;
+          setCountEnabledForKey(key, false);
+        }
+      });
+      updateGenerateState();
+      updateSelectAllUI();
+    } catch (err) {
+      // без сводки форма работает как раньше, проверку всё равно сделает сервер
+    }
+  }
+
+  loadCatalog();
+
     if (searchBtn) {
       searchBtn.addEventListener('click', async () => {
         const id = searchInput.value.trim();
@@ -130,27 +173,60 @@ document.addEventListener('DOMContentLoaded', function () {
       });
     }
 
+    function buildListUrl(before) {
+      const params = new URLSearchParams({ all: '1' });
+      const source = filterSource?.value.trim();
+      if (source) params.set('source', source);
+      if (filterFull?.checked) params.set('full', '1');
+      if (filterMine?.checked) params.set('author_id', filterMine.dataset.userId);
+      if (before) params.set('before', before);
+      return `/variants/search?${params}`;
+    }
+
+    // ответ сервера с ETag браузер переиспользует сам: неизменённая страница придёт как 304
+    async function loadVariantsPage(before) {
+      const res = await fetch(buildListUrl(before));
+      const data = await res.json();
+
+      if (!data.ok) {
+        variantsList.innerHTML = `<div class="alert alert-warning p-2">${data.message || 'Ошибка загрузки'}</div>`;
+        loadMoreBtn?.classList.add('d-none');
+        return;
+      }
+
+      renderVariantsList(data.variants, Boolean(before));
+      nextCursor = data.next_cursor;
+      loadMoreBtn?.classList.toggle('d-none', !nextCursor);
+    }
+
     if (listAllBtn) {
       listAllBtn.addEventListener('click', async () => {
         variantsList.innerHTML = '<div class="text-muted small">Загрузка списка вариантов…</div>';
         variantPreviewCard.classList.add('d-none');
+        nextCursor = null;
 
         try {
-          const res = await fetch('/variants/search?all=1');
-          const data = await res.json();
-
-          if (!data.ok) {
-            variantsList.innerHTML = `<div class="alert alert-warning p-2">${data.message || 'Ошибка загрузки'}</div>`;
-            return;
-          }
-
-          renderVariantsList(data.variants);
+          await loadVariantsPage(null);
         } catch (err) {
           variantsList.innerHTML = `<div class="alert alert-danger p-2">Ошибка: ${err.message}</div>`;
         }
       });
     }
 
+    if (loadMoreBtn) {
+      loadMoreBtn.addEventListener('click', async () => {
+        if (!nextCursor) return;
+        loadMoreBtn.disabled = true;
+        try {
+          await loadVariantsPage(nextCursor);
+        } catch (err) {
+          variantsList.insertAdjacentHTML('beforeend', `<div class="alert alert-danger p-2">Ошибка: ${err.message}</div>`);
+        } finally {
+          loadMoreBtn.disabled = false;
+        }
+      });
+    }
+
   function collectSelection() {
     const selection = [];
     kimCheckboxes.forEach(cb => {
@@ -173,9 +249,9 @@ document.addEventListener('DOMContentLoaded', function () {
     return selection;
   }
 
-  function renderVariantsList(items) {
-    variantsList.innerHTML = '';
-    if (!items || items.length === 0) {
+  function renderVariantsList(items, append = false) {
+    if (!append) variantsList.innerHTML = '';
+    if (!append && (!items || items.length === 0)) {
       variantsList.innerHTML = '<div class="text-muted small">Ничего не найдено</div>';
       return;
     }
@@ -197,6 +273,7 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   async function fetchVariantById(id) {
+    loadMoreBtn?.classList.add('d-none');
     variantsList.innerHTML = `<div class="text-muted small">Загрузка варианта #${id}…</div>`;
     variantPreviewCard.classList.add('d-none');
 
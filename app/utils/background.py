@@ -0,0 +1,52 @@
+import logging
+import threading
+from typing import Callable
+
+from flask import Flask
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Фоновый поток, который раз в interval секунд вызывает job внутри контекста приложения.
+    Поток демонический: при остановке процесса его не ждём.
+    """
+
+    def __init__(self, app: Flask, job: Callable[[], object], interval: float, name: str):
+        self.app = app
+        self.job = job
+        self.interval = interval
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.job()
+                except Exception:  # pylint: disable=W0718
+                    # упавшая итерация не должна останавливать поток
+                    logger.exception('Фоновая задача %s завершилась с ошибкой', self.name)
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
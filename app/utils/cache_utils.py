@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class AppCache:
+    """
+    Кеш в памяти процесса: LRU с ограничением числа записей и временем жизни.
+    Значения не копируются - класть стоит только то, что после записи не изменяется.
+    Общий экземпляр - app.extensions.cache, настраивается через init_app.
+    """
+
+    def __init__(self, max_entries: int = 2048, default_ttl: Optional[float] = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        # ключ -> (момент истечения или None, значение)
+        self._data: 'OrderedDict[Hashable, Tuple[Optional[float], Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        self.max_entries = app.config.get('CACHE_MAX_ENTRIES', self.max_entries)
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', self.default_ttl)
+        app.extensions['app_cache'] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING) -> None:
+        """
+        ttl в секундах; None - без ограничения по времени, не указан - default_ttl.
+        """
+        if ttl is _MISSING:
+            ttl = self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = _MISSING) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
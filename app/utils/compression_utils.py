@@ -0,0 +1,77 @@
+import gzip
+import os
+import zlib
+from typing import Iterator, Optional
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+
+# размер порции при потоковой распаковке
+CHUNK_SIZE = 64 * 1024
+
+# текстовые типы, которые хорошо сжимаются (дампы чисел в .txt/.csv и т.п.)
+_COMPRESSIBLE_CONTENT_TYPES = {
+    'application/csv',
+    'application/json',
+    'application/xml',
+    'application/x-csv',
+    'application/vnd.ms-excel',  # так браузеры часто присылают .csv
+}
+_COMPRESSIBLE_EXTENSIONS = {'.txt', '.csv', '.tsv', '.json', '.xml', '.html', '.md', '.log', '.py'}
+
+
+def choose_encoding(content_type: Optional[str], filename: Optional[str] = None) -> str:
+    """
+    Выбор кодека для хранения вложения по его типу.
+    .xlsx/.docx/.pdf/картинки уже сжаты внутри, поэтому храним их как есть.
+    :param content_type: MIME-тип файла
+    :param filename: имя файла (на случай, если MIME-тип не информативен)
+    :return: GZIP или IDENTITY
+    """
+    mime = (content_type or '').split(';', 1)[0].strip().lower()
+    if mime.startswith('text/') or mime in _COMPRESSIBLE_CONTENT_TYPES:
+        return GZIP
+
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in _COMPRESSIBLE_EXTENSIONS:
+        return GZIP
+
+    return IDENTITY
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == GZIP:
+        # mtime=0, чтобы одинаковые файлы давали одинаковые байты
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    return data
+
+
+def iter_decompressed(data: bytes, encoding: Optional[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Потоковая распаковка: в памяти не держим распакованный файл целиком.
+    """
+    if encoding != GZIP:
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+        return
+
+    # 16 + MAX_WBITS - формат gzip (с заголовком и crc)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for i in range(0, len(data), chunk_size):
+        out = decompressor.decompress(data[i:i + chunk_size], chunk_size)
+        if out:
+            yield out
+        # если выход ограничен chunk_size, остаток лежит в unconsumed_tail
+        while decompressor.unconsumed_tail:
+            out = decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+            if out:
+                yield out
+    tail = decompressor.flush()
+    if tail:
+        yield tail
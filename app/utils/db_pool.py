@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """
+    Счётчики пула за текущий интервал: сколько раз и как долго ждали соединение,
+    сколько раз не дождались (pool_timeout) и сколько соединений было занято одновременно.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use_total = 0
+        self.in_use_peak = 0
+
+    def record_checkout(self, wait: float, in_use: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.in_use_total += in_use
+            self.in_use_peak = max(self.in_use_peak, in_use)
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, wait)
+
+    def collect(self, capacity: Optional[int]) -> Dict[str, Any]:
+        """
+        Снять счётчики интервала и начать новый.
+        :param capacity: сколько соединений пул может выдать (pool_size + max_overflow), None - без предела
+        """
+        with self._lock:
+            checkouts = self.checkouts
+            result = {
+                'checkouts': checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / checkouts * 1000, 2) if checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 2),
+                'in_use_avg': round(self.in_use_total / checkouts, 2) if checkouts else 0.0,
+                'in_use_peak': self.in_use_peak,
+                'utilization_peak': round(self.in_use_peak / capacity, 3) if capacity else None,
+            }
+            self._reset()
+        return result
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool, который замеряет ожидание соединения (вместе с pre-ping и открытием нового соединения)
+    и раз в stats_interval секунд пишет в лог сводку: ожидание, таймауты и загрузку пула.
+    Сводка пишется при очередной выдаче соединения, отдельный поток для этого не нужен.
+    """
+
+    stats_interval: float = 60
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._last_report = time.monotonic()
+        self._report_lock = threading.Lock()
+
+    def capacity(self) -> Optional[int]:
+        # max_overflow=-1 - пул без предела
+        return None if self._max_overflow < 0 else self.size() + self._max_overflow
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - started)
+            self._maybe_report()
+            raise
+        self.stats.record_checkout(time.perf_counter() - started, self.checkedout())
+        self._maybe_report()
+        return connection
+
+    def _maybe_report(self) -> None:
+        if not self.stats_interval or time.monotonic() - self._last_report < self.stats_interval:
+            return
+        # сводку пишет только один поток, остальные не ждут
+        if not self._report_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_report = time.monotonic()
+            stats = self.stats.collect(self.capacity())
+            logger.info(
+                'Пул соединений: выдано %d, таймаутов %d, ожидание ср. %.2f мс / макс. %.2f мс, '
+                'занято ср. %.2f / пик %d из %s (%s)',
+                stats['checkouts'], stats['timeouts'], stats['wait_avg_ms'], stats['wait_max_ms'],
+                stats['in_use_avg'], stats['in_use_peak'], self.capacity() or '∞',
+                f"{stats['utilization_peak']:.0%}" if stats['utilization_peak'] is not None else '-',
+            )
+        finally:
+            self._report_lock.release()
+
+
+def make_instrumented_pool(stats_interval: float) -> type:
+    """
+    Класс пула с заданным интервалом сводок. create_engine не пропускает в пул свои параметры,
+    а Pool.recreate() создаёт пул того же класса, поэтому интервал задаётся атрибутом подкласса.
+    """
+    return type('InstrumentedQueuePool', (InstrumentedQueuePool,), {'stats_interval': stats_interval})
@@ -0,0 +1,120 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Flask, current_app, g, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# движок реплики в app.extensions
+REPLICA_EXTENSION = 'db_replica'
+# до какого времени (unix) пользователь читает с основной БД после своей записи
+STICKY_SESSION_KEY = '_db_primary_until'
+# в session.info: в этой сессии уже писали или брали соединение напрямую
+WROTE_INFO_KEY = 'db_wrote'
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет SELECT из представлений с @read_only на реплику (REPLICA_DATABASE_URI).
+    Всё остальное идёт на основную БД: запись, flush, session.connection(), а также чтение
+    после записи - в той же сессии и в течение REPLICA_STICKY_SECONDS в следующих запросах пользователя.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if clause is not None and getattr(clause, 'is_select', False):
+                replica = self._replica()
+                if replica is not None:
+                    return replica
+            else:
+                # запись, flush или соединение "на всё" - дальнейшие чтения должны видеть результат
+                self.info[WROTE_INFO_KEY] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        if self._flushing or self.info.get(WROTE_INFO_KEY):
+            return None
+        if not has_app_context() or not g.get('db_read_only') or g.get('db_force_primary'):
+            return None
+        if has_request_context() and flask_session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return None
+        return current_app.extensions.get(REPLICA_EXTENSION)
+
+
+def read_only(view):
+    """
+    Пометить представление как только читающее: его SELECT можно выполнять на реплике.
+    Если представление всё-таки пишет, чтения после записи вернутся на основную БД.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # g живёт в контексте приложения, а он бывает общим на несколько запросов (тесты, CLI)
+        previous = g.get('db_read_only', False)
+        g.db_read_only = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.db_read_only = previous
+
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """
+    Читать с основной БД внутри блока, даже в представлении с @read_only
+    (например, пользователя и его роли - их отставание реплики не должно задевать).
+    """
+    previous = g.get('db_force_primary', False)
+    g.db_force_primary = True
+    try:
+        yield
+    finally:
+        g.db_force_primary = previous
+
+
+def init_db_routing(app: Flask) -> None:
+    """
+    Создать движок реплики из REPLICA_DATABASE_URI с теми же SQLALCHEMY_ENGINE_OPTIONS и профилем SQLite.
+    Это не bind Flask-SQLAlchemy: таблицы на реплике те же, что и на основной БД, а binds
+    заводят отдельные метаданные на общем объекте db.
+    """
+    uri = app.config.get('REPLICA_DATABASE_URI')
+    if not uri:
+        return
+
+    from app.extensions import db, init_sqlite_profile
+
+    engine = create_engine(uri, **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}))
+    init_sqlite_profile(app, [engine])
+    app.extensions[REPLICA_EXTENSION] = engine
+
+    @app.after_request
+    def _stick_to_primary_after_write(response):
+        # registry.has() - чтобы не создавать сессию ради проверки
+        if db.session.registry.has() and db.session.info.get(WROTE_INFO_KEY):
+            flask_session[STICKY_SESSION_KEY] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+
+def sync_sqlite_replica(app: Flask) -> None:
+    """
+    Скопировать основную SQLite-базу в файл реплики через backup API (согласованный снимок,
+    читатели реплики не мешают). Для локальной проверки маршрутизации без настоящей репликации.
+    """
+    primary = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    replica = make_url(app.config.get('REPLICA_DATABASE_URI') or 'sqlite://')
+    if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite' or not replica.database:
+        raise ValueError('Синхронизация поддерживается только между двумя файлами SQLite (REPLICA_DATABASE_URI)')
+
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
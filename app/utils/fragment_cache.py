@@ -0,0 +1,75 @@
+import time
+from collections import Counter
+from typing import Any, Hashable
+
+from flask import Flask, current_app, g, has_request_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from app.extensions import cache
+from app.utils.sql_instrumentation import add_server_timing
+
+
+def _hashable(key: Any) -> Hashable:
+    """
+    Ключ из шаблона может содержать списки и словари (например, dashboard_data.total_stats).
+    """
+    if isinstance(key, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in key.items()))
+    if isinstance(key, (list, tuple)):
+        return tuple(_hashable(item) for item in key)
+    return key
+
+
+def _report(name: str, started: float) -> None:
+    """
+    Время блока - в Server-Timing ответа, в описании - сколько таких блоков было за запрос.
+    """
+    if not has_request_context():
+        return
+    counts = g.setdefault('_fragment_cache', Counter())
+    if name not in g.get('_server_timing', {}):
+        # метрики уже ушли в заголовок прошлого ответа - счёт начинается заново
+        counts[name] = 0
+    counts[name] += 1
+    add_server_timing(name, (time.perf_counter() - started) * 1000, f'{counts[name]} blocks')
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache key[, ttl] %}...{% endcache %} - готовый HTML блока хранится в кеше приложения.
+    key - версии данных блока (revision задачи или варианта, счётчики): изменились - блок
+    рендерится заново, а старая запись уходит по LRU или по ttl (по умолчанию FRAGMENT_CACHE_TTL).
+    Шаблон и строка блока уже входят в ключ, повторять их в key не нужно.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if('comma') else nodes.Const(None)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        place = nodes.Const(f'{parser.name}:{lineno}')
+        return nodes.CallBlock(self.call_method('_render_cached', [place, key, ttl]), [], [], body).set_lineno(lineno)
+
+    @staticmethod
+    def _render_cached(place: str, key: Any, ttl: Any, caller) -> str:
+        config = current_app.config
+        if not config.get('FRAGMENT_CACHE', True):
+            return caller()
+
+        started = time.perf_counter()
+        cache_key = ('fragment', place, _hashable(key))
+        html = cache.get(cache_key)
+        if html is not None:
+            _report('tpl-hit', started)
+            return html
+
+        html = caller()
+        cache.set(cache_key, html, ttl if ttl is not None else config['FRAGMENT_CACHE_TTL'])
+        _report('tpl-render', started)
+        return html
+
+
+def init_fragment_cache(app: Flask) -> None:
+    app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,93 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# значения werkzeug по умолчанию - на случай вызова вне контекста приложения (скрипты, миграции)
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+DEFAULT_SALT_LENGTH = 16
+# меньше этого хешируем в текущем процессе: запуск пула дороже самого хеширования
+PARALLEL_HASH_MIN = 8
+
+
+def hash_policy() -> tuple[str, int]:
+    """
+    Текущие метод хеширования и длина соли из конфигурации.
+    """
+    if not has_app_context():
+        return DEFAULT_HASH_METHOD, DEFAULT_SALT_LENGTH
+    config = current_app.config
+    return (
+        config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD,
+        config.get('PASSWORD_SALT_LENGTH') or DEFAULT_SALT_LENGTH,
+    )
+
+
+def hash_password(password: str) -> str:
+    method, salt_length = hash_policy()
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    # параметры берутся из самого хеша, поэтому старые хеши проверяются как раньше
+    return check_password_hash(password_hash, password)
+
+
+def hash_method_of(password_hash: str) -> str:
+    """
+    Параметры, с которыми посчитан хеш: 'scrypt:32768:8:1$соль$хеш' -> 'scrypt:32768:8:1'.
+    """
+    return password_hash.split('$', 1)[0]
+
+
+@lru_cache(maxsize=None)
+def _full_method(method: str) -> str:
+    """
+    Метод в том виде, в каком он записывается в хеш: сокращения 'scrypt' и 'pbkdf2' werkzeug
+    дополняет параметрами по умолчанию ('scrypt:32768:8:1', 'pbkdf2:sha256:1000000').
+    Считается один раз на метод по пробному хешу.
+    """
+    return hash_method_of(generate_password_hash('', method=method, salt_length=1))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    method, salt_length = hash_policy()
+    parts = password_hash.split('$')
+    if len(parts) != 3:
+        return True
+    return parts[0] != _full_method(method) or len(parts[1]) != salt_length
+
+
+def _hash_chunk(args) -> List[str]:
+    # выполняется в процессе пула, контекста приложения там нет - политику передаём явно
+    passwords, method, salt_length = args
+    return [generate_password_hash(password, method=method, salt_length=salt_length) for password in passwords]
+
+
+def hash_passwords(passwords: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Хешировать много паролей сразу, распределив их по процессам (хеширование упирается в CPU,
+    а потоки тут не помогут из-за GIL). Порядок хешей совпадает с порядком паролей.
+    :param workers: число процессов; по умолчанию - по числу ядер
+    """
+    method, salt_length = hash_policy()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(passwords)))
+    if workers == 1 or len(passwords) < PARALLEL_HASH_MIN:
+        return _hash_chunk((passwords, method, salt_length))
+
+    # несколько кусков на процесс, чтобы медленный кусок не задерживал весь импорт
+    size = math.ceil(len(passwords) / (workers * 4))
+    chunks = [(passwords[i:i + size], method, salt_length) for i in range(0, len(passwords), size)]
+    # fork из многопоточного веб-процесса небезопасен, поэтому процессы запускаются через forkserver
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    hashed: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for chunk in pool.map(_hash_chunk, chunks):
+            hashed.extend(chunk)
+    return hashed
@@ -0,0 +1,91 @@
+from typing import Iterable
+
+from sqlalchemy import event, inspect, select, update
+
+from app.models import Task, TaskAttachment, Variant, VariantTask
+
+# поля задачи, которые попадают в скомпилированный вариант (см. VariantBundleService)
+TASK_CONTENT_FIELDS = ('number', 'statement_html', 'answer')
+# поля варианта, которые видны в поиске вариантов (ETag списка строится по revision)
+VARIANT_CONTENT_FIELDS = ('source', 'author_id')
+
+_variants = Variant.__table__
+_tasks = Task.__table__
+_variant_tasks = VariantTask.__table__
+
+
+def bump_variants(connection, variant_ids: Iterable[int]) -> None:
+    """
+    Увеличить revision вариантов. Работает на уровне Core, поэтому годится и внутри flush,
+    и после массовых вставок, мимо которых проходят события маппера.
+    """
+    ids = {variant_id for variant_id in variant_ids if variant_id is not None}
+    if ids:
+        connection.execute(
+            update(_variants).where(_variants.c.id.in_(ids)).values(revision=_variants.c.revision + 1)
+        )
+
+
+def bump_variants_of_tasks(connection, task_ids: Iterable[int]) -> None:
+    ids = {task_id for task_id in task_ids if task_id is not None}
+    if ids:
+        containing = select(_variant_tasks.c.variant_id).where(_variant_tasks.c.task_id.in_(ids))
+        connection.execute(
+            update(_variants).where(_variants.c.id.in_(containing)).values(revision=_variants.c.revision + 1)
+        )
+
+
+def bump_tasks(connection, task_ids: Iterable[int]) -> None:
+    ids = {task_id for task_id in task_ids if task_id is not None}
+    if ids:
+        connection.execute(update(_tasks).where(_tasks.c.id.in_(ids)).values(revision=_tasks.c.revision + 1))
+        bump_variants_of_tasks(connection, ids)
+
+
+def _task_content_changed(target) -> bool:
+    attrs = inspect(target).attrs
+    return any(getattr(attrs, field).history.has_changes() for field in TASK_CONTENT_FIELDS)
+
+
+@event.listens_for(Task, 'before_update')
+def _task_before_update(mapper, connection, target):
+    if _task_content_changed(target):
+        target.revision = (target.revision or 1) + 1
+
+
+@event.listens_for(Task, 'after_update')
+def _task_after_update(mapper, connection, target):
+    if _task_content_changed(target):
+        bump_variants_of_tasks(connection, [target.id])
+
+
+@event.listens_for(Task, 'before_delete')
+def _task_before_delete(mapper, connection, target):
+    # после DELETE строки variant_tasks удалит каскад СУБД, поэтому варианты ищем заранее
+    bump_variants_of_tasks(connection, [target.id])
+
+
+@event.listens_for(Variant, 'before_update')
+def _variant_before_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if any(getattr(attrs, field).history.has_changes() for field in VARIANT_CONTENT_FIELDS):
+        # выражением, а не значением из объекта: revision могли поднять мимо ORM (bump_variants)
+        target.revision = Variant.revision + 1
+
+
+@event.listens_for(TaskAttachment, 'after_insert')
+@event.listens_for(TaskAttachment, 'after_delete')
+def _attachment_changed(mapper, connection, target):
+    bump_tasks(connection, [target.task_id])
+
+
+@event.listens_for(VariantTask, 'after_insert')
+@event.listens_for(VariantTask, 'after_delete')
+def _variant_task_inserted_or_deleted(mapper, connection, target):
+    bump_variants(connection, [target.variant_id])
+
+
+@event.listens_for(VariantTask, 'after_update')
+def _variant_task_updated(mapper, connection, target):
+    history = inspect(target).attrs.variant_id.history
+    bump_variants(connection, [target.variant_id, *(history.deleted or ())])
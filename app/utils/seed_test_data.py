@@ -57,31 +57,35 @@ def make_answer_csv(slot_num: int, fake: Faker) -> str:
 
 
 # ---------- user creation ----------
-def _make_user_object(fake: Faker):
+def _make_user_object(first: str, last: str, middle: Optional[str], username: str, password_hash: str):
     from app.models import User
-    first = fake.first_name()
-    last = fake.last_name()
-    middle = fake.middle_name() if random.random() < MIDDLE_NAME_PROBABILITY else None
-    username = User.generate_username(first, last, middle)
     u = User(
         username=username,
         first_name=first,
         last_name=last,
         middle_name=middle,
         registered_at=utcnow() - timedelta(days=random.randint(0, 365)),
+        password_hash=password_hash,
     )
-    u.set_password("P@ssw0rd")
     return u
 
 
 def create_users(db, count: int = NUM_USERS) -> List[int]:
     from app.models import User
+    from app.utils.password_utils import hash_password
     fake = Faker("ru_RU")
     created_ids: List[int] = []
+    # пароль у всех тестовых пользователей один, и хешировать его каждый раз - секунды впустую
+    password_hash = hash_password("P@ssw0rd")
     print(f"Создаю {count} новых пользователей...")
-    for _ in range(count):
-        u = _make_user_object(fake)
-        db.session.add(u)
+    people = [
+        (fake.first_name(), fake.last_name(),
+         fake.middle_name() if random.random() < MIDDLE_NAME_PROBABILITY else None)
+        for _ in range(count)
+    ]
+    # имена подбираются на весь список одним проходом
+    for (first, last, middle), username in zip(people, User.generate_usernames(people)):
+        db.session.add(_make_user_object(first, last, middle, username, password_hash))
     # назначим id (flush) — в одной транзакции
     db.session.flush()
     # вернём список новых пользователей (последние count в таблице)
@@ -219,9 +223,9 @@ class TaskChooser:
 
 # ---------- variant_task linking ----------
 def link_tasks_to_variants(db, variant_ids: Iterable[int], task_ids: Iterable[int]) -> int:
-    from app.models import VariantTask
+    from app.services.variant_services import VariantService
     chooser = TaskChooser(db, task_ids)
-    to_insert_count = 0
+    rows: List[Dict[str, int]] = []
     for vid in variant_ids:
         used: set = set()
         order = 1
@@ -230,12 +234,12 @@ def link_tasks_to_variants(db, variant_ids: Iterable[int], task_ids: Iterable[in
             if tid is None:
                 continue
             used.add(tid)
-            vt = VariantTask(variant_id=vid, task_id=tid, order=order)
-            db.session.add(vt)
+            rows.append({'variant_id': vid, 'task_id': tid, 'order': order})
             order += 1
-            to_insert_count += 1
-    print(f"Добавлено variant_task записей: {to_insert_count}.")
-    return to_insert_count
+    # все связи одной пачкой вместо session.add на каждую строку
+    VariantService.insert_variant_tasks(rows)
+    print(f"Добавлено variant_task записей: {len(rows)}.")
+    return len(rows)
 
 
 def _random_times_for_attempt(db, variant_id: int):
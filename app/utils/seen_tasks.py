@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import Attempt, AttemptAnswer, Task, VariantTask
+
+# сколько последних завершённых попыток учитывать, если не задано RECENT_ATTEMPTS
+RECENT_ATTEMPTS = 5
+# сколько пользователей держать в памяти процесса
+MAX_USERS = 10_000
+# записи других процессов до нас не доходят, поэтому историю периодически перечитываем
+HISTORY_TTL = 600
+
+
+class UserTaskHistory:
+    """
+    Задачи, на которые пользователь отвечал в последних попытках, и доля верных ответов по номерам КИМ.
+    """
+
+    def __init__(self, max_attempts: int = RECENT_ATTEMPTS):
+        self.built_at = time.monotonic()
+        # (attempt_id, id задач, [(номер, верно ли)])
+        self._attempts: Deque[Tuple[int, FrozenSet[int], List[Tuple[int, bool]]]] = deque(maxlen=max_attempts)
+        self.seen_ids: Set[int] = set()
+        self._stats: Dict[int, List[int]] = {}
+
+    def push(self, attempt_id: int, answers: List[Tuple[int, int, bool]]) -> None:
+        """
+        answers: [(task_id, номер КИМ, верно ли)], попытки добавляются от старых к новым
+        """
+        if any(a[0] == attempt_id for a in self._attempts):
+            return
+        self._attempts.append((
+            attempt_id,
+            frozenset(task_id for task_id, _, _ in answers),
+            [(number, is_correct) for _, number, is_correct in answers],
+        ))
+        self._recount()
+
+    def _recount(self) -> None:
+        seen: Set[int] = set()
+        stats: Dict[int, List[int]] = {}
+        for _, task_ids, results in self._attempts:
+            seen |= task_ids
+            for number, is_correct in results:
+                counter = stats.setdefault(number, [0, 0])
+                counter[1] += 1
+                if is_correct:
+                    counter[0] += 1
+        self.seen_ids = seen
+        self._stats = stats
+
+    def solve_rate(self, number: int) -> Optional[float]:
+        correct, total = self._stats.get(number, (0, 0))
+        return correct / total if total else None
+
+    def weak_numbers(self, threshold: float = 0.5) -> Set[int]:
+        return {
+            number for number in self._stats
+            if (rate := self.solve_rate(number)) is not None and rate < threshold
+        }
+
+
+class SeenTasksIndex:
+    """
+    Кеш UserTaskHistory по пользователям. История строится лениво двумя запросами
+    и дополняется при завершении попытки, так что генерация варианта не ходит в attempt_answers.
+    """
+
+    def __init__(self, max_users: int = MAX_USERS, ttl: float = HISTORY_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._histories: 'OrderedDict[int, UserTaskHistory]' = OrderedDict()
+
+    @staticmethod
+    def _load_answers(attempt_ids: List[int]) -> Dict[int, List[Tuple[int, int, bool]]]:
+        rows = (
+            db.session.query(AttemptAnswer.attempt_id, VariantTask.task_id, Task.number, AttemptAnswer.is_correct)
+            .join(VariantTask, AttemptAnswer.variant_task_id == VariantTask.id)
+            .join(Task, VariantTask.task_id == Task.id)
+            .filter(AttemptAnswer.attempt_id.in_(attempt_ids))
+            .filter(AttemptAnswer.answer_text.isnot(None), AttemptAnswer.answer_text != '')
+            .all()
+        )
+        by_attempt: Dict[int, List[Tuple[int, int, bool]]] = {}
+        for attempt_id, task_id, number, is_correct in rows:
+            by_attempt.setdefault(attempt_id, []).append((task_id, number, bool(is_correct)))
+        return by_attempt
+
+    def _build(self, user_id: int) -> UserTaskHistory:
+        recent_attempts = current_app.config.get('RECENT_ATTEMPTS', RECENT_ATTEMPTS)
+        history = UserTaskHistory(max_attempts=recent_attempts)
+        attempt_ids = [
+            row.id for row in
+            db.session.query(Attempt.id)
+            .filter(Attempt.user_id == user_id, Attempt.finished_at.isnot(None))
+            .order_by(Attempt.finished_at.desc())
+            .limit(recent_attempts)
+            .all()
+        ]
+        if attempt_ids:
+            answers = self._load_answers(attempt_ids)
+            for attempt_id in reversed(attempt_ids):
+                history.push(attempt_id, answers.get(attempt_id, []))
+        return history
+
+    def get(self, user_id: int) -> UserTaskHistory:
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is not None and time.monotonic() - history.built_at < self.ttl:
+                self._histories.move_to_end(user_id)
+                return history
+
+        history = self._build(user_id)
+        with self._lock:
+            self._histories[user_id] = history
+            self._histories.move_to_end(user_id)
+            while len(self._histories) > self.max_users:
+                self._histories.popitem(last=False)
+        return history
+
+    def record_attempt(self, attempt: Attempt) -> None:
+        """
+        Вызывается после завершения попытки: если история пользователя уже в памяти, дополняем её.
+        """
+        with self._lock:
+            history = self._histories.get(attempt.user_id)
+        if history is None:
+            return
+        answers = self._load_answers([attempt.id]).get(attempt.id, [])
+        with self._lock:
+            history.push(attempt.id, answers)
+
+    def forget(self, user_id: int) -> None:
+        with self._lock:
+            self._histories.pop(user_id, None)
+
+
+seen_tasks = SeenTasksIndex()
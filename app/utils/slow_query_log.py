@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Flask, has_request_context, request
+from sqlalchemy import event
+
+from app.utils.sql_instrumentation import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# состояние журнала в app.extensions
+SLOW_QUERY_EXTENSION = 'slow_query_log'
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROJECT_DIR = os.path.dirname(_APP_DIR)
+# кадры, которые не интересны как "кто вызвал запрос"
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_APP_DIR, 'utils', 'db_routing.py')}
+
+
+def param_shapes(parameters, executemany: bool = False) -> Any:
+    """
+    Форма параметров без значений (в параметрах бывают хеши паролей и ответы):
+    тип и длина для строк, количество строк для executemany.
+    """
+    rows = list(parameters or ())
+    # при insertmanyvalues executemany=True, но параметры уже одним плоским кортежем
+    if executemany and rows and isinstance(rows[0], (list, tuple, dict)):
+        return {'rows': len(rows), 'shape': param_shapes(rows[0])}
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    return [_value_shape(value) for value in rows]
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def calling_frame() -> Optional[str]:
+    """
+    Ближайший кадр стека из кода приложения (сервис, модель или представление), выполнивший запрос.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIR + os.sep) and filename not in _SKIP_FILES:
+            return f'{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def explain(dbapi_connection, dialect_name: str, statement: str, parameters) -> List[str]:
+    """
+    План запроса отдельным курсором DBAPI, чтобы EXPLAIN не попадал в события движка и сам в журнал.
+    """
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters or ())
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if dialect_name == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [' | '.join(str(value) for value in row) for row in rows]
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов приложения: строка JSON на запрос дольше SLOW_QUERY_MS.
+    План выполнения снимается для каждого отпечатка один раз за жизнь процесса.
+    """
+
+    def __init__(self, path: str, threshold_ms: int, max_bytes: int, backups: int, with_plans: bool = True):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.with_plans = with_plans
+        self.handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                           encoding='utf-8', delay=True)
+        self._lock = threading.Lock()
+        self._explained = set()
+
+    def _first_seen(self, key: str) -> bool:
+        with self._lock:
+            if key in self._explained:
+                return False
+            self._explained.add(key)
+            return True
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_slow_query_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        if seconds >= self.threshold:
+            try:
+                self.record(conn, statement, parameters, executemany, seconds)
+            except Exception:
+                # журнал не должен ломать сам запрос
+                logger.exception('Не удалось записать медленный запрос в %s', self.path)
+
+    def handle_error(self, exception_context):
+        conn = exception_context.connection
+        started = conn.info.get('_slow_query_started') if conn is not None else None
+        if started:
+            started.pop()
+
+    def record(self, conn, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        key = fingerprint(statement)
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'ms': round(seconds * 1000, 2),
+            'fingerprint': key,
+            'params': param_shapes(parameters, executemany),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'path': request.path if has_request_context() else None,
+            'frame': calling_frame(),
+        }
+        if self.with_plans and not executemany and self._first_seen(key):
+            try:
+                entry['plan'] = explain(conn.connection.dbapi_connection, conn.dialect.name, statement, parameters)
+            except Exception as e:
+                # план - подсказка: например, для DDL его может не быть
+                entry['plan_error'] = str(e)
+        if self.handler.stream is None:
+            # файл открывается при первой записи - тогда же создаём папку
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.handler.handle(logging.makeLogRecord({'msg': json.dumps(entry, ensure_ascii=False, default=str)}))
+
+    def listen(self, engine) -> None:
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+
+    def close(self) -> None:
+        self.handler.close()
+
+
+def init_slow_query_log(app: Flask, engines=None) -> Optional[SlowQueryLog]:
+    """
+    Писать запросы дольше SLOW_QUERY_MS в SLOW_QUERY_LOG: нормализованный SQL, форма параметров,
+    эндпоинт, кадр кода приложения и (один раз на отпечаток) план выполнения.
+    Слушает движки этого приложения, включая реплику.
+    """
+    threshold = app.config.get('SLOW_QUERY_MS')
+    path = app.config.get('SLOW_QUERY_LOG')
+    if not threshold or not path:
+        return None
+
+    from app.extensions import db
+    from app.utils.db_routing import REPLICA_EXTENSION
+
+    slow_log = SlowQueryLog(
+        path,
+        threshold_ms=threshold,
+        max_bytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+        backups=app.config['SLOW_QUERY_LOG_BACKUPS'],
+        with_plans=app.config.get('SLOW_QUERY_EXPLAIN', True),
+    )
+    if engines is None:
+        with app.app_context():
+            engines = list(db.engines.values())
+        if REPLICA_EXTENSION in app.extensions:
+            engines.append(app.extensions[REPLICA_EXTENSION])
+    for engine in engines:
+        slow_log.listen(engine)
+    app.extensions[SLOW_QUERY_EXTENSION] = slow_log
+    return slow_log
+
+
+def read_slow_log(path: str) -> Iterable[Dict[str, Any]]:
+    """
+    Записи журнала вместе с ротированными файлами (path.N ... path.1, path) - от старых к новым.
+    """
+    paths = []
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        paths.append(f'{path}.{index}')
+        index += 1
+    paths.reverse()
+    if os.path.exists(path):
+        paths.append(path)
+
+    for file_path in paths:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # строка, оборванная при аварийной остановке
+                    continue
+
+
+def summarize_slow_log(entries: Iterable[Dict[str, Any]], top: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Сводка по отпечаткам, отсортированная по суммарному времени: сколько раз, сколько всего и максимум,
+    откуда вызывался запрос и его план.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'endpoints': Counter(),
+            'frames': Counter(),
+            'plan': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+        group['endpoints'][entry.get('endpoint') or '-'] += 1
+        if entry.get('frame'):
+            group['frames'][entry['frame']] += 1
+        if group['plan'] is None and entry.get('plan'):
+            group['plan'] = entry['plan']
+
+    summary = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)
+    for group in summary:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 2)
+    return summary[:top] if top else summary
@@ -0,0 +1,29 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app.models.model_abc import SoftDeleteMixin
+
+# execution option, с которой выборка видит и мягко удалённые строки (PurgeService, подбор имён)
+INCLUDE_DELETED = 'include_deleted'
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _hide_soft_deleted(execute_state):
+    """
+    Добавить "deleted_at IS NULL" для моделей с SoftDeleteMixin в каждый ORM SELECT, включая JOIN.
+    Ленивые загрузки связей не фильтруются: уже начатые попытки и варианты продолжают видеть
+    свои задачи и вариант, пока их не удалит очистка.
+    """
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                SoftDeleteMixin,
+                lambda cls: cls.deleted_at.is_(None),
+                include_aliases=True,
+            )
+        )
@@ -0,0 +1,160 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# сколько самых частых запросов попадает в строку лога
+TOP_STATEMENTS = 3
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+# параметры в стиле format/pyformat (MySQL/PyMySQL, PostgreSQL/psycopg): %s, %(id_1_1)s
+_PYFORMAT_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Форма запроса без конкретных значений: литералы и параметры (%s, %(name)s) -> ?,
+    IN (?, ?, ?) -> IN (?), пробелы схлопнуты.
+    Запросы из одного цикла (N+1) дают один и тот же отпечаток.
+    """
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _PYFORMAT_PLACEHOLDER.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class RequestSqlStats:
+    """
+    Запросы к БД за один HTTP-запрос: количество, суммарное время и повторы по отпечаткам.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        return [
+            {'statement': statement, 'count': count}
+            for statement, count in self.fingerprints.most_common()
+            if count > threshold
+        ]
+
+
+def current_sql_stats() -> Optional[RequestSqlStats]:
+    return g.get('_sql_stats') if has_request_context() else None
+
+
+def add_server_timing(name: str, duration_ms: float, description: Optional[str] = None) -> None:
+    """
+    Добавить метрику в заголовок Server-Timing текущего ответа (видно во вкладке Timing в DevTools).
+    Одноимённые метрики суммируются.
+    """
+    if not has_request_context():
+        return
+    timings = g.setdefault('_server_timing', {})
+    previous = timings.get(name)
+    if previous is not None:
+        duration_ms += previous[0]
+        description = description or previous[1]
+    timings[name] = (duration_ms, description)
+
+
+def _server_timing_header(timings: Dict[str, tuple]) -> str:
+    parts = []
+    for name, (duration_ms, description) in timings.items():
+        part = f'{name};dur={duration_ms:.2f}'
+        if description:
+            part += f';desc="{description}"'
+        parts.append(part)
+    return ', '.join(parts)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_sql_stats() is not None:
+        conn.info.setdefault('_sql_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_sql_stats()
+    started = conn.info.get('_sql_started')
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _on_cursor_error(exception_context):
+    # after_cursor_execute при ошибке не вызывается - убираем отметку времени сами
+    conn = exception_context.connection
+    started = conn.info.get('_sql_started') if conn is not None else None
+    if started:
+        started.pop()
+
+
+def init_sql_instrumentation(app: Flask) -> None:
+    """
+    Считать SQL-запросы каждого HTTP-запроса (события курсора на всех движках) и отдавать итог
+    заголовком Server-Timing и строкой JSON в лог; повторяющиеся больше SQL_N_PLUS_ONE_THRESHOLD раз
+    запросы - предупреждением о возможном N+1.
+    """
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+
+    @app.before_request
+    def _start_sql_stats():
+        g._sql_stats = RequestSqlStats()
+
+    @app.after_request
+    def _report_sql_stats(response):
+        stats = g.pop('_sql_stats', None)
+        if stats is None:
+            return response
+
+        db_ms = stats.seconds * 1000
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        add_server_timing('db', db_ms, f'{stats.count} queries')
+        add_server_timing('app', total_ms)
+        timings = g.pop('_server_timing', {})
+        response.headers['Server-Timing'] = _server_timing_header(timings)
+
+        threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        repeated = stats.repeated(threshold)
+        logger.info(json.dumps({
+            'event': 'request_sql',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'top': [{'statement': s, 'count': c} for s, c in stats.fingerprints.most_common(TOP_STATEMENTS)],
+            # прочие метрики запроса (кеш фрагментов шаблонов и т.п.)
+            'timings': {name: round(ms, 2) for name, (ms, _) in timings.items() if name not in ('db', 'app')},
+        }, ensure_ascii=False))
+        for item in repeated:
+            logger.warning(
+                'Возможный N+1 в %s %s (%s): запрос выполнен %d раз: %s',
+                request.method, request.path, request.endpoint, item['count'], item['statement'],
+            )
+        return response
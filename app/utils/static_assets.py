@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Container, Dict, Optional, Tuple
+
+from flask import Flask, current_app, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость: без неё собираются только .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+# файл с хешем в имени не меняется никогда - браузер год не переспрашивает сервер
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.txt', '.html', '.map', '.xml'}
+# мелкие файлы сжатие почти не уменьшает
+MIN_COMPRESS_SIZE = 1024
+# (Content-Encoding, суффикс сжатой копии) в порядке предпочтения
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def hashed_name(path: str, digest: str) -> str:
+    """
+    css/base.css -> css/base.<хеш>.css
+    """
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # несколько воркеров могут собирать статику одновременно - файл появляется целиком или никак
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _compressed_copies(data: bytes) -> Dict[str, bytes]:
+    copies = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        copies['.br'] = brotli.compress(data, quality=11)
+    return {suffix: packed for suffix, packed in copies.items() if len(packed) < len(data)}
+
+
+def build_manifest(static_folder: str, build_dir: str) -> Dict[str, Any]:
+    """
+    Скопировать файлы static в build_dir под именами с хешем содержимого, текстовым файлам
+    положить рядом .gz (и .br, если установлен brotli) и записать manifest.json
+    {исходный путь: путь с хешем}. Уже собранные файлы не пересобираются, так что повторная
+    сборка после правки одного скрипта сводится к хешированию остальных.
+    Старые версии файлов не удаляются - их отдают воркеры, ещё не перезапущенные со старым манифестом.
+    :return: сколько файлов в манифесте, сколько записано заново и сколько из них сжато
+    """
+    manifest = {}
+    written = compressed = 0
+    for root, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            target_name = hashed_name(logical, hashlib.sha256(data).hexdigest())
+            manifest[logical] = target_name
+
+            target = os.path.join(build_dir, target_name)
+            if os.path.exists(target):
+                continue
+            # сжатые копии раньше самого файла: есть файл - есть и копии
+            if os.path.splitext(name)[1].lower() in _COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+                copies = _compressed_copies(data)
+                for suffix, packed in copies.items():
+                    _write_atomic(target + suffix, packed)
+                compressed += bool(copies)
+            _write_atomic(target, data)
+            written += 1
+
+    _write_atomic(
+        os.path.join(build_dir, MANIFEST_NAME),
+        json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'),
+    )
+    return {'files': len(manifest), 'written': written, 'compressed': compressed}
+
+
+def load_manifest(build_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def static_url(filename: str) -> str:
+    """
+    Адрес статического файла для шаблонов: версия с хешем из манифеста, а если файла в нём нет
+    (STATIC_ASSETS выключен, манифест не собран) - обычный /static/.
+    """
+    hashed = current_app.extensions.get('static_manifest', {}).get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', filename=hashed)
+
+
+def choose_variant(
+        build_dir: str, filename: str, accept_encodings, served: Container[str],
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Какой файл отдать под запрошенным именем: сжатую копию, которую принимает клиент, или сам файл.
+    :param served: имена с хешем из манифеста - manifest.json, недописанные .tmp и прочее в build_dir не отдаются
+    :return: (путь относительно build_dir, Content-Encoding или None); (None, None) - файла нет
+    """
+    if filename not in served:
+        return None, None
+    path = safe_join(build_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None, None
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.isfile(path + suffix):
+            return filename + suffix, encoding
+    return filename, None
+
+
+def init_static_assets(app: Flask) -> None:
+    app.add_template_global(static_url)
+    app.extensions['static_manifest'] = {}
+    app.extensions['static_served'] = frozenset()
+    if not app.config.get('STATIC_ASSETS'):
+        return
+
+    build_dir = app.config['STATIC_BUILD_DIR']
+    if app.config.get('STATIC_BUILD_ON_STARTUP'):
+        try:
+            build_manifest(app.static_folder, build_dir)
+        except OSError:
+            # например, каталог только для чтения - работаем с тем, что собрано командой flask static build
+            logger.exception('Не удалось собрать статику в %s', build_dir)
+    app.extensions['static_manifest'] = load_manifest(build_dir)
+    app.extensions['static_served'] = frozenset(app.extensions['static_manifest'].values())
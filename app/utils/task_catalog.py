@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.extensions import cache, db
+from app.models import Task, TaskAttachment
+from app.utils.db_routing import use_primary
+
+
+class TaskCatalog:
+    """
+    Сводка банка задач по номерам КИМ: сколько задач, когда добавлена последняя
+    и какая доля задач с вложениями. Считается одним GROUP BY и кешируется по версии,
+    которая растёт после коммита любых изменений задач или вложений.
+    Записи других процессов сюда не доходят - их догоняем по CACHE_DEFAULT_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    @staticmethod
+    def _compute() -> Dict[int, Dict[str, Any]]:
+        rows = (
+            db.session.query(
+                Task.number,
+                func.count(func.distinct(Task.id)).label('count'),
+                func.max(Task.published_at).label('latest_published_at'),
+                func.count(func.distinct(TaskAttachment.task_id)).label('with_attachments'),
+            )
+            .outerjoin(TaskAttachment, TaskAttachment.task_id == Task.id)
+            .group_by(Task.number)
+            .order_by(Task.number)
+            .all()
+        )
+        return {
+            row.number: {
+                'number': row.number,
+                'count': row.count,
+                'latest_published_at': row.latest_published_at.isoformat() if row.latest_published_at else None,
+                'attachments_share': round(row.with_attachments / row.count, 3) if row.count else 0.0,
+            }
+            for row in rows
+        }
+
+    def get(self) -> Dict[int, Dict[str, Any]]:
+        return cache.get_or_set(('task_catalog', self._version), self._compute_on_primary)
+
+    def _compute_on_primary(self) -> Dict[int, Dict[str, Any]]:
+        # запись кеша общая для всех запросов и привязана к версии, которую двигают коммиты основной БД:
+        # отставшая реплика (в @read_only) закрепила бы под новой версией старую сводку
+        with use_primary():
+            return self._compute()
+
+    def count(self, number: int) -> int:
+        entry = self.get().get(number)
+        return entry['count'] if entry else 0
+
+
+task_catalog = TaskCatalog()
+
+
+def _mark_dirty(session) -> None:
+    if session is not None:
+        session.info['task_catalog_dirty'] = True
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_update')
+@event.listens_for(Task, 'after_delete')
+@event.listens_for(TaskAttachment, 'after_insert')
+@event.listens_for(TaskAttachment, 'after_delete')
+def _task_changed(mapper, connection, target):
+    _mark_dirty(Session.object_session(target))
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('task_catalog_dirty', False):
+        task_catalog.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('task_catalog_dirty', None)
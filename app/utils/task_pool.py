@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from array import array
+from typing import Container, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Task
+from app.utils.db_routing import use_primary
+
+# даже без изменений в этом процессе пул перестраивается не реже, чем раз в POOL_MAX_AGE секунд:
+# задачи могли добавить другие воркеры
+POOL_MAX_AGE = 300
+# сколько случайных попыток на одну задачу делать при выборе с исключениями, прежде чем фильтровать номер целиком
+REJECTION_DRAWS_PER_ITEM = 8
+
+
+class TaskIdPool:
+    """
+    Индекс "номер КИМ -> массив id задач" для случайного выбора задач без ORDER BY RANDOM().
+    Строится лениво одним запросом и перестраивается, когда меняется версия
+    (добавление/удаление задачи, в том числе мягкое, или смена её номера).
+    """
+
+    def __init__(self, max_age: float = POOL_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._built_version = -1
+        self._built_at = 0.0
+        self._ids_by_number: Dict[int, array] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def _is_fresh(self) -> bool:
+        return self._built_version == self._version and time.monotonic() - self._built_at < self.max_age
+
+    def _ensure_built(self) -> None:
+        if self._is_fresh():
+            return
+
+        with self._lock:
+            if self._is_fresh():
+                return
+            version = self._version
+            ids_by_number: Dict[int, array] = {}
+            # пул общий для процесса и помечается версией от коммитов основной БД - строим его по ней, а не по реплике
+            with use_primary():
+                rows = db.session.query(Task.number, Task.id).order_by(Task.number, Task.id).all()
+            for number, task_id in rows:
+                ids_by_number.setdefault(number, array('q')).append(task_id)
+            self._ids_by_number = ids_by_number
+            self._built_version = version
+            self._built_at = time.monotonic()
+
+    def ids_for(self, numbers: Iterable[int]) -> List[int]:
+        self._ensure_built()
+        ids: List[int] = []
+        for number in numbers:
+            ids.extend(self._ids_by_number.get(number, ()))
+        return ids
+
+    def count(self, number: int) -> int:
+        self._ensure_built()
+        return len(self._ids_by_number.get(number, ()))
+
+    def sample(self, numbers: List[int], k: int, exclude: Optional[Container[int]] = None) -> List[int]:
+        """
+        Случайные k id задач указанных номеров КИМ (или меньше, если задач не хватает).
+        """
+        self._ensure_built()
+        if len(numbers) == 1:
+            # частый случай - без копирования массива
+            candidates = self._ids_by_number.get(numbers[0], array('q'))
+        else:
+            candidates = self.ids_for(numbers)
+
+        if not exclude:
+            return random.sample(candidates, min(k, len(candidates)))
+
+        # обычно исключённых немного: выбираем с отбраковкой за O(k), не просматривая весь номер
+        picked: List[int] = []
+        picked_set: Set[int] = set()
+        n = len(candidates)
+        for _ in range(REJECTION_DRAWS_PER_ITEM * k if n else 0):
+            task_id = candidates[random.randrange(n)]
+            if task_id in exclude or task_id in picked_set:
+                continue
+            picked.append(task_id)
+            picked_set.add(task_id)
+            if len(picked) == k:
+                return picked
+
+        # исключены почти все - честно отфильтровываем оставшиеся
+        rest = [task_id for task_id in candidates if task_id not in exclude and task_id not in picked_set]
+        return picked + random.sample(rest, min(k - len(picked), len(rest)))
+
+
+task_pool = TaskIdPool()
+
+
+def _mark_dirty(target) -> None:
+    session = inspect(target).session
+    if session is not None:
+        session.info['task_pool_dirty'] = True
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_delete')
+def _task_inserted_or_deleted(mapper, connection, target):
+    _mark_dirty(target)
+
+
+@event.listens_for(Task, 'after_update')
+def _task_updated(mapper, connection, target):
+    attrs = inspect(target).attrs
+    # мягкое удаление и восстановление тоже меняют состав пула
+    if attrs.number.history.has_changes() or attrs.deleted_at.history.has_changes():
+        _mark_dirty(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    # версию двигаем только после коммита, иначе пул мог бы перестроиться до того,
+    # как новая задача станет видна другим соединениям
+    if session.info.pop('task_pool_dirty', False):
+        task_pool.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('task_pool_dirty', None)
@@ -28,3 +28,44 @@ def make_snippet(html: str, max_chars: int = 600) -> str:
 
     # Можно доп. завернуть в <p>
     return Markup(f'<p>{safe}</p>')
+
+
+# теги, которые не должны попадать в условие задачи, отдаваемое во время экзамена
+_UNSAFE_TAGS = ['script', 'style', 'iframe', 'object', 'embed', 'form']
+
+
+def sanitize_html(html: str) -> str:
+    """
+    Очистка HTML условия: убираем исполняемые теги, обработчики on* и ссылки javascript:.
+    Разметка (таблицы, формулы, картинки) остаётся как есть.
+    """
+    if not html:
+        return ''
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for bad in soup(_UNSAFE_TAGS):
+        bad.decompose()
+
+    for tag in soup.find_all(True):
+        for attr in list(tag.attrs):
+            value = tag.attrs[attr]
+            if attr.lower().startswith('on'):
+                del tag.attrs[attr]
+            elif attr.lower() in ('href', 'src') and isinstance(value, str) \
+                    and value.strip().lower().startswith('javascript:'):
+                del tag.attrs[attr]
+
+    return str(soup)
+
+
+def escape_like(value: str, escape_char: str = '\\') -> str:
+    """
+    Экранировать спецсимволы LIKE (%, _ и сам символ экранирования), чтобы строка искалась буквально.
+    Использовать вместе с like(..., escape=escape_char).
+    """
+    return (
+        value
+        .replace(escape_char, escape_char * 2)
+        .replace('%', f'{escape_char}%')
+        .replace('_', f'{escape_char}_')
+    )
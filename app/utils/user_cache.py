@@ -0,0 +1,125 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.util import identity_key
+
+from app.extensions import cache, db
+from app.models import Role, User, UserRole
+from app.utils.db_routing import use_primary
+
+
+class UserCache:
+    """
+    Кеш пользователей для Flask-Login: вместо запроса пользователя и его ролей на каждый запрос
+    берём отсоединённую копию из app.extensions.cache и присоединяем её к сессии через merge(load=False).
+    В ключе кеша - версия пользователя, которая растёт после коммита изменений профиля или ролей
+    в этом процессе; изменения из других процессов догоняются по USER_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        # общая версия - на переименование/удаление ролей, которые касаются всех сразу
+        self._global_version = 0
+
+    def _key(self, user_id: int):
+        return 'user', user_id, self._global_version, self._versions.get(user_id, 0)
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._global_version += 1
+
+    @staticmethod
+    def _load_detached(user_id: int) -> Optional[User]:
+        # роли решают доступ, поэтому пользователя не читаем с отстающей реплики
+        with use_primary():
+            user = (
+                User.query
+                .options(selectinload(User.roles))
+                .filter(User.id == user_id)
+                .first()
+            )
+        if user is None:
+            return None
+        mask = user.role_mask
+        db.session.expunge(user)
+        user._role_mask = mask
+        return user
+
+    def load(self, user_id: int) -> Optional[User]:
+        loaded = db.session.identity_map.get(identity_key(User, user_id))
+        if loaded is not None:
+            # пользователь уже в сессии (например, только что изменён) - отдаём его как есть
+            return loaded
+
+        key = self._key(user_id)
+        detached = cache.get(key)
+        if detached is None:
+            detached = self._load_detached(user_id)
+            if detached is None:
+                return None
+            cache.set(key, detached, ttl=current_app.config.get('USER_CACHE_TTL', 30))
+
+        # копия из кеша не привязывается к сессии - в запрос отдаём её merge без SELECT
+        user = db.session.merge(detached, load=False)
+        user._role_mask = detached._role_mask
+        return user
+
+
+user_cache = UserCache()
+
+
+def _mark_dirty(session, user_id) -> None:
+    if session is not None and user_id is not None:
+        session.info.setdefault('user_cache_dirty', set()).add(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _mark_dirty(Session.object_session(target), target.id)
+
+
+@event.listens_for(UserRole, 'after_insert')
+@event.listens_for(UserRole, 'after_delete')
+def _user_role_changed(mapper, connection, target):
+    _mark_dirty(Session.object_session(target), target.user_id)
+
+
+@event.listens_for(User.roles, 'append')
+@event.listens_for(User.roles, 'remove')
+def _roles_collection_changed(target, value, initiator):
+    # маска на самом объекте тоже устарела
+    target.__dict__.pop('_role_mask', None)
+    _mark_dirty(Session.object_session(target), inspect(target).identity and target.id)
+
+
+@event.listens_for(Role, 'after_update')
+@event.listens_for(Role, 'after_delete')
+def _role_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['user_cache_dirty_all'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    user_ids = session.info.pop('user_cache_dirty', None)
+    if user_ids:
+        user_cache.bump(user_ids)
+    if session.info.pop('user_cache_dirty_all', False):
+        user_cache.bump_all()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('user_cache_dirty', None)
+    session.info.pop('user_cache_dirty_all', None)
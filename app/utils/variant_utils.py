@@ -1,8 +1,20 @@
-from typing import List, Tuple
+from typing import Collection, List, Optional, Set, Tuple
 
 from sqlalchemy import func
 
 from app.models import Task
+from app.utils.seen_tasks import seen_tasks
+from app.utils.task_pool import task_pool
+
+# номер КИМ считается "слабым", если доля верных ответов ниже порога;
+# слабый номер получает до WEAK_NUMBER_BONUS задач за счёт остальных
+WEAK_THRESHOLD = 0.5
+WEAK_NUMBER_BONUS = 1
+
+# полный вариант ЕГЭ: по одной задаче на номера 1-18, 19-21 (одна задача) и 22-27
+FULL_VARIANT_SPECS: List[Tuple[str, int]] = (
+    [(str(n), 1) for n in range(1, 19)] + [('19-21', 1)] + [(str(n), 1) for n in range(22, 28)]
+)
 
 
 def _parse_kim_key(kim_str: str) -> List[int]:
@@ -30,29 +42,126 @@ def _choose_random_via_sql(query, limit: int):
     return query.order_by(func.random()).limit(limit).all()
 
 
+def numbers_for_kim(kim_str: str) -> List[int]:
+    # 19-21 - это одна задача с номером 19
+    if kim_str.strip() == '19-21':
+        return [19]
+    return _parse_kim_key(kim_str)
+
+
+# номера КИМ, по одному на каждую задачу полного варианта
+FULL_VARIANT_NUMBERS: List[int] = sorted({n for kim, _ in FULL_VARIANT_SPECS for n in numbers_for_kim(kim)})
+
+
 def get_random_tasks_for_kim(kim_str: str, count: int) -> List[Task]:
+    """
+    Выбор через ORDER BY RANDOM() - полный просмотр задач номера на каждый вызов.
+    Оставлен для сравнения в benchmarks/bench_task_selection.py, в приложении используется build_tasks_set.
+    """
     if count <= 0:
         return []
 
     # Разбор ключа
-    numbers = _parse_kim_key(kim_str)
+    numbers = numbers_for_kim(kim_str)
     if not numbers:
         return []
 
-    if kim_str.strip() == '19-21':
-        q = Task.query.filter(Task.number == 19)
-    else:
-        q = Task.query.filter(Task.number.in_(numbers))
+    q = Task.query.filter(Task.number.in_(numbers))
     return _choose_random_via_sql(q, count)
 
 
-def build_tasks_set(specs: List[Tuple[str, int]]) -> List[Task]:
-    selected_tasks: List[Task] = []
+def fetch_tasks_in_order(task_ids: List[int]) -> List[Task]:
+    """
+    Загрузка задач одним запросом IN (...) с сохранением порядка task_ids.
+    """
+    if not task_ids:
+        return []
+
+    by_id = {t.id: t for t in Task.query.filter(Task.id.in_(task_ids)).all()}
+    # задачу могли удалить после построения пула - такие просто пропускаем
+    return [by_id[task_id] for task_id in task_ids if task_id in by_id]
+
+
+class _Excluded:
+    """
+    Объединение нескольких множеств id без копирования (для проверки `in`).
+    """
+
+    def __init__(self, *sets: Collection[int]):
+        self._sets = [s for s in sets if s]
+
+    def __contains__(self, item) -> bool:
+        return any(item in s for s in self._sets)
+
+    def __bool__(self) -> bool:
+        return bool(self._sets)
+
+
+def build_tasks_set(specs: List[Tuple[str, int]], avoid: Optional[Collection[int]] = None) -> List[Task]:
+    """
+    Случайный набор задач по спецификации [(номер КИМ, количество), ...].
+    id выбираются в памяти из task_pool (O(k) на номер), затем задачи загружаются одним запросом.
+    avoid - задачи, которые по возможности не брать: используются, только если других не хватает.
+    """
+    selected_ids: List[int] = []
+    used: Set[int] = set()
+    covered_numbers: Set[int] = set()
 
     for kim_str, want_count in specs:
         if want_count <= 0:
             continue
-        tasks = get_random_tasks_for_kim(kim_str, want_count)
-        selected_tasks.extend(tasks)
+        numbers = numbers_for_kim(kim_str)
+        if not numbers:
+            continue
+        # исключать уже выбранные нужно, только если диапазоны номеров пересеклись
+        overlap = used if covered_numbers.intersection(numbers) else None
+        exclude = _Excluded(overlap, avoid) if avoid else overlap
+        ids = task_pool.sample(numbers, want_count, exclude=exclude)
+        if avoid and len(ids) < want_count:
+            ids += task_pool.sample(numbers, want_count - len(ids), exclude=_Excluded(overlap, set(ids)))
+        selected_ids.extend(ids)
+        used.update(ids)
+        covered_numbers.update(numbers)
+
+    return fetch_tasks_in_order(selected_ids)
+
+
+def build_personal_tasks_set(specs: List[Tuple[str, int]],
+                             user_id: int,
+                             exclude_recent: bool = True,
+                             prefer_weak: bool = False) -> List[Task]:
+    """
+    Набор задач с учётом истории пользователя:
+    exclude_recent - не давать задачи, на которые он отвечал в последних попытках (если есть замена);
+    prefer_weak - перераспределить задачи в пользу номеров КИМ с долей верных ответов ниже WEAK_THRESHOLD
+    (см. reweight_specs), общее число задач остаётся тем, что запросил пользователь.
+    """
+    history = seen_tasks.get(user_id)
+
+    if prefer_weak:
+        specs = reweight_specs(specs, history.weak_numbers(WEAK_THRESHOLD))
+
+    return build_tasks_set(specs, avoid=history.seen_ids if exclude_recent else None)
+
+
+def reweight_specs(specs: List[Tuple[str, int]], weak: Set[int]) -> List[Tuple[str, int]]:
+    """
+    Каждому запрошенному слабому номеру - до WEAK_NUMBER_BONUS задач сверх заказанного за счёт
+    остальных номеров: забираем у номера с наибольшим количеством, но не последнюю задачу,
+    чтобы каждый выбранный номер остался в варианте. Сумма по спецификации не меняется.
+    """
+    counts = [cnt for _, cnt in specs]
+    is_weak = [cnt > 0 and weak.issuperset(numbers_for_kim(kim_str) or [0]) for kim_str, cnt in specs]
+
+    for i, weak_spec in enumerate(is_weak):
+        if not weak_spec:
+            continue
+        for _ in range(WEAK_NUMBER_BONUS):
+            donors = [j for j, cnt in enumerate(counts) if not is_weak[j] and cnt > 1]
+            if not donors:
+                break
+            donor = max(donors, key=lambda j: counts[j])
+            counts[donor] -= 1
+            counts[i] += 1
 
-    return selected_tasks
+    return [(kim_str, cnt) for (kim_str, _), cnt in zip(specs, counts)]
@@ -0,0 +1,93 @@
+import os
+import uuid
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+
+class ZipStream:
+    """
+    Файлоподобный объект для zipfile, который не держит архив в памяти:
+    записанные байты копятся в небольшом буфере и забираются через drain().
+    Метода seek() нет специально - zipfile тогда пишет data descriptor после каждого файла
+    и не возвращается к заголовкам.
+    """
+
+    def __init__(self, sink: Optional[BinaryIO] = None):
+        self._buffer = bytearray()
+        self._position = 0
+        self._sink = sink
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        self._position += len(data)
+        if self._sink is not None:
+            self._sink.write(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        if self._sink is not None:
+            self._sink.flush()
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+# (имя в архиве, дата изменения, сжимать ли, размер, поток содержимого)
+ZipEntry = Tuple[str, Tuple[int, int, int, int, int, int], bool, Optional[int], Iterable[bytes]]
+
+
+def iter_zip(entries: Iterable[ZipEntry], cache_path: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Генератор ZIP-архива. Если указан cache_path, архив параллельно пишется во временный файл,
+    который атомарно переименовывается в cache_path только после успешной отдачи последнего байта.
+    """
+    tmp_path = None
+    sink = None
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f'{cache_path}.{uuid.uuid4().hex}.tmp'
+            sink = open(tmp_path, 'wb')
+        except OSError:
+            tmp_path = sink = None
+
+    stream = ZipStream(sink)
+    completed = False
+    try:
+        with zipfile.ZipFile(stream, mode='w') as zf:
+            for name, date_time, compressible, size, chunks in entries:
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED if compressible else zipfile.ZIP_STORED
+                if size is not None:
+                    # по размеру zipfile решает, нужен ли zip64
+                    info.file_size = size
+                with zf.open(info, mode='w') as dest:
+                    for chunk in chunks:
+                        dest.write(chunk)
+                        data = stream.drain()
+                        if data:
+                            yield data
+                data = stream.drain()
+                if data:
+                    yield data
+        # центральный каталог дописывается при закрытии архива
+        data = stream.drain()
+        if data:
+            yield data
+        completed = True
+    finally:
+        if sink is not None:
+            sink.close()
+            if completed:
+                os.replace(tmp_path, cache_path)
+            else:
+                # клиент оборвал загрузку - недописанный архив не кешируем
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -0,0 +1,162 @@
+"""
+Горячие запросы статистики, дашборда и подбора задач на базе с ~1 млн ответов (attempt_answers):
+время с индексами из миграции e4c1d7a9b3f6 и после их удаления (DROP INDEX) на той же базе.
+
+    python -m benchmarks.bench_hot_queries --answers 1000000 --repeat 20
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, insert, text
+
+from app.extensions import db
+from app.models import Attempt, AttemptAnswer, Task, User, Variant, VariantTask
+from app.services.attempt_service import AttemptService
+from app.services.task_services import TaskService
+from app.utils.date_utils import utcnow
+from benchmarks.common import make_bench_app, measure
+
+HOT_INDEXES = (
+    'ix_attempts_user_finished',
+    'ix_attempts_finished_at',
+    'ix_attempts_unfinished',
+    'ix_tasks_number',
+    'ix_tasks_published_at',
+    'ix_users_registered_at',
+    'ix_variants_pooled_created',
+)
+TASKS_PER_VARIANT = 25
+BATCH = 50_000
+
+
+def _insert(model, rows):
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[i:i + BATCH])
+
+
+def populate(answers: int, users: int, variants: int, seed: int = 1):
+    rnd = random.Random(seed)
+    now = utcnow().replace(tzinfo=None)
+    days = lambda: timedelta(days=rnd.uniform(0, 365))
+
+    _insert(User, [
+        {'username': f'u{i}', 'first_name': 'B', 'last_name': 'W', 'password_hash': '-', 'registered_at': now - days()}
+        for i in range(users)
+    ])
+    numbers = [n for n in range(1, 28) if n not in (20, 21)]
+    _insert(Task, [
+        {'number': n, 'statement_html': '<p>bench</p>', 'answer': '1', 'published_at': now - days()}
+        for n in numbers for _ in range(200)
+    ])
+    _insert(Variant, [
+        {'created_at': now - days(), 'duration': 14100, 'is_pooled': i % 10 == 0}
+        for i in range(variants)
+    ])
+    task_ids = db.session.execute(text('SELECT id FROM tasks')).scalars().all()
+    _insert(VariantTask, [
+        {'variant_id': v, 'task_id': t, 'order': order}
+        for v in range(1, variants + 1)
+        for order, t in enumerate(rnd.sample(task_ids, TASKS_PER_VARIANT))
+    ])
+
+    attempts = answers // TASKS_PER_VARIANT
+    attempt_rows = []
+    for i in range(attempts):
+        started = now - days()
+        # 1% попыток ещё идёт - их и ищет проверка истечения времени
+        unfinished = i % 100 == 0
+        attempt_rows.append({
+            'user_id': rnd.randint(1, users),
+            'variant_id': rnd.randint(1, variants),
+            'started_at': now - timedelta(minutes=rnd.uniform(0, 60)) if unfinished else started,
+            'finished_at': None if unfinished else started + timedelta(hours=3),
+        })
+    _insert(Attempt, attempt_rows)
+
+    # у варианта v задачи с id (v-1)*25+1 .. v*25
+    answer_rows = [
+        {
+            'attempt_id': attempt_id,
+            'variant_task_id': (row['variant_id'] - 1) * TASKS_PER_VARIANT + k + 1,
+            'answer_text': '1',
+            'is_correct': rnd.random() < 0.6,
+            'updated_at': row['started_at'],
+        }
+        for attempt_id, row in enumerate(attempt_rows, start=1)
+        for k in range(TASKS_PER_VARIANT)
+    ]
+    _insert(AttemptAnswer, answer_rows)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    return len(answer_rows)
+
+
+def hot_queries(users: int):
+    now = utcnow().replace(tzinfo=None)
+    user_ids = iter(range(1, 10 ** 9))
+    return {
+        'статистика пользователя': lambda: (
+            Attempt.query
+            .filter_by(user_id=next(user_ids) % users + 1)
+            .filter(Attempt.finished_at.isnot(None))
+            .order_by(Attempt.finished_at.desc())
+            .limit(50)
+            .all()
+        ),
+        'последняя попытка': lambda: (
+            Attempt.query.filter(Attempt.finished_at.isnot(None)).order_by(Attempt.finished_at.desc()).first()
+        ),
+        'попытки за 30 дней': lambda: (
+            db.session.query(func.count(Attempt.id))
+            .filter(Attempt.finished_at.isnot(None), Attempt.finished_at >= now - timedelta(days=30))
+            .scalar()
+        ),
+        'задачи по номерам': lambda: TaskService.get_by_numbers([1, 2, 3]),
+        'последние задачи': lambda: Task.query.order_by(Task.published_at.desc()).limit(5).all(),
+        'последние варианты': lambda: (
+            Variant.query.filter(Variant.is_pooled.is_(False)).order_by(Variant.created_at.desc()).limit(5).all()
+        ),
+        'новые пользователи': lambda: User.query.filter(User.registered_at >= now - timedelta(days=7)).count(),
+        'истёкшие попытки': AttemptService.expire_overdue,
+    }
+
+
+def run(users: int, repeat: int):
+    results = {}
+    for name, query in hot_queries(users).items():
+        results[name] = measure(lambda: (query(), db.session.expunge_all()), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--answers', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--variants', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_bench_app()
+    with app.app_context():
+        db.create_all()
+        began = time.perf_counter()
+        total = populate(args.answers, args.users, args.variants)
+        print(f"ответов: {total}, заполнение: {time.perf_counter() - began:.1f} с")
+
+        indexed = run(args.users, args.repeat)
+        for name in HOT_INDEXES:
+            db.session.execute(text(f'DROP INDEX {name}'))
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        plain = run(args.users, args.repeat)
+
+    print(f"{'запрос':>24} | {'без индексов, мс':>16} | {'с индексами, мс':>15} | {'ускорение':>9}")
+    for name in indexed:
+        before, after = plain[name]['median'], indexed[name]['median']
+        print(f"{name:>24} | {before:>16.2f} | {after:>15.2f} | {before / after if after else 0:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
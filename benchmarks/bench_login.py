@@ -0,0 +1,88 @@
+"""
+Пропускная способность входа при разных настройках PASSWORD_HASH_METHOD:
+проверка хеша на одном ядре, она же на всех ядрах и полный POST /login через тестовый клиент.
+
+    python -m benchmarks.bench_login --methods pbkdf2:sha256:600000 scrypt:32768:8:1 --repeat 20
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.extensions import db
+from app.models import User
+from benchmarks.common import make_bench_app, measure
+
+PASSWORD = 'P@ssw0rd'
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:100000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+]
+
+
+def _verify_many(args) -> int:
+    password_hash, count = args
+    for _ in range(count):
+        check_password_hash(password_hash, PASSWORD)
+    return count
+
+
+def _parallel_rate(password_hash: str, workers: int, per_worker: int) -> float:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # прогрев: запуск процессов не должен попасть в замер
+        list(pool.map(_verify_many, [(password_hash, 1)] * workers))
+        start = time.perf_counter()
+        done = sum(pool.map(_verify_many, [(password_hash, per_worker)] * workers))
+        return done / (time.perf_counter() - start)
+
+
+def _http_login(app, method: str, repeat: int):
+    with app.app_context():
+        user = User.query.filter_by(username='bench_login').first()
+        user.password_hash = generate_password_hash(PASSWORD, method=method)
+        db.session.commit()
+    app.config['PASSWORD_HASH_METHOD'] = method
+
+    client = app.test_client()
+
+    def login():
+        resp = client.post('/login', data={'username': 'bench_login', 'password': PASSWORD})
+        assert resp.status_code == 302, resp.status_code
+
+    return measure(login, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    app = make_bench_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench_login', first_name='B', last_name='L', password_hash='-'))
+        db.session.commit()
+
+    print(f"ядер: {args.workers}")
+    print(f"{'метод':>24} | {'проверка, мс':>12} | {'входов/с на ядро':>16} | "
+          f"{'входов/с всего':>14} | {'POST /login, мс':>15}")
+    for method in args.methods:
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        verify = measure(lambda: check_password_hash(password_hash, PASSWORD), args.repeat)
+        total = _parallel_rate(password_hash, args.workers, args.repeat)
+        http = _http_login(app, method, args.repeat)
+        print(
+            f"{method:>24} | {verify['median']:>12.1f} | {1000 / verify['median']:>16.1f} | "
+            f"{total:>14.1f} | {http['median']:>15.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Конкурентная запись в SQLite: N потоков автосохраняют ответы (AttemptService.save_answer)
+при старом профиле (rollback journal, synchronous=FULL, busy_timeout драйвера - 5000 мс у pysqlite)
+и при профиле SQLITE_* по умолчанию (WAL, synchronous=NORMAL). Считаются ошибки блокировки и задержки.
+
+    python -m benchmarks.bench_sqlite_writes --threads 8 --saves 200
+"""
+import argparse
+import random
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.models import Attempt, Task, User
+from app.services.attempt_service import AttemptService
+from app.services.variant_services import VariantService
+from benchmarks.common import make_bench_app
+
+PROFILES = {
+    'rollback journal': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        # PRAGMA busy_timeout не выполняется - остаётся значение драйвера, как было до профиля
+        'SQLITE_BUSY_TIMEOUT': None,
+        'SQLITE_CACHE_SIZE': -2000,
+        'SQLITE_MMAP_SIZE': 0,
+        'SQLITE_TEMP_STORE': 'DEFAULT',
+    },
+    'WAL (SQLITE_* по умолчанию)': {},
+}
+
+
+def _prepare(threads: int):
+    tasks = [Task(number=n, statement_html='<p>bench</p>', answer=str(n)) for n in range(1, 28) if n not in (20, 21)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    variant, _ = VariantService.create_variant([t.id for t in tasks])
+    variant_task_ids = [vt.id for vt in variant.tasks]
+
+    attempts = []
+    for i in range(threads):
+        user = User(username=f'bench{i}', first_name='B', last_name='W', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        attempt = Attempt(user_id=user.id, variant_id=variant.id)
+        db.session.add(attempt)
+        db.session.flush()
+        attempts.append((attempt.id, user.id))
+    db.session.commit()
+    return attempts, variant_task_ids
+
+
+def _writer(app, attempt_id, user_id, variant_task_ids, saves, timings, errors, start):
+    with app.app_context():
+        start.wait()
+        for _ in range(saves):
+            began = time.perf_counter()
+            try:
+                variant_task_id = random.choice(variant_task_ids)
+                AttemptService.save_answer(attempt_id, variant_task_id, str(random.randint(1, 99)), user_id)
+            except OperationalError as e:
+                db.session.rollback()
+                errors.append(str(e.orig))
+                continue
+            timings.append((time.perf_counter() - began) * 1000)
+        db.session.remove()
+
+
+def run_profile(config, threads: int, saves: int):
+    app = make_bench_app(**config)
+    with app.app_context():
+        db.create_all()
+        attempts, variant_task_ids = _prepare(threads)
+
+    timings, errors = [], []
+    start = threading.Event()
+    workers = [
+        threading.Thread(
+            target=_writer,
+            args=(app, attempt_id, user_id, variant_task_ids, saves, timings, errors, start),
+        )
+        for attempt_id, user_id in attempts
+    ]
+    for worker in workers:
+        worker.start()
+    began = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    timings.sort()
+    return {
+        'saves': len(timings),
+        'locked': sum('locked' in e for e in errors),
+        'errors': len(errors),
+        'p50': timings[len(timings) // 2] if timings else 0.0,
+        'p99': timings[min(len(timings) - 1, int(len(timings) * 0.99))] if timings else 0.0,
+        'per_sec': len(timings) / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=100, help='Сохранений на поток')
+    args = parser.parse_args()
+
+    print(f"потоков: {args.threads}, сохранений на поток: {args.saves}")
+    print(f"{'профиль':>28} | {'успешно':>7} | {'locked':>6} | {'p50, мс':>8} | {'p99, мс':>8} | {'сохр./с':>8}")
+    for name, config in PROFILES.items():
+        r = run_profile(config, args.threads, args.saves)
+        print(
+            f"{name:>28} | {r['saves']:>7} | {r['locked']:>6} | "
+            f"{r['p50']:>8.2f} | {r['p99']:>8.2f} | {r['per_sec']:>8.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
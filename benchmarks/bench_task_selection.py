@@ -0,0 +1,70 @@
+"""
+Сравнение выбора случайных задач для полного варианта:
+ORDER BY RANDOM() LIMIT n на каждый номер КИМ против пула id в памяти (app.utils.task_pool).
+
+    python -m benchmarks.bench_task_selection --sizes 400 40000 400000
+"""
+import argparse
+import random
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Task
+from app.utils.task_pool import task_pool
+from app.utils.variant_utils import FULL_VARIANT_SPECS, build_tasks_set, get_random_tasks_for_kim
+from benchmarks.common import make_bench_app, measure
+
+BATCH = 10_000
+
+
+def _fill_tasks(count: int) -> None:
+    db.session.execute(Task.__table__.delete())
+    numbers = list(range(1, 20)) + list(range(22, 28))
+    for start in range(0, count, BATCH):
+        rows = [
+            {'number': random.choice(numbers), 'statement_html': '<p>bench</p>', 'answer': '1'}
+            for _ in range(min(BATCH, count - start))
+        ]
+        db.session.execute(insert(Task), rows)
+    db.session.commit()
+    task_pool.bump()
+
+
+def _via_sql():
+    out = []
+    for kim_str, cnt in FULL_VARIANT_SPECS:
+        out.extend(get_random_tasks_for_kim(kim_str, cnt))
+    db.session.expunge_all()
+    return out
+
+
+def _via_pool():
+    out = build_tasks_set(FULL_VARIANT_SPECS)
+    db.session.expunge_all()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[400, 40_000, 400_000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_bench_app()
+    with app.app_context():
+        db.create_all()
+        print(f"{'задач':>8} | {'ORDER BY RANDOM(), мс':>24} | {'пул, мс':>16} | {'построение пула, мс':>20}")
+        for size in args.sizes:
+            _fill_tasks(size)
+            build = measure(lambda: task_pool.ids_for([1]), repeat=1)
+            sql = measure(_via_sql, args.repeat)
+            pool = measure(_via_pool, args.repeat)
+            print(
+                f"{size:>8} | {sql['median']:>10.2f} (p99 {sql['p99']:>8.2f}) | "
+                f"{pool['median']:>6.2f} (p99 {pool['p99']:>5.2f}) | {build['mean']:>20.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
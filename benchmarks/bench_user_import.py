@@ -0,0 +1,60 @@
+"""
+Массовый импорт пользователей (UserImportService) при разном числе процессов хеширования:
+пользователей в секунду и ускорение относительно одного процесса.
+
+    python -m benchmarks.bench_user_import --users 500 --workers 1 2 4 8
+"""
+import argparse
+import os
+
+from faker import Faker
+
+from app.extensions import db
+from app.models.roles import ensure_default_roles
+from app.services.user_import_service import UserImportService
+from benchmarks.common import make_bench_app
+
+
+def _roster(count: int):
+    fake = Faker('ru_RU')
+    return [
+        {
+            'last_name': fake.last_name(),
+            'first_name': fake.first_name(),
+            'middle_name': fake.middle_name(),
+            'password': None,
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))))
+    parser.add_argument('--method', default=None, help='PASSWORD_HASH_METHOD (по умолчанию - из конфигурации)')
+    args = parser.parse_args()
+
+    config = {'PASSWORD_HASH_METHOD': args.method} if args.method else {}
+    app = make_bench_app(**config)
+    rows = _roster(args.users)
+    with app.app_context():
+        print(f"пользователей: {args.users}, метод: {app.config['PASSWORD_HASH_METHOD']}, ядер: {cores}")
+        print(f"{'процессов':>9} | {'всего, с':>8} | {'хеширование, с':>14} | {'польз./с':>9} | {'ускорение':>9}")
+        baseline = None
+        for workers in args.workers:
+            db.drop_all()
+            db.create_all()
+            ensure_default_roles()
+            report = UserImportService.import_users(rows, workers=workers)
+            baseline = baseline or report['users_per_sec']
+            print(
+                f"{workers:>9} | {report['total_seconds']:>8.2f} | {report['hash_seconds']:>14.2f} | "
+                f"{report['users_per_sec']:>9.1f} | {report['users_per_sec'] / baseline:>8.2f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
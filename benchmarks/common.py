@@ -0,0 +1,43 @@
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app import create_app
+from app.config import Config
+
+
+def make_bench_app(db_path: Optional[Path] = None, **config):
+    """
+    Приложение с отдельной SQLite-базой для бенчмарка (по умолчанию - во временной папке).
+    Дополнительные ключи config перекрывают настройки Config.
+    """
+    if db_path is None:
+        db_path = Path(tempfile.mkdtemp(prefix='kege_bench_')) / 'bench.db'
+
+    attrs = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'CACHE_DIR': str(db_path.parent / 'cache'),
+        **config,
+    }
+    bench_config = type('BenchConfig', (Config,), attrs)
+    return create_app(config_class=bench_config)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """
+    Запускает fn repeat раз, возвращает среднее/медиану/p99 в миллисекундах.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean': statistics.fmean(timings),
+        'median': statistics.median(timings),
+        'p99': timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
@@ -0,0 +1,27 @@
+"""Add index on task_attachments.task_id
+
+Revision ID: a3e8c5f1b7d2
+Revises: f1b9d4c7a2e5
+Create Date: 2026-10-19 21:05:37.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e8c5f1b7d2'
+down_revision = 'f1b9d4c7a2e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # вложения задачи догружаются по task_id (Task.attachments, сводка банка задач)
+    with op.batch_alter_table('task_attachments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_task_attachments_task_id'), ['task_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_attachments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_task_attachments_task_id'))
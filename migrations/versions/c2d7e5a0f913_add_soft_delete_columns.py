@@ -0,0 +1,37 @@
+"""Add soft delete columns
+
+Revision ID: c2d7e5a0f913
+Revises: 5a8f2c6e1d94
+Create Date: 2026-10-19 20:03:58.240917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d7e5a0f913'
+down_revision = '5a8f2c6e1d94'
+branch_labels = None
+depends_on = None
+
+TABLES = ('tasks', 'users', 'variants')
+
+
+def upgrade():
+    # частичный индекс: в нём только строки, ждущие очистки (PurgeService)
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(
+                f'ix_{table}_deleted_at', ['deleted_at'], unique=False,
+                sqlite_where=sa.text('deleted_at IS NOT NULL'),
+                postgresql_where=sa.text('deleted_at IS NOT NULL'),
+            )
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_deleted_at')
+            batch_op.drop_column('deleted_at')
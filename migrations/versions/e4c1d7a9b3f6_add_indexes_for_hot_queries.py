@@ -0,0 +1,60 @@
+"""Add indexes for hot queries
+
+Revision ID: e4c1d7a9b3f6
+Revises: b7e19f3c0d82
+Create Date: 2026-10-19 16:42:11.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c1d7a9b3f6'
+down_revision = 'b7e19f3c0d82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # частичные индексы есть в SQLite и PostgreSQL; на других СУБД условие игнорируется
+    # и индекс получается обычным
+    with op.batch_alter_table('attempts', schema=None) as batch_op:
+        batch_op.create_index('ix_attempts_user_finished', ['user_id', 'finished_at'], unique=False)
+        batch_op.create_index(
+            'ix_attempts_finished_at', ['finished_at'], unique=False,
+            sqlite_where=sa.text('finished_at IS NOT NULL'),
+            postgresql_where=sa.text('finished_at IS NOT NULL'),
+        )
+        batch_op.create_index(
+            'ix_attempts_unfinished', ['started_at'], unique=False,
+            sqlite_where=sa.text('finished_at IS NULL'),
+            postgresql_where=sa.text('finished_at IS NULL'),
+        )
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tasks_number'), ['number'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tasks_published_at'), ['published_at'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_registered_at'), ['registered_at'], unique=False)
+
+    with op.batch_alter_table('variants', schema=None) as batch_op:
+        batch_op.create_index('ix_variants_pooled_created', ['is_pooled', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('variants', schema=None) as batch_op:
+        batch_op.drop_index('ix_variants_pooled_created')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_registered_at'))
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tasks_published_at'))
+        batch_op.drop_index(batch_op.f('ix_tasks_number'))
+
+    with op.batch_alter_table('attempts', schema=None) as batch_op:
+        batch_op.drop_index('ix_attempts_unfinished')
+        batch_op.drop_index('ix_attempts_finished_at')
+        batch_op.drop_index('ix_attempts_user_finished')
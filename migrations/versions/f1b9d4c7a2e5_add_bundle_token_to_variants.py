@@ -0,0 +1,41 @@
+"""Add bundle token to variants
+
+Revision ID: f1b9d4c7a2e5
+Revises: c2d7e5a0f913
+Create Date: 2026-10-20 10:12:41.517203
+
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b9d4c7a2e5'
+down_revision = 'c2d7e5a0f913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('variants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bundle_token', sa.String(length=32), nullable=True))
+
+    # у каждой существующей строки свой токен
+    variants = sa.table('variants', sa.column('id', sa.Integer), sa.column('bundle_token', sa.String))
+    bind = op.get_bind()
+    ids = [row.id for row in bind.execute(sa.select(variants.c.id))]
+    if ids:
+        bind.execute(
+            variants.update().where(variants.c.id == sa.bindparam('variant_id')),
+            [{'variant_id': variant_id, 'bundle_token': uuid.uuid4().hex} for variant_id in ids],
+        )
+
+    with op.batch_alter_table('variants', schema=None) as batch_op:
+        batch_op.alter_column('bundle_token', existing_type=sa.String(length=32), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('variants', schema=None) as batch_op:
+        batch_op.drop_column('bundle_token')
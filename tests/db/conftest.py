@@ -1,13 +1,15 @@
 import os
+import shutil
 from pathlib import Path
 
 import pytest
+from flask import g
 from sqlalchemy import inspect, text
 from sqlalchemy.exc import SQLAlchemyError
 
 from app import create_app
 from app.config import Config
-from app.extensions import db as _db
+from app.extensions import cache, db as _db
 
 
 class TestConfig(Config):
@@ -32,6 +34,11 @@ def app(project_root, tmp_path_factory):
 
     class LocalTestConfig(TestConfig):
         SQLALCHEMY_DATABASE_URI = test_db_uri
+        CACHE_DIR = str(db_dir / 'cache')
+        SLOW_QUERY_LOG = str(db_dir / 'slow_queries.jsonl')
+        STATIC_BUILD_DIR = str(db_dir / 'static')
+        # в проде статику собирает flask static build, тестам нужен готовый манифест
+        STATIC_BUILD_ON_STARTUP = True
 
     app = create_app(config_class=LocalTestConfig)
 
@@ -64,10 +71,17 @@ def db(app):
     _db.session.remove()
     _db.drop_all()
 
+    # id в новой схеме начнутся заново - кешированное по id от прошлого теста не должно пригодиться
+    cache.clear()
+    shutil.rmtree(app.config['CACHE_DIR'], ignore_errors=True)
+
 
 @pytest.fixture(scope='function')
 def client(app, db):
-    return app.test_client()
+    yield app.test_client()
+
+    # контекст приложения общий на всю сессию, и Flask-Login кеширует пользователя в g
+    g.pop('_login_user', None)
 
 
 @pytest.fixture
@@ -0,0 +1,107 @@
+import gzip
+import io
+import os
+import zipfile
+
+from app.extensions import db as _db
+from app.models import Task, TaskAttachment, Variant, VariantTask
+from app.services.attachment_service import AttachmentService
+
+CSV_DATA = '\n'.join(f'{i};{i * i}' for i in range(2000)).encode()
+
+
+def _make_task():
+    task = Task(number=9, statement_html='<p>x</p>', answer='1')
+    _db.session.add(task)
+    _db.session.commit()
+    return task
+
+
+def test_text_attachment_is_stored_gzipped(db):
+    task = _make_task()
+    csv = AttachmentService.build_attachment(task.id, '9.csv', 'text/csv', CSV_DATA)
+    xlsx = AttachmentService.build_attachment(task.id, '9.xlsx', 'application/vnd.openxmlformats-officedocument'
+                                                                '.spreadsheetml.sheet', b'PK\x03\x04' + CSV_DATA)
+    _db.session.add_all([csv, xlsx])
+    _db.session.commit()
+
+    assert csv.encoding == 'gzip'
+    assert csv.size == len(CSV_DATA)
+    assert len(csv.data) < len(CSV_DATA)
+    assert gzip.decompress(csv.data) == CSV_DATA
+
+    # офисные форматы уже сжаты внутри - храним как есть
+    assert xlsx.encoding == 'identity'
+
+    report = AttachmentService.get_compression_report()
+    assert report[0]['number'] == 9
+    assert report[0]['files'] == 2
+    assert report[0]['saved'] == len(CSV_DATA) - len(csv.data)
+
+
+def test_download_gzip_attachment(client):
+    task = _make_task()
+    attachment = AttachmentService.build_attachment(task.id, '9.txt', 'text/plain', CSV_DATA)
+    _db.session.add(attachment)
+    _db.session.commit()
+    url = f'/attachments/{attachment.id}/download'
+
+    # клиент умеет gzip - получает сохранённый поток без перепаковки
+    resp = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.data == attachment.data
+
+    # клиент без gzip - потоковая распаковка
+    resp = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert resp.status_code == 200
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.data == CSV_DATA
+    assert 'attachment' in resp.headers['Content-Disposition']
+
+
+def test_compress_existing_attachments(db):
+    task = _make_task()
+    _db.session.add(TaskAttachment(task_id=task.id, filename='raw.txt', content_type='text/plain',
+                                   size=len(CSV_DATA), data=CSV_DATA))
+    _db.session.commit()
+
+    assert AttachmentService.compress_existing() == 1
+    stored = TaskAttachment.query.filter_by(task_id=task.id).one()
+    assert stored.encoding == 'gzip'
+    assert gzip.decompress(stored.data) == CSV_DATA
+
+
+def test_variant_attachments_zip(client):
+    first, second = _make_task(), _make_task()
+    variant = Variant()
+    _db.session.add(variant)
+    _db.session.commit()
+    _db.session.add_all([
+        VariantTask(variant_id=variant.id, task_id=second.id, order=1),
+        VariantTask(variant_id=variant.id, task_id=first.id, order=0),
+        AttachmentService.build_attachment(first.id, 'a.csv', 'text/csv', CSV_DATA),
+        AttachmentService.build_attachment(second.id, 'b.bin', 'application/octet-stream', b'\x00\x01' * 100),
+    ])
+    _db.session.commit()
+
+    resp = client.get(f'/variants/{variant.id}/attachments.zip')
+    assert resp.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(resp.data))
+    assert archive.namelist() == ['01_9_a.csv', '02_9_b.bin']
+    assert archive.read('01_9_a.csv') == CSV_DATA
+
+    # после первой отдачи архив лежит в кеше и отдаётся файлом
+    manifest = AttachmentService.get_variant_manifest(variant.id)
+    cache_path = AttachmentService.get_zip_cache_path(variant, AttachmentService.get_manifest_hash(manifest))
+    assert os.path.exists(cache_path)
+    cached = client.get(f'/variants/{variant.id}/attachments.zip')
+    assert cached.data == resp.data
+
+    # новое вложение поднимает revision: архив собирается заново, прошлый удаляется
+    _db.session.add(AttachmentService.build_attachment(second.id, 'c.txt', 'text/plain', b'c'))
+    _db.session.commit()
+    updated = client.get(f'/variants/{variant.id}/attachments.zip')
+    assert zipfile.ZipFile(io.BytesIO(updated.data)).namelist() == ['01_9_a.csv', '02_9_b.bin', '02_9_c.txt']
+    assert not os.path.exists(cache_path)
+    assert len(os.listdir(os.path.dirname(cache_path))) == 1
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+import pytest
+
+from app.extensions import db as _db
+from app.models import (
+    ArchivedAttempt, ArchivedAttemptAnswer, Attempt, AttemptAnswer, AttemptSummary, Task, User, Variant,
+)
+from app.services.attempt_archive_service import MIN_ARCHIVE_DAYS, AttemptArchiveService
+from app.services.user_stats_service import UserStatsService
+from app.services.variant_services import VariantService
+from app.utils.date_utils import utcnow
+
+
+def _attempt(user, variant, finished_days_ago, answers):
+    finished_at = utcnow() - timedelta(days=finished_days_ago) if finished_days_ago is not None else None
+    attempt = Attempt(
+        user_id=user.id,
+        variant_id=variant.id,
+        started_at=(finished_at or utcnow()) - timedelta(hours=2),
+        finished_at=finished_at,
+    )
+    _db.session.add(attempt)
+    _db.session.flush()
+    for vt, (text, is_correct) in zip(variant.tasks, answers):
+        _db.session.add(AttemptAnswer(attempt_id=attempt.id, variant_task_id=vt.id,
+                                      answer_text=text, is_correct=is_correct))
+    return attempt
+
+
+def test_old_attempts_move_to_archive_with_summaries(db):
+    user = User(username='archive_user', first_name='Иван', last_name='Иванов', password_hash='x')
+    tasks = [Task(number=5, statement_html='<p>5</p>', answer='42'),
+             Task(number=19, statement_html='<p>19</p>', answer='1,2,3')]
+    _db.session.add_all([user, *tasks])
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([t.id for t in tasks], source='Демо')
+
+    old = [
+        _attempt(user, variant, 400, [('42', True), ('1,2,9', False)]),
+        _attempt(user, variant, 300, [('41', False), ('1,2,3', True)]),
+        _attempt(user, variant, 200, [('42', True)]),
+    ]
+    recent = _attempt(user, variant, 10, [('42', True), ('1,0,3', False)])
+    unfinished = _attempt(user, variant, None, [('42', True)])
+    _db.session.commit()
+    old_ids = sorted(a.id for a in old)
+    live_ids = sorted([recent.id, unfinished.id])
+
+    history = UserStatsService.get_user_attempts(user.id)
+    summary = UserStatsService.get_summary_stats(user.id)
+    _db.session.expunge_all()
+
+    report = AttemptArchiveService.archive(older_than_days=180, batch_size=2)
+    assert (report['archived'], report['answers'], report['batches']) == (3, 5, 2)
+
+    assert sorted(a.id for a in Attempt.query.all()) == live_ids
+    assert AttemptAnswer.query.filter(AttemptAnswer.attempt_id.in_(old_ids)).count() == 0
+    assert sorted(a.id for a in ArchivedAttempt.query.all()) == old_ids
+    assert ArchivedAttemptAnswer.query.count() == 5
+    assert sorted(s.id for s in AttemptSummary.query.all()) == old_ids
+
+    # история профиля и сводка те же, только без ссылки на разбор архивных попыток
+    archived_history = UserStatsService.get_user_attempts(user.id)
+    assert [a['id'] for a in archived_history] == [a['id'] for a in history]
+    for before, after in zip(history, archived_history):
+        assert {k: v for k, v in after.items() if k != 'is_archived'} == before
+    assert [a.get('is_archived', False) for a in archived_history] == [False, True, True, True]
+    assert UserStatsService.get_summary_stats(user.id) == {**summary, 'archived_attempts': 3}
+
+    # повторный запуск ничего не находит, а удаление варианта архив не задевает
+    assert AttemptArchiveService.archive(older_than_days=180)['archived'] == 0
+    _db.session.delete(_db.session.get(Variant, variant.id))
+    _db.session.commit()
+    assert AttemptSummary.query.count() == 3
+
+
+def test_archive_rejects_window_shorter_than_stats(app, db):
+    user = User(username='archive_days', first_name='Иван', last_name='Иванов', password_hash='x')
+    task = Task(number=5, statement_html='<p>5</p>', answer='42')
+    _db.session.add_all([user, task])
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([task.id])
+    _attempt(user, variant, 30, [('42', True)])
+    _db.session.commit()
+
+    with pytest.raises(ValueError):
+        AttemptArchiveService.archive(older_than_days=MIN_ARCHIVE_DAYS - 1)
+    result = app.test_cli_runner().invoke(args=['attempts', 'archive', '--days', '30'])
+    assert result.exit_code != 0 and str(MIN_ARCHIVE_DAYS) in result.output
+    # ответы, которые читает статистика по номерам, на месте
+    assert AttemptAnswer.query.count() == 1 and ArchivedAttempt.query.count() == 0
+
+
+def test_stats_page_drops_links_to_archived_attempts(client, db):
+    user = User(username='archive_page', first_name='Иван', last_name='Иванов', password_hash='x')
+    task = Task(number=5, statement_html='<p>5</p>', answer='42')
+    _db.session.add_all([user, task])
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([task.id])
+    old = _attempt(user, variant, 200, [('42', True)])
+    _attempt(user, variant, 10, [('42', True)])
+    _db.session.commit()
+    old_link = f'/attempts/{old.id}/results-page'
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+    assert old_link in client.get('/profile/stats').get_data(as_text=True)
+
+    # число попыток и последняя попытка те же - блок всё равно рендерится заново
+    AttemptArchiveService.archive(older_than_days=180)
+    resp = client.get('/profile/stats')
+    assert 'tpl-render' in resp.headers['Server-Timing']
+    assert old_link not in resp.get_data(as_text=True)
+    assert 'В архиве' in resp.get_data(as_text=True)
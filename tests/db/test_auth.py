@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db as _db
+from app.models import User
+from app.services.user_import_service import UserImportService
+from app.utils.password_utils import hash_password, needs_rehash
+
+
+def test_login_rehashes_password_with_outdated_policy(app, client, db):
+    user = User(username='rehash_user', first_name='A', last_name='B',
+                password_hash=generate_password_hash('P@ssw0rd', method='pbkdf2:sha256:2000'))
+    _db.session.add(user)
+    _db.session.commit()
+
+    method = app.config['PASSWORD_HASH_METHOD']
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    try:
+        # неверный пароль хеш не трогает
+        client.post('/login', data={'username': 'rehash_user', 'password': 'wrong'})
+        assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+
+        resp = client.post('/login', data={'username': 'rehash_user', 'password': 'P@ssw0rd'})
+        assert resp.status_code == 302
+        _db.session.expire_all()
+        rehashed = _db.session.get(User, user.id).password_hash
+        assert rehashed.startswith('pbkdf2:sha256:1000$')
+
+        # хеш уже по текущей политике - повторный вход его не меняет
+        client.post('/login', data={'username': 'rehash_user', 'password': 'P@ssw0rd'})
+        _db.session.expire_all()
+        assert _db.session.get(User, user.id).password_hash == rehashed
+        assert _db.session.get(User, user.id).check_password('P@ssw0rd')
+    finally:
+        app.config['PASSWORD_HASH_METHOD'] = method
+
+
+def test_shorthand_hash_method_does_not_force_rehash(app):
+    method = app.config['PASSWORD_HASH_METHOD']
+    try:
+        for shorthand in ('scrypt', 'pbkdf2'):
+            app.config['PASSWORD_HASH_METHOD'] = shorthand
+            # в хеш метод пишется с параметрами: 'scrypt:32768:8:1', 'pbkdf2:sha256:1000000'
+            assert not needs_rehash(hash_password('P@ssw0rd'))
+        assert needs_rehash(generate_password_hash('P@ssw0rd', method='scrypt:16384:8:1'))
+    finally:
+        app.config['PASSWORD_HASH_METHOD'] = method
+
+
+def test_bulk_import_allocates_usernames_and_role_links(app, db):
+    _db.session.add(User(username='II_Ivanov', first_name='И', last_name='Иванов', password_hash='h'))
+    _db.session.commit()
+
+    rows = UserImportService.parse_roster(
+        'last_name;first_name;middle_name;password\n'
+        'Иванов;Иван;Иванович;\n'
+        'Иванов;Игорь;Ильич;Secr3t!pass\n'
+        'Петров;Пётр;;\n'
+        ';;;\n'
+    )
+    assert len(rows) == 3
+
+    method = app.config['PASSWORD_HASH_METHOD']
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    try:
+        # два процесса - чтобы пройти через пул и проверить порядок хешей
+        report = UserImportService.import_users(rows * 4, workers=2)
+    finally:
+        app.config['PASSWORD_HASH_METHOD'] = method
+
+    assert report['created'] == 12
+    usernames = [u['username'] for u in report['users']]
+    assert usernames[:3] == ['II_Ivanov2', 'II_Ivanov3', 'P_Petrov']
+    assert len(set(usernames)) == 12
+
+    for entry in report['users']:
+        user = _db.session.get(User, entry['id'])
+        assert user.username == entry['username']
+        assert user.has_role('user')
+        assert user.check_password(entry['password'] or 'Secr3t!pass')
+    assert report['users'][1]['password'] is None
+
+
+def test_bulk_import_without_executemany_returning(app, db, monkeypatch):
+    # как на MySQL: RETURNING для executemany диалект не поддерживает
+    dialect = _db.session.get_bind().dialect
+    monkeypatch.setattr(dialect, 'insert_executemany_returning', False)
+    monkeypatch.setattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+
+    rows = UserImportService.parse_roster('last_name,first_name,password\nСидоров,Семён,Secr3t!pass\nАзбукин,Яков,Secr3t!pass\n')
+    report = UserImportService.import_users(rows, workers=1)
+
+    assert [u['username'] for u in report['users']] == ['S_Sidorov', 'Y_Azbukin']
+    for entry in report['users']:
+        user = _db.session.get(User, entry['id'])
+        assert user.username == entry['username']
+        assert user.has_role('user')
+
+
+def test_roster_requires_name_columns(db):
+    with pytest.raises(ValueError):
+        UserImportService.parse_roster('name,password\nИван,1\n')
+    with pytest.raises(ValueError):
+        UserImportService.parse_roster('last_name,first_name\nИванов,\n')
+
+
+def test_generate_usernames_parses_suffixes_in_one_query(db):
+    for username in ('II_Ivanov', 'II_Ivanov2', 'II_Ivanov02', 'II_Ivanova', 'IIxIvanov5'):
+        _db.session.add(User(username=username, first_name='И', last_name='Иванов', password_hash='h'))
+    _db.session.commit()
+
+    people = [('Иван', 'Иванов', 'Иванович'), ('Игорь', 'Иванов', 'Ильич'), ('Пётр', 'Петров', None)]
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(_db.engine, 'before_cursor_execute', before)
+    try:
+        usernames = User.generate_usernames(people)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before)
+
+    assert usernames == ['II_Ivanov3', 'II_Ivanov4', 'P_Petrov']
+    assert len(statements) == 1
+    assert User.generate_username('Иван', 'Иванов', 'Иванович') == 'II_Ivanov3'
+
+
+def test_add_with_unique_username_retries_on_conflict(db, monkeypatch):
+    _db.session.add(User(username='II_Ivanov', first_name='И', last_name='Иванов', password_hash='h'))
+    _db.session.commit()
+
+    # первый подбор "не видит" занятое имя - как при параллельной регистрации
+    real = User._taken_suffixes.__func__
+    calls = []
+
+    def stale_then_real(cls, bases):
+        calls.append(bases)
+        return {} if len(calls) == 1 else real(cls, bases)
+
+    monkeypatch.setattr(User, '_taken_suffixes', classmethod(stale_then_real))
+
+    user = User(first_name='Иван', last_name='Иванов', middle_name='Иванович', password_hash='h')
+    User.add_with_unique_username(user)
+    _db.session.commit()
+
+    assert len(calls) == 2
+    assert user.username == 'II_Ivanov2'
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+from flask import g, session as flask_session
+
+from app import create_app
+from app.extensions import db as _db
+from app.models import Task
+from app.models.roles import ensure_default_roles
+from app.utils.db_routing import REPLICA_EXTENSION, STICKY_SESSION_KEY, sync_sqlite_replica
+from app.utils.task_pool import task_pool
+from tests.db.conftest import TestConfig
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        REPLICA_DATABASE_URI = f"sqlite:///{tmp_path / 'replica.db'}"
+        CACHE_DIR = str(tmp_path / 'cache')
+        SLOW_QUERY_LOG = str(tmp_path / 'slow_queries.jsonl')
+        STATIC_BUILD_DIR = str(tmp_path / 'static')
+
+    app = create_app(config_class=ReplicaConfig)
+
+    @app.route('/_write_task', methods=['POST'])
+    def _write_task():
+        _db.session.add(Task(number=5, statement_html='<p>w</p>', answer='1'))
+        _db.session.commit()
+        return 'ok'
+
+    with app.app_context():
+        _db.create_all()
+        ensure_default_roles()
+        _db.session.add(Task(number=5, statement_html='<p>1</p>', answer='1'))
+        _db.session.commit()
+        sync_sqlite_replica(app)
+        # эта задача есть только на основной БД, пока реплику не синхронизировали
+        _db.session.add(Task(number=5, statement_html='<p>2</p>', answer='2'))
+        _db.session.commit()
+
+    # контекст приложения не держим: каждый запрос клиента получает свой, как в проде
+    yield app
+
+    app.extensions[REPLICA_EXTENSION].dispose()
+    with app.app_context():
+        _db.engine.dispose()
+
+
+def _by_numbers(client):
+    return len(client.post('/api/tasks/by_numbers', json={'numbers': [5]}).get_json()['tasks'])
+
+
+def test_read_only_views_read_from_replica(replica_app):
+    client = replica_app.test_client()
+    assert _by_numbers(client) == 1
+    # без @read_only - основная БД
+    with replica_app.app_context():
+        assert Task.query.count() == 2
+
+    # после своей записи пользователь какое-то время читает с основной БД
+    client.post('/_write_task')
+    with client.session_transaction() as sess:
+        assert sess[STICKY_SESSION_KEY] > time.time()
+    assert _by_numbers(client) == 3
+    # у других пользователей - по-прежнему реплика
+    assert _by_numbers(replica_app.test_client()) == 1
+
+    sync_sqlite_replica(replica_app)
+    assert _by_numbers(replica_app.test_client()) == 3
+
+
+def test_reads_after_write_in_same_session_use_primary(replica_app):
+    with replica_app.test_request_context():
+        g.db_read_only = True
+        assert Task.query.count() == 1
+        _db.session.add(Task(number=7, statement_html='<p>3</p>', answer='3'))
+        _db.session.flush()
+        assert Task.query.count() == 3
+        _db.session.rollback()
+        _db.session.remove()
+        assert STICKY_SESSION_KEY not in flask_session
+
+
+def test_shared_caches_are_built_from_primary(replica_app):
+    # реплика отстаёт на одну задачу, но сводка и пул кешируются по версии основной БД
+    client = replica_app.test_client()
+    numbers = client.get('/api/tasks/catalog').get_json()['numbers']
+    assert [entry['count'] for entry in numbers if entry['number'] == 5] == [2]
+
+    with replica_app.test_request_context():
+        g.db_read_only = True
+        task_pool.bump()
+        assert task_pool.count(5) == 2
@@ -0,0 +1,44 @@
+from flask import render_template_string
+
+from app.extensions import db as _db
+from app.models import Task
+from app.services.variant_services import VariantService
+
+
+def test_task_and_variant_blocks_are_cached_until_revision_changes(client, db):
+    tasks = [Task(number=5, statement_html='<p>Первое условие</p>', answer='1'),
+             Task(number=7, statement_html='<p>Второе условие</p>', answer='2')]
+    _db.session.add_all(tasks)
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([t.id for t in tasks])
+    task_id, variant_id = tasks[0].id, variant.id
+
+    first = client.get(f'/tasks/view_task/{task_id}')
+    second = client.get(f'/tasks/view_task/{task_id}')
+    assert 'tpl-render;dur=' in first.headers['Server-Timing']
+    assert 'tpl-hit;dur=' in second.headers['Server-Timing']
+    assert 'tpl-render' not in second.headers['Server-Timing']
+    assert second.get_data(as_text=True) == first.get_data(as_text=True)
+
+    client.get(f'/variants/view_variant/{variant_id}')
+    assert 'tpl-hit' in client.get(f'/variants/view_variant/{variant_id}').headers['Server-Timing']
+
+    # правка условия поднимает revision задачи и вариантов с ней - оба блока рендерятся заново
+    _db.session.get(Task, task_id).statement_html = '<p>Исправленное условие</p>'
+    _db.session.commit()
+    for url in (f'/tasks/view_task/{task_id}', f'/variants/view_variant/{variant_id}'):
+        resp = client.get(url)
+        assert 'tpl-render' in resp.headers['Server-Timing']
+        assert 'Исправленное условие' in resp.get_data(as_text=True)
+        assert 'Первое условие' not in resp.get_data(as_text=True)
+
+
+def test_cache_tag_keeps_escaping_and_can_be_disabled(app, db, monkeypatch):
+    source = '{% cache key, 60 %}{{ value }}{% endcache %}'
+    with app.test_request_context():
+        assert render_template_string(source, key=('a', [1]), value='<b>') == '&lt;b&gt;'
+        assert render_template_string(source, key=('a', [1]), value='<i>') == '&lt;b&gt;'
+        assert render_template_string(source, key=('a', [2]), value='<i>') == '&lt;i&gt;'
+
+        monkeypatch.setitem(app.config, 'FRAGMENT_CACHE', False)
+        assert render_template_string(source, key=('a', [1]), value='<u>') == '&lt;u&gt;'
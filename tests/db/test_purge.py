@@ -0,0 +1,77 @@
+from app.extensions import db as _db
+from app.models import Attempt, AttemptAnswer, Task, User, Variant, VariantTask
+from app.services.purge_service import PurgeService
+from app.services.task_services import TaskService
+from app.services.variant_bundle_service import VariantBundleService
+from app.services.variant_services import VariantService
+from app.utils.soft_delete import INCLUDE_DELETED
+from app.utils.task_catalog import task_catalog
+
+
+def _with_deleted(model):
+    return model.query.execution_options(**{INCLUDE_DELETED: True})
+
+
+def test_deleted_task_is_hidden_and_purged_in_batches(db):
+    user = User(username='purge_student', first_name='A', last_name='B', password_hash='h')
+    tasks = [Task(number=5, statement_html='<p>5</p>', answer='1'),
+             Task(number=7, statement_html='<p>7</p>', answer='2')]
+    _db.session.add_all([user, *tasks])
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([t.id for t in tasks])
+    for _ in range(3):
+        attempt = Attempt(user_id=user.id, variant_id=variant.id)
+        _db.session.add(attempt)
+        _db.session.flush()
+        _db.session.add_all([AttemptAnswer(attempt_id=attempt.id, variant_task_id=vt.id, answer_text='1')
+                             for vt in variant.tasks])
+    _db.session.commit()
+    task_id, variant_id, revision = tasks[0].id, variant.id, variant.revision
+
+    PurgeService.soft_delete(tasks[0])
+    _db.session.expunge_all()
+
+    # из выборок задача пропала сразу, зависимые строки пока на месте
+    assert _db.session.get(Task, task_id) is None
+    assert TaskService.get_by_numbers([5]) == []
+    assert task_catalog.count(5) == 0
+    variant = _db.session.get(Variant, variant_id)
+    assert variant.revision > revision
+    assert [t['number'] for t in VariantBundleService.get(variant)['tasks']] == [7]
+    assert PurgeService.status() == [{
+        'entity': 'task',
+        'id': task_id,
+        'deleted_at': _with_deleted(Task).filter_by(id=task_id).one().deleted_at,
+        'remaining': {'attempt_answers': 3, 'variant_tasks': 1},
+    }]
+
+    report = PurgeService.run(batch_size=2)
+    # ответы 2 + 1, связь с вариантом, сама задача
+    assert (report['batches'], report['rows'], report['purged']) == (4, 5, [f'task#{task_id}'])
+    assert _with_deleted(Task).filter_by(id=task_id).first() is None
+    assert VariantTask.query.filter_by(task_id=task_id).count() == 0
+    assert AttemptAnswer.query.count() == 3
+    assert Attempt.query.count() == 3
+    assert PurgeService.status() == []
+    assert PurgeService.purge_batch() is None
+
+
+def test_deleted_user_cannot_log_in_and_is_purged(client, db):
+    user = User(username='II_Ivanov', first_name='Иван', last_name='Иванов', middle_name='Иванович')
+    user.set_password('P@ssw0rd')
+    _db.session.add(user)
+    _db.session.flush()
+    task = Task(number=3, statement_html='<p>3</p>', answer='1', author_id=user.id)
+    _db.session.add(task)
+    _db.session.commit()
+    user_id, task_id = user.id, task.id
+
+    PurgeService.soft_delete(user)
+    resp = client.post('/login', data={'username': 'II_Ivanov', 'password': 'P@ssw0rd'})
+    assert resp.status_code != 302
+    # имя удалённого, но ещё не очищенного пользователя занято
+    assert User.generate_username('Иван', 'Иванов', 'Иванович') == 'II_Ivanov2'
+
+    PurgeService.run()
+    assert _with_deleted(User).filter_by(id=user_id).first() is None
+    assert _db.session.get(Task, task_id).author_id is None
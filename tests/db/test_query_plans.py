@@ -0,0 +1,132 @@
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Attempt, Task, User, Variant
+from app.services.attempt_service import AttemptService
+from app.services.dashboard_service import DashboardService
+from app.services.task_services import TaskService
+from app.services.user_stats_service import UserStatsService
+from app.utils.date_utils import utcnow
+
+# шаг плана, читающий таблицу: SCAN/SEARCH <таблица> [USING ...]
+TABLE_ACCESS = re.compile(r'^(SCAN|SEARCH) \w+')
+# допустимый доступ к таблице: по индексу, а поиск по первичному ключу - явно разрешён
+INDEXED_ACCESS = re.compile(r'USING (COVERING )?INDEX \w+')
+PRIMARY_KEY_LOOKUP = re.compile(r'^SEARCH \w+ USING INTEGER PRIMARY KEY \(rowid=\?\)')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+# запросы, которые идут в базу и тоже должны попадать в индекс
+PLANNED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+@contextmanager
+def captured_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(PLANNED_STATEMENTS) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def query_plan(db, statement, parameters):
+    with db.engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+@pytest.fixture
+def sample(db):
+    now = utcnow()
+    user = User(username='stats_user', first_name='Иван', last_name='Иванов', password_hash='x')
+    task = Task(number=5, statement_html='<p>5</p>', answer='1')
+    variant = Variant(source='Тест')
+    db.session.add_all([user, task, variant])
+    db.session.flush()
+    db.session.add_all([
+        Attempt(user_id=user.id, variant_id=variant.id, started_at=now - timedelta(hours=5),
+                finished_at=now - timedelta(hours=1)),
+        Attempt(user_id=user.id, variant_id=variant.id, started_at=now - timedelta(hours=5)),
+    ])
+    db.session.commit()
+    return user
+
+
+HOT_QUERIES = {
+    'user_stats': lambda user: UserStatsService.get_user_attempts(user.id),
+    'recent_users': lambda user: DashboardService.get_recent_users(),
+    'recent_tasks': lambda user: DashboardService.get_recent_tasks(),
+    'recent_variants': lambda user: DashboardService.get_recent_variants(),
+    'latest_attempt': lambda user: DashboardService.get_latest_completed_attempt(),
+    'score_distribution': lambda user: DashboardService.get_score_distribution(),
+    'tasks_by_numbers': lambda user: TaskService.get_by_numbers([5, 7, 19]),
+    'expire_overdue': lambda user: AttemptService.expire_overdue(),
+}
+
+
+def unindexed_steps(plan):
+    return [
+        step for step in plan
+        if TABLE_ACCESS.match(step) and not INDEXED_ACCESS.search(step) and not PRIMARY_KEY_LOOKUP.match(step)
+    ]
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_queries_use_indexes(app, db, sample, name):
+    """
+    Каждый запрос горячего метода (выборки, догрузка связей, UPDATE) читает таблицы по индексу
+    или по первичному ключу и не сортирует результат во временном B-дереве.
+    """
+    with app.test_request_context():
+        with captured_statements(db.engine) as statements:
+            HOT_QUERIES[name](sample)
+
+    assert statements, 'метод не выполнил ни одного запроса'
+    for statement, parameters in statements:
+        plan = query_plan(db, statement, parameters)
+        assert not unindexed_steps(plan), (statement, plan)
+        assert TEMP_SORT not in plan, (statement, plan)
+
+
+def test_expire_overdue_finishes_only_overdue_attempts(db, sample):
+    attempts = Attempt.query.order_by(Attempt.id).all()
+    started_at = attempts[1].started_at
+    fresh = Attempt(user_id=sample.id, variant_id=attempts[1].variant_id, started_at=utcnow())
+    db.session.add(fresh)
+    db.session.commit()
+
+    # по умолчанию на вариант 14100 с - первая незавершённая попытка уже просрочена
+    assert AttemptService.expire_overdue() == 1
+
+    db.session.expire_all()
+    assert attempts[1].finished_at == started_at + timedelta(seconds=attempts[1].variant.duration)
+    assert fresh.finished_at is None
+    assert AttemptService.expire_overdue() == 0
+
+
+def test_expire_overdue_keeps_attempt_finished_concurrently(db, sample):
+    attempt = Attempt.query.filter(Attempt.finished_at.is_(None)).one()
+    finished_at = utcnow().replace(tzinfo=None, microsecond=0)
+
+    def finish_by_user(conn, cursor, statement, parameters, context, executemany):
+        # пользователь нажимает "Завершить" сразу после выборки просроченных попыток
+        if statement.lstrip().upper().startswith('SELECT') and 'finished_at IS NULL' in statement:
+            cursor.connection.execute(
+                'UPDATE attempts SET finished_at = ? WHERE id = ?', (finished_at.isoformat(' '), attempt.id)
+            )
+
+    event.listen(db.engine, 'after_cursor_execute', finish_by_user)
+    try:
+        assert AttemptService.expire_overdue() == 0
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', finish_by_user)
+
+    db.session.expire_all()
+    assert attempt.finished_at == finished_at
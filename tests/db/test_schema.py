@@ -1,4 +1,11 @@
-from sqlalchemy import text
+import logging
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.extensions import db as _db, engine_options, sqlite_pragmas
+from app.utils.db_pool import InstrumentedQueuePool, make_instrumented_pool
 
 EXPECTED_TABLES = {
     'users', 'roles', 'user_roles',
@@ -32,3 +39,48 @@ def test_foreign_keys_present(inspector):
     # attempt_answers -> attempts, variant_tasks
     aa_fks = {fk['referred_table'] for fk in fk_map.get('attempt_answers', [])}
     assert 'attempts' in aa_fks and 'variant_tasks' in aa_fks
+
+
+def test_sqlite_profile_is_applied_to_connections(app, db):
+    with _db.engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar().upper() == app.config['SQLITE_JOURNAL_MODE']
+        # NORMAL = 1
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == app.config['SQLITE_BUSY_TIMEOUT']
+        assert conn.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+
+
+def test_sqlite_profile_rejects_unknown_values():
+    assert sqlite_pragmas({'SQLITE_JOURNAL_MODE': 'wal', 'SQLITE_BUSY_TIMEOUT': 100}) == [
+        ('journal_mode', 'WAL'), ('busy_timeout', '100'),
+    ]
+    with pytest.raises(ValueError):
+        sqlite_pragmas({'SQLITE_SYNCHRONOUS': 'NORMAL; DROP TABLE users'})
+
+
+def test_engine_options_apply_only_to_server_databases(app):
+    config = {**app.config, 'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://kege@db/kege'}
+    options = engine_options(config)
+    assert options['pool_size'] == app.config['DB_POOL_SIZE']
+    assert options['pool_recycle'] == app.config['DB_POOL_RECYCLE']
+    assert options['pool_pre_ping'] is True
+    assert issubclass(options['poolclass'], InstrumentedQueuePool)
+    assert engine_options(app.config) == {}
+
+
+def test_instrumented_pool_logs_wait_and_utilization(tmp_path, caplog, monkeypatch):
+    # fileConfig из alembic (test_migrations) отключает уже созданные логгеры
+    monkeypatch.setattr(logging.getLogger('app.utils.db_pool'), 'disabled', False)
+    engine = create_engine(
+        f'sqlite:///{tmp_path / "pool.db"}',
+        poolclass=make_instrumented_pool(0.001), pool_size=2, max_overflow=1,
+    )
+    with caplog.at_level(logging.INFO, logger='app.utils.db_pool'):
+        with engine.connect(), engine.connect():
+            time.sleep(0.002)
+            with engine.connect():
+                pass
+    engine.dispose()
+
+    assert engine.pool.capacity() == 3
+    assert any('Пул соединений' in r.message and 'пик 3 из 3 (100%)' in r.message for r in caplog.records)
@@ -0,0 +1,52 @@
+import json
+from logging.handlers import RotatingFileHandler
+
+from app.extensions import db as _db
+from app.models import Task
+from app.utils.slow_query_log import SLOW_QUERY_EXTENSION, param_shapes, read_slow_log, summarize_slow_log
+
+
+def test_param_shapes_hide_values():
+    assert param_shapes(('secret', 5, None)) == ['str[6]', 'int', 'null']
+    assert param_shapes([{'a': b'xy'}, {'a': b'z'}], executemany=True) == {'rows': 2, 'shape': {'a': 'bytes[2]'}}
+
+
+def test_slow_statements_logged_with_plan_once(app, client, db, tmp_path, monkeypatch):
+    path = tmp_path / 'slow.jsonl'
+    slow_log = app.extensions[SLOW_QUERY_EXTENSION]
+    # порог 0 - медленным считается любой запрос
+    monkeypatch.setattr(slow_log, 'threshold', 0)
+    monkeypatch.setattr(slow_log, 'path', str(path))
+    monkeypatch.setattr(slow_log, 'handler', RotatingFileHandler(path, encoding='utf-8', delay=True))
+    monkeypatch.setattr(slow_log, '_explained', set())
+
+    _db.session.add_all([Task(number=5, statement_html=f'<p>{i}</p>', answer=str(i)) for i in range(3)])
+    _db.session.commit()
+    task_ids = [t.id for t in Task.query.all()]
+    _db.session.expunge_all()
+
+    for _ in range(2):
+        assert client.post('/api/tasks/by_ids', json={'ids': task_ids}).status_code == 200
+    slow_log.handler.close()
+
+    entries = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    request_entries = [e for e in entries if e['endpoint'] == 'api_tasks.by_ids']
+    assert request_entries
+    select = next(e for e in request_entries if 'FROM tasks' in e['fingerprint'] and 'IN (?)' in e['fingerprint'])
+    assert select['frame'].startswith('app/') and ' in ' in select['frame']
+    assert select['params'] == ['int'] * len(task_ids)
+
+    # план - только у первой записи каждого отпечатка
+    same = [e for e in entries if e['fingerprint'] == select['fingerprint']]
+    assert len(same) >= 2
+    assert [bool(e.get('plan')) for e in same].count(True) == 1
+    assert any('tasks' in step for step in same[0]['plan'])
+
+    summary = summarize_slow_log(read_slow_log(str(path)))
+    assert summary == sorted(summary, key=lambda g: g['total_ms'], reverse=True)
+    top = next(g for g in summary if g['fingerprint'] == select['fingerprint'])
+    assert top['count'] == len(same) and top['plan']
+
+    result = app.test_cli_runner().invoke(args=['slow-queries', 'summary', '--file', str(path), '--top', '3'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('1. всего')
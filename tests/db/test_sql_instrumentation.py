@@ -0,0 +1,48 @@
+import json
+import logging
+
+from app.extensions import db as _db
+from app.models import Task, Variant, VariantTask
+from app.utils.sql_instrumentation import fingerprint
+
+
+def test_fingerprint_ignores_values():
+    assert fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'a''b'") == 'SELECT * FROM t WHERE id = ? AND name = ?'
+    assert fingerprint('SELECT *\n  FROM t WHERE id IN (?, ?,  ?)') == fingerprint('SELECT * FROM t WHERE id IN (?)')
+
+
+def test_fingerprint_normalises_pyformat_placeholders():
+    # так PyMySQL видит расширенный IN: у каждого элемента свой именованный параметр
+    expanded = 'SELECT tasks.id FROM tasks WHERE tasks.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s) AND tasks.number = %(number_1)s'
+    assert fingerprint(expanded) == 'SELECT tasks.id FROM tasks WHERE tasks.id IN (?) AND tasks.number = ?'
+    assert fingerprint('SELECT tasks.id FROM tasks WHERE tasks.id IN (%(id_1_1)s)') == fingerprint(expanded.split(' AND')[0])
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND s LIKE '%s'") == 'SELECT * FROM t WHERE id IN (?) AND s LIKE ?'
+
+
+def test_request_reports_server_timing_and_n_plus_one(app, client, db, caplog, monkeypatch):
+    # fileConfig из alembic (test_migrations) отключает уже созданные логгеры
+    monkeypatch.setattr(logging.getLogger('app.utils.sql_instrumentation'), 'disabled', False)
+    monkeypatch.setitem(app.config, 'SQL_N_PLUS_ONE_THRESHOLD', 3)
+
+    tasks = [Task(number=5, statement_html=f'<p>{i}</p>', answer=str(i)) for i in range(5)]
+    variant = Variant()
+    _db.session.add_all([*tasks, variant])
+    _db.session.flush()
+    _db.session.add_all([VariantTask(variant_id=variant.id, task_id=t.id, order=i) for i, t in enumerate(tasks)])
+    _db.session.commit()
+    task_ids = [t.id for t in tasks]
+    _db.session.expunge_all()
+
+    with caplog.at_level(logging.INFO, logger='app.utils.sql_instrumentation'):
+        resp = client.post('/api/tasks/by_ids', json={'ids': task_ids})
+
+    assert resp.status_code == 200
+    assert 'db;dur=' in resp.headers['Server-Timing']
+    assert 'app;dur=' in resp.headers['Server-Timing']
+
+    line = next(json.loads(r.message) for r in caplog.records if r.message.startswith('{'))
+    assert line['endpoint'] == 'api_tasks.by_ids'
+    assert line['queries'] >= 6
+    # variant_links каждой задачи подгружаются отдельным запросом
+    warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+    assert any('variant_tasks' in r.getMessage() and '5 раз' in r.getMessage() for r in warnings)
@@ -0,0 +1,55 @@
+import gzip
+import os
+
+from app.utils.static_assets import build_manifest, load_manifest
+
+
+def test_pages_link_fingerprinted_assets_served_precompressed(app, client):
+    manifest = app.extensions['static_manifest']
+    hashed = manifest['css/base.css']
+    assert hashed.startswith('css/base.') and hashed.endswith('.css') and hashed != 'css/base.css'
+    assert f'/assets/{hashed}' in client.get('/login').get_data(as_text=True)
+
+    with open(os.path.join(app.static_folder, 'css', 'base.css'), 'rb') as f:
+        original = f.read()
+
+    packed = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert packed.status_code == 200
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert packed.mimetype == 'text/css'
+    assert gzip.decompress(packed.data) == original
+    assert 'Accept-Encoding' in packed.headers['Vary']
+    assert packed.cache_control.immutable and packed.cache_control.max_age == 365 * 24 * 3600
+
+    plain = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == original
+
+    # обработчики ошибок отдают страницу с кодом 200 - проверяем по её тексту
+    # отдаются только имена из манифеста: не сам манифест и не временные файлы сборки
+    build_dir = app.config['STATIC_BUILD_DIR']
+    with open(os.path.join(build_dir, f'{hashed}.123.tmp'), 'wb') as f:
+        f.write(original)
+    for url in ('/assets/css/base.css', '/assets/../manifest.json', '/assets/manifest.json', f'/assets/{hashed}.123.tmp'):
+        assert 'Страница не найдена' in client.get(url).get_data(as_text=True)
+
+
+def test_build_is_incremental_and_renames_changed_files(tmp_path):
+    static, build = tmp_path / 'static', tmp_path / 'build'
+    (static / 'js').mkdir(parents=True)
+    (static / 'js' / 'app.js').write_text('console.log(1);\n' * 200)
+    (static / 'img.png').write_bytes(b'\x89PNG' + b'\0' * 2000)
+
+    assert build_manifest(str(static), str(build)) == {'files': 2, 'written': 2, 'compressed': 1}
+    first = load_manifest(str(build))
+    assert (build / (first['js/app.js'] + '.gz')).exists()
+    assert not (build / (first['img.png'] + '.gz')).exists()
+
+    assert build_manifest(str(static), str(build))['written'] == 0
+
+    (static / 'js' / 'app.js').write_text('console.log(2);\n' * 200)
+    assert build_manifest(str(static), str(build))['written'] == 1
+    second = load_manifest(str(build))
+    assert second['js/app.js'] != first['js/app.js'] and second['img.png'] == first['img.png']
+    # старая версия остаётся для уже открытых страниц
+    assert (build / first['js/app.js']).exists()
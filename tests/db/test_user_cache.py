@@ -0,0 +1,55 @@
+from sqlalchemy import event
+
+from app.extensions import db as _db
+from app.models import Role, User
+from app.utils.user_cache import user_cache
+
+
+def _count_queries(fn):
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(_db.engine, 'before_cursor_execute', before)
+    try:
+        fn()
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before)
+    return statements
+
+
+def test_cached_user_has_role_bits_without_queries(db):
+    user = User(username='cached', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    _db.session.commit()
+    user_id = user.id
+    _db.session.remove()
+
+    assert user_cache.load(user_id).is_admin is False
+    _db.session.remove()
+
+    def load_and_check():
+        loaded = user_cache.load(user_id)
+        assert loaded.username == 'cached'
+        assert not loaded.is_admin
+        assert not loaded.has_role('admin')
+
+    assert _count_queries(load_and_check) == []
+    _db.session.remove()
+
+    # выдача роли поднимает версию пользователя - кеш перечитывается
+    admin_role = Role.query.filter_by(name='admin').one()
+    user = _db.session.get(User, user_id)
+    user.roles.append(admin_role)
+    _db.session.commit()
+    _db.session.remove()
+
+    assert user_cache.load(user_id).is_admin is True
+    _db.session.remove()
+
+    user = _db.session.get(User, user_id)
+    user.first_name = 'Б'
+    _db.session.commit()
+    _db.session.remove()
+    assert user_cache.load(user_id).first_name == 'Б'
@@ -0,0 +1,94 @@
+import os
+
+from flask import current_app
+
+from app.extensions import cache, db as _db
+from app.models import Attempt, Task, TaskAttachment, User, Variant
+from app.services.purge_service import PurgeService
+from app.services.variant_bundle_service import VariantBundleService
+from app.services.variant_services import VariantService
+
+
+def _make_variant():
+    tasks = [
+        Task(number=19, statement_html='<p onclick="x()">Игра</p><script>alert(1)</script>', answer='1,2,3'),
+        Task(number=5, statement_html='<p>Алгоритм</p>', answer='42'),
+    ]
+    _db.session.add_all(tasks)
+    _db.session.commit()
+    variant, _ = VariantService.create_variant([tasks[1].id, tasks[0].id])
+    return variant, tasks
+
+
+def test_bundle_is_compiled_once_per_revision(db):
+    variant, tasks = _make_variant()
+    bundle = VariantBundleService.get(variant)
+
+    assert [t['number'] for t in bundle['tasks']] == [5, 19]
+    assert bundle['total_display_tasks'] == 4
+    assert 'script' not in bundle['tasks'][1]['statement_html']
+    assert 'onclick' not in bundle['tasks'][1]['statement_html']
+    assert all('answer' not in t for t in bundle['tasks'])
+    assert VariantBundleService.get(variant) is bundle
+
+    # бандл переживает очистку памяти - читается с диска
+    cache.clear()
+    assert VariantBundleService.get(variant) == bundle
+
+    # правка задачи поднимает ревизию варианта, и бандл пересобирается
+    revision = variant.revision
+    tasks[1].answer = '43'
+    _db.session.commit()
+    assert _db.session.get(Variant, variant.id).revision > revision
+    fresh = VariantBundleService.get(variant)
+    assert VariantBundleService.get_answer_key(fresh, fresh['tasks'][0]['variant_task_id'])['answer'] == '43'
+
+    revision = variant.revision
+    _db.session.add(TaskAttachment(task_id=tasks[0].id, filename='19.txt', data=b'1', size=1))
+    _db.session.commit()
+    assert variant.revision > revision
+    assert VariantBundleService.get(variant)['has_attachments']
+
+    # на диске остаётся только бандл текущей ревизии
+    bundle_dir = os.path.join(current_app.config['CACHE_DIR'], 'variant_bundles')
+    assert len(os.listdir(bundle_dir)) == 1
+
+
+def test_recreated_variant_id_gets_its_own_bundle(db):
+    variant, tasks = _make_variant()
+    variant_id = variant.id
+    assert [t['number'] for t in VariantBundleService.get(variant)['tasks']] == [5, 19]
+
+    # SQLite выдаёт id последней удалённой строки новой - в ту же секунду
+    _db.session.delete(variant)
+    _db.session.commit()
+    recreated, _ = VariantService.create_variant([tasks[0].id])
+    assert recreated.id == variant_id and recreated.revision == variant.revision
+    assert [t['number'] for t in VariantBundleService.get(recreated)['tasks']] == [19]
+
+    # окончательное удаление варианта убирает и его бандлы с диска
+    PurgeService.soft_delete(recreated)
+    PurgeService.run()
+    assert os.listdir(os.path.join(current_app.config['CACHE_DIR'], 'variant_bundles')) == []
+
+
+def test_attempt_data_hides_grading_keys(client, db):
+    variant, _ = _make_variant()
+    user = User(username='bundle_user', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    _db.session.commit()
+    attempt = Attempt(user_id=user.id, variant_id=variant.id)
+    _db.session.add(attempt)
+    _db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+
+    data = client.get(f'/attempts/{attempt.id}/data').get_json()
+    assert [t['number'] for t in data['tasks']] == [5, 19]
+    assert all('answer' not in t for t in data['tasks'])
+
+    vt_id = data['tasks'][0]['variant_task_id']
+    resp = client.post(f'/attempts/{attempt.id}/save-answer', json={'variant_task_id': vt_id, 'answer_text': '42'})
+    assert resp.get_json()['ok']
+    assert attempt.answers[0].is_correct
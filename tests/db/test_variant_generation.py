@@ -0,0 +1,366 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.extensions import db as _db
+from app.models import AttemptAnswer, Task, TaskAttachment, User, Variant, VariantTask
+from app.services.attempt_service import AttemptService
+from app.services.purge_service import PurgeService
+from app.services.variant_pool_service import VariantPoolService
+from app.services.variant_services import VariantService
+from app.utils.seen_tasks import seen_tasks
+from app.utils.task_catalog import task_catalog
+from app.utils.task_pool import task_pool
+from app.utils.variant_utils import (
+    FULL_VARIANT_NUMBERS, FULL_VARIANT_SPECS, build_personal_tasks_set, build_tasks_set,
+)
+
+
+def _add_tasks(number: int, count: int):
+    tasks = [Task(number=number, statement_html='<p>x</p>', answer='1') for _ in range(count)]
+    _db.session.add_all(tasks)
+    _db.session.commit()
+    return tasks
+
+
+def test_build_tasks_set_uses_pool(db):
+    _add_tasks(1, 5)
+    _add_tasks(19, 3)
+    _add_tasks(27, 1)
+
+    tasks = build_tasks_set([('1', 2), ('19-21', 1), ('27', 4), ('5', 1)])
+    numbers = [t.number for t in tasks]
+    assert numbers == [1, 1, 19, 27]
+    assert len({t.id for t in tasks}) == 4
+
+
+def test_pool_version_follows_task_changes(db):
+    tasks = _add_tasks(3, 2)
+    assert task_pool.count(3) == 2
+
+    version = task_pool.version
+    tasks[0].number = 4
+    _db.session.commit()
+    assert task_pool.version == version + 1
+    assert task_pool.count(3) == 1
+    assert task_pool.count(4) == 1
+
+    # смена других полей пул не трогает
+    version = task_pool.version
+    tasks[1].answer = '2'
+    _db.session.commit()
+    assert task_pool.version == version
+
+    _db.session.delete(tasks[1])
+    _db.session.commit()
+    assert task_pool.count(3) == 0
+
+
+def test_soft_deleted_task_leaves_pool(db):
+    kept, deleted = _add_tasks(5, 2)
+    assert sorted(task_pool.ids_for([5])) == sorted([kept.id, deleted.id])
+
+    PurgeService.soft_delete(deleted)
+    assert task_pool.ids_for([5]) == [kept.id]
+    # сгенерированный после удаления вариант удалённую задачу не берёт
+    for _ in range(5):
+        assert [t.id for t in build_tasks_set([('5', 2)])] == [kept.id]
+
+    deleted.deleted_at = None
+    _db.session.commit()
+    assert sorted(task_pool.ids_for([5])) == sorted([kept.id, deleted.id])
+
+
+def test_create_variant_inserts_composition_in_one_go(db):
+    tasks = _add_tasks(2, 3)
+    task_ids = [tasks[2].id, tasks[0].id, tasks[1].id]
+
+    variant, composition = VariantService.create_variant(task_ids, source='bulk')
+
+    assert [row['task_id'] for row in composition] == task_ids
+    assert [row['order'] for row in composition] == [0, 1, 2]
+    assert _db.session.get(Variant, variant.id).source == 'bulk'
+    assert VariantService.get_task_ids(variant.id) == task_ids
+    assert VariantTask.query.filter_by(variant_id=variant.id).count() == 3
+
+
+def test_personal_generation_avoids_recently_answered(db):
+    user = User(username='student', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    tasks = _add_tasks(7, 3)
+    variant, _ = VariantService.create_variant([tasks[0].id, tasks[1].id])
+    attempt = AttemptService.create_attempt(user.id, variant.id)
+
+    # история строится до завершения попытки и потом дополняется без перестроения
+    assert seen_tasks.get(user.id).seen_ids == set()
+
+    for vt in VariantTask.query.filter_by(variant_id=variant.id).all():
+        _db.session.add(AttemptAnswer(attempt_id=attempt.id, variant_task_id=vt.id, answer_text='0', is_correct=False))
+    _db.session.commit()
+    AttemptService.finish_attempt(attempt.id, user.id)
+
+    history = seen_tasks.get(user.id)
+    assert history.seen_ids == {tasks[0].id, tasks[1].id}
+    assert history.weak_numbers() == {7}
+
+    picked = build_personal_tasks_set([('7', 1)], user.id)
+    assert [t.id for t in picked] == [tasks[2].id]
+
+    # не хватает "свежих" задач - добираем из уже решённых
+    assert len(build_personal_tasks_set([('7', 3)], user.id)) == 3
+
+    # слабый номер получает задачу за счёт другого номера, общее количество не растёт
+    _add_tasks(8, 3)
+    picked = build_personal_tasks_set([('7', 1), ('8', 3)], user.id, exclude_recent=False, prefer_weak=True)
+    assert sorted(t.number for t in picked) == [7, 7, 8, 8]
+    # заказанный номер не пропадает, даже если отдать больше нечего
+    picked = build_personal_tasks_set([('7', 1), ('8', 1)], user.id, exclude_recent=False, prefer_weak=True)
+    assert sorted(t.number for t in picked) == [7, 8]
+    seen_tasks.forget(user.id)
+
+
+def test_recent_attempts_limit_comes_from_config(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, 'RECENT_ATTEMPTS', 1)
+    user = User(username='student', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    tasks = _add_tasks(7, 2)
+    for task in tasks:
+        variant, _ = VariantService.create_variant([task.id])
+        attempt = AttemptService.create_attempt(user.id, variant.id)
+        _db.session.add(AttemptAnswer(attempt_id=attempt.id, variant_task_id=variant.tasks[0].id, answer_text='1'))
+        _db.session.commit()
+        AttemptService.finish_attempt(attempt.id, user.id)
+
+    assert seen_tasks.get(user.id).seen_ids == {tasks[1].id}
+    seen_tasks.forget(user.id)
+
+
+def test_variant_pool_refill_and_claim(app, db):
+    for number in list(range(1, 20)) + list(range(22, 28)):
+        _add_tasks(number, 2)
+
+    app.config['VARIANT_POOL_SIZE'] = 2
+    try:
+        assert VariantPoolService.refill() == 2
+        assert VariantPoolService.depth() == 2
+        # пул уже полон
+        assert VariantPoolService.refill() == 0
+
+        pooled = Variant.query.filter_by(is_pooled=True).first()
+        assert len(pooled.tasks) == len(FULL_VARIANT_SPECS)
+
+        first = VariantPoolService.claim(author_id=None)
+        second = VariantPoolService.claim(author_id=None)
+        assert first is not None and second is not None and first != second
+        assert VariantPoolService.claim(author_id=None) is None
+        assert VariantPoolService.depth() == 0
+        assert _db.session.get(Variant, first).is_pooled is False
+
+        metrics = VariantPoolService.get_metrics()
+        assert metrics['claims'] >= 2
+        assert metrics['misses'] >= 1
+        assert metrics['claim_latency_p99_ms'] is not None
+    finally:
+        app.config['VARIANT_POOL_SIZE'] = 0
+
+
+def test_concurrent_claims_get_distinct_variants(app, db):
+    claimers = 8
+    _db.session.add_all([Variant(source='Пул', is_pooled=True) for _ in range(claimers + 2)])
+    _db.session.commit()
+
+    barrier = threading.Barrier(claimers)
+    claimed, errors = [], []
+
+    def claim():
+        # у каждого потока свой контекст приложения и своя сессия, как у воркеров на уроке
+        with app.app_context():
+            barrier.wait()
+            try:
+                claimed.append(VariantPoolService.claim(author_id=None))
+            except Exception as e:  # pylint: disable=W0718
+                errors.append(e)
+            finally:
+                _db.session.remove()
+
+    def network_latency(*args):
+        # задержка до ответа сервера БД: запросы потоков успевают перекрыться
+        time.sleep(0.02)
+
+    event.listen(_db.engine, 'after_cursor_execute', network_latency)
+    try:
+        threads = [threading.Thread(target=claim) for _ in range(claimers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(_db.engine, 'after_cursor_execute', network_latency)
+
+    assert not errors
+    assert None not in claimed and len(set(claimed)) == claimers
+    assert VariantPoolService.depth() == 2
+
+
+def test_claim_without_update_returning(db, monkeypatch):
+    # как на MySQL: UPDATE без RETURNING - вариант выбирается SELECT ... FOR UPDATE SKIP LOCKED
+    monkeypatch.setattr(_db.session.get_bind().dialect, 'update_returning', False)
+    _db.session.add_all([Variant(source='Пул', is_pooled=True) for _ in range(2)])
+    _db.session.commit()
+
+    first, second = VariantPoolService.claim(author_id=None), VariantPoolService.claim(author_id=None)
+    assert None not in (first, second) and first != second
+    assert VariantPoolService.claim(author_id=None) is None
+
+
+def test_variant_pool_skips_incomplete_bank(app, db):
+    _add_tasks(1, 3)
+    app.config['VARIANT_POOL_SIZE'] = 3
+    try:
+        assert VariantPoolService.refill() == 0
+    finally:
+        app.config['VARIANT_POOL_SIZE'] = 0
+
+
+def test_search_variants_paginates_and_filters(client, db):
+    full_ids = [_add_tasks(number, 1)[0].id for number in FULL_VARIANT_NUMBERS]
+    full_variant, _ = VariantService.create_variant(full_ids, source='Полный')
+    for i in range(3):
+        VariantService.create_variant(full_ids[:2], source=f'Демо 100%_{i}')
+
+    resp = client.get('/variants/search?all=1&limit=2')
+    data = resp.get_json()
+    assert [v['task_count'] for v in data['variants']] == [2, 2]
+    assert data['next_cursor'] == data['variants'][-1]['id']
+
+    data = client.get(f"/variants/search?all=1&limit=2&before={data['next_cursor']}").get_json()
+    assert [v['id'] for v in data['variants']][-1] == full_variant.id
+    assert data['next_cursor'] is None
+
+    data = client.get('/variants/search?all=1&full=1').get_json()
+    assert [v['id'] for v in data['variants']] == [full_variant.id]
+    assert data['variants'][0]['task_count'] == len(FULL_VARIANT_NUMBERS)
+
+    # _ и % в подстроке ищутся буквально
+    data = client.get('/variants/search?all=1&source=100%25_1').get_json()
+    assert [v['source'] for v in data['variants']] == ['Демо 100%_1']
+
+    etag = resp.headers['ETag'].strip('"')
+    assert client.get('/variants/search?all=1&limit=2', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+    VariantService.create_variant(full_ids[:1])
+    assert client.get('/variants/search?all=1&limit=2', headers={'If-None-Match': f'"{etag}"'}).status_code == 200
+
+    # правка источника не меняет ни количество, ни даты, но ETag меняется
+    etag = client.get('/variants/search?all=1').headers['ETag'].strip('"')
+    _db.session.get(Variant, full_variant.id).source = 'Полный, исправленный'
+    _db.session.commit()
+    assert client.get('/variants/search?all=1', headers={'If-None-Match': f'"{etag}"'}).status_code == 200
+
+
+def test_task_catalog_counts_and_invalidation(client, db):
+    tasks = _add_tasks(7, 4)
+    _db.session.add(TaskAttachment(task_id=tasks[0].id, filename='7.txt', data=b'1', size=1))
+    _db.session.commit()
+
+    data = client.get('/api/tasks/catalog').get_json()
+    assert data['numbers'] == [{
+        'number': 7,
+        'count': 4,
+        'latest_published_at': max(t.published_at for t in tasks).isoformat(),
+        'attachments_share': 0.25,
+    }]
+
+    version = task_catalog.version
+    _add_tasks(7, 1)
+    assert task_catalog.version > version
+    assert task_catalog.count(7) == 5
+
+
+def test_generation_form_rejects_counts_above_catalog(app, client, db):
+    _add_tasks(3, 2)
+    app.config['WTF_CSRF_ENABLED'] = False
+    try:
+        resp = client.post('/variants/', data={'kim_3': 'y', 'kim_count_3': '5'})
+        assert resp.status_code == 200
+        assert 'в банке задач 2, запрошено 5' in resp.get_data(as_text=True)
+    finally:
+        app.config['WTF_CSRF_ENABLED'] = True
+
+
+def test_clone_variant_with_substitutions(client, db):
+    user = User(username='teacher', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    tasks = _add_tasks(4, 4)
+    original, _ = VariantService.create_variant([tasks[0].id, tasks[1].id, tasks[2].id], source='Исходный')
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+
+    resp = client.post(f'/variants/{original.id}/clone',
+                       json={'substitutions': [{'from': tasks[1].id, 'to': tasks[3].id}]})
+    assert resp.status_code == 201
+    copy_id = resp.get_json()['variant_id']
+    assert VariantService.get_task_ids(copy_id) == [tasks[0].id, tasks[3].id, tasks[2].id]
+    assert VariantService.get_task_ids(original.id) == [tasks[0].id, tasks[1].id, tasks[2].id]
+
+    # замена на задачу, которая уже есть в варианте, отклоняется целиком
+    resp = client.post(f'/variants/{original.id}/clone',
+                       json={'substitutions': [{'from': tasks[1].id, 'to': tasks[2].id}]})
+    assert resp.status_code == 400
+    assert VariantService.get_by_author(user.id)[0].id == copy_id
+
+
+def test_patch_composition_diffs_and_reorders(client, db):
+    user = User(username='editor', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    _db.session.commit()
+    tasks = _add_tasks(6, 5)
+    a, b, c, d, e = (t.id for t in tasks)
+    variant, _ = VariantService.create_variant([a, b, c], author_id=user.id)
+    kept_row = VariantTask.query.filter_by(variant_id=variant.id, task_id=c).one().id
+    revision = variant.revision
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+
+    resp = client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [c, d, a, e]})
+    assert resp.status_code == 200
+    assert resp.get_json()['task_ids'] == [c, d, a, e]
+    assert VariantService.get_task_ids(variant.id) == [c, d, a, e]
+    # сохранившиеся строки не пересоздаются
+    assert VariantTask.query.filter_by(variant_id=variant.id, task_id=c).one().id == kept_row
+    assert _db.session.get(Variant, variant.id).revision > revision
+
+    assert client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [a, a]}).status_code == 400
+    assert client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [a, 10 ** 6]}).status_code == 400
+
+    resp = client.post(f'/variants/{variant.id}/move_task', json={'task_id': a, 'direction': 'up'})
+    assert resp.get_json()['order'] == [c, a, d, e]
+    assert [vt.task_id for vt in _db.session.get(Variant, variant.id).tasks] == [c, a, d, e]
+
+
+def test_patch_composition_rejects_bad_payload_and_keeps_deleted_tasks(client, db):
+    user = User(username='editor', first_name='A', last_name='B', password_hash='h')
+    _db.session.add(user)
+    _db.session.commit()
+    a, b, c = (t.id for t in _add_tasks(7, 3))
+    variant, _ = VariantService.create_variant([a, b, c], author_id=user.id)
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+
+    for payload in (['x'], [None], [True], [1.5], [{}]):
+        resp = client.patch(f'/variants/{variant.id}/composition', json={'task_ids': payload})
+        assert resp.status_code == 400
+        assert resp.get_json()['message'] == 'Некорректный список задач'
+    assert VariantService.get_task_ids(variant.id) == [a, b, c]
+
+    PurgeService.soft_delete(_db.session.get(Task, b))
+    # удалённая задача уже в варианте - её можно оставить и переставить
+    resp = client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [b, c]})
+    assert resp.status_code == 200
+    assert VariantService.get_task_ids(variant.id) == [b, c]
+    # а добавить заново удалённую задачу нельзя
+    assert client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [a, c]}).status_code == 200
+    assert client.patch(f'/variants/{variant.id}/composition', json={'task_ids': [a, b, c]}).status_code == 400